@@ -4,6 +4,9 @@
 # =============================================================================
 
 # --- 1. Importing necessary libraries ---
+import datetime
+import hashlib
+import os
 import streamlit as st
 import pandas as pd
 import plotly.express as px
@@ -12,7 +15,26 @@ import shap
 import matplotlib.pyplot as plt
 from customer_diagnosis_page import page_customer_diagnosis
 from global_analytics_page import page_global_analytics
-from sidebar import render_sidebar
+from risk_ranking_page import page_risk_ranking
+from data_drift_page import page_data_drift
+from sidebar import render_sidebar, render_admin_panel, render_scoring_model_choice, render_live_status
+from bitmap_index import BitmapIndex
+from segment_explanation import ExplanationStore
+from quantized_store import QuantizedExplanationStore, ENCODINGS
+from sketches import SketchStore
+from snapshot_store import SnapshotStore
+from query_backend import create_backend
+import tracing
+from figure_cache import FigureCache
+from shap_waterfall import build_waterfall_figure
+from risk_ranking import RiskRanking
+from similarity_index import SimilarityIndex
+from model_registry import ModelRegistry, ModelWatcher
+from disk_cache import DiskCache, CACHE_DIR
+from job_scheduler import JobScheduler
+from feature_pipeline import FeaturePipeline
+from event_stream import EventIngestor, LiveCustomerTable, open_source
+from drift_monitor import DriftReference, REFERENCE_FILE, scan, drift_report, find_alerts, emit_alerts
 
 # --- App setup ---
 st.set_page_config(
@@ -425,39 +447,325 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# --- Persistent Artifact Cache ---
+# The in-process caches below are filled from disk after a restart instead of being
+# rebuilt. Set CHURN_DISK_CACHE=0 to disable it.
+@tracing.traced_cache('get_disk_cache')
+@st.cache_resource
+def get_disk_cache():
+    """Size-bounded, versioned on-disk cache of derived artifacts (see disk_cache.py)."""
+    tracing.record_cache_miss('get_disk_cache')
+    enabled = os.environ.get('CHURN_DISK_CACHE', '1') != '0'
+    return DiskCache(
+        root=os.environ.get('CHURN_DISK_CACHE_DIR', CACHE_DIR) if enabled else None,
+        max_bytes=int(os.environ.get('CHURN_DISK_CACHE_MB', 1024)) << 20
+    )
+
+disk_cache = get_disk_cache()
+
 # --- 3. Data Loading and Model Loading ---
-@st.cache_data
-def load_data(path):
-    """Loads data from a CSV file."""
+def _read_display_data(path):
     df = pd.read_csv(path)
-    # Handle missing TotalCharges for new customers
+    # Show missing TotalCharges of new customers as 0
     df['TotalCharges'] = pd.to_numeric(df['TotalCharges'], errors='coerce')
     df['TotalCharges'] = df['TotalCharges'].fillna(0)
     return df
 
+@tracing.traced_cache('load_data')
+@st.cache_data
+def load_data(path):
+    """Loads data from a CSV file, for display (model inputs come from the feature pipeline)."""
+    tracing.record_cache_miss('load_data')
+    # Keyed by the data file and this module, whose code defines the display frame
+    return disk_cache.get_or_build('load_data', lambda: _read_display_data(path), sources=[path, __file__])
+
+@tracing.traced_cache('get_data_version')
+@st.cache_data
+def get_data_version(path):
+    """Content hash of the data file, used to key caches of derived results."""
+    tracing.record_cache_miss('get_data_version')
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+# Load data
+DATA_PATH = 'data/WA_Fn-UseC_-Telco-Customer-Churn.csv'
+df_data = load_data(DATA_PATH)
+data_version = get_data_version(DATA_PATH)
+
+# --- Model & XAI Setup (served from the model registry, hot-swapped on change) ---
+@tracing.traced_cache('get_model_watcher')
+@st.cache_resource
+def get_model_watcher():
+    """
+    Loads the current registry model, its feature pipeline and SHAP explainer, and
+    watches for new versions. Models registered before the pipeline existed get one
+    fit on the data file, which reproduces their training preprocessing.
+    """
+    tracing.record_cache_miss('get_model_watcher')
+    return ModelWatcher(ModelRegistry(), shap.TreeExplainer,
+                        default_pipeline=lambda: FeaturePipeline().fit(pd.read_csv(DATA_PATH)))
+
+model_watcher = get_model_watcher()
+loaded_model = model_watcher.poll()
+model, explainer, model_version = loaded_model.model, loaded_model.explainer, loaded_model.version
+# Operating threshold chosen by the train.py sweep; pre-registry models fall back to 0.5
+model_threshold = loaded_model.metadata.get('threshold', 0.5)
+
+# --- Distilled Student (optional fast model for interactive scoring, see distill.py) ---
+@tracing.traced_cache('get_student_model')
+@st.cache_resource(max_entries=2)
+def get_student_model(model_version, registry_stamp):
+    """Latest student of the active model as (version, model), or None. `registry_stamp` refreshes it when a version is added."""
+    tracing.record_cache_miss('get_student_model')
+    registry = ModelRegistry()
+    version = registry.student_for(model_version)
+    return (version, registry.load(version)[0]) if version else None
+
+student = get_student_model(model_version, model_watcher.registry_stamp)
+
+# --- Model Inputs (raw rows through the model's own pipeline, aligned with df_data) ---
+@tracing.traced_cache('get_model_inputs')
+@st.cache_resource(max_entries=2)
+def get_model_inputs(model_version, _pipeline, path):
+    """Validated, encoded model inputs for every customer, exactly as the model was trained on them."""
+    tracing.record_cache_miss('get_model_inputs')
+    return disk_cache.get_or_build(
+        'model_inputs', lambda: _pipeline.transform_frame(pd.read_csv(path)),
+        sources=[path, ModelRegistry().model_path(model_version), FeaturePipeline],
+        key_parts={'model_version': model_version}
+    )
+
+model_inputs = get_model_inputs(model_version, loaded_model.pipeline, DATA_PATH)
+
+@tracing.traced_cache('get_pipeline_version')
+@st.cache_resource(max_entries=2)
+def get_pipeline_version(model_version, _pipeline):
+    """Fingerprint of the model's feature pipeline (fitted state and code), used to key cached figures."""
+    tracing.record_cache_miss('get_pipeline_version')
+    return _pipeline.fingerprint()
+
+pipeline_version = get_pipeline_version(model_version, loaded_model.pipeline)
+
+@tracing.traced_cache('get_customer_index')
+@st.cache_resource
+def get_customer_index(_df):
+    """customerID -> row position, for single-customer lookups without a column scan."""
+    tracing.record_cache_miss('get_customer_index')
+    return pd.Index(_df['customerID'])
+
+customer_index = get_customer_index(df_data)
+
+# --- Filter Index ---
+@tracing.traced_cache('get_filter_index')
+@st.cache_resource
+def get_filter_index(_df):
+    """Builds the bitmap index used to resolve sidebar filter combinations."""
+    tracing.record_cache_miss('get_filter_index')
+    return BitmapIndex.from_dataframe(_df)
+
+filter_index = get_filter_index(df_data)
+
+@tracing.traced_cache('get_sketch_store')
 @st.cache_resource
-def load_model(path):
-    """Loads a pre-trained model."""
-    model = joblib.load(path)
-    return model
+def get_sketch_store(_df):
+    """Builds the per-partition KPI sketches."""
+    tracing.record_cache_miss('get_sketch_store')
+    return disk_cache.get_or_build('sketch_store', lambda: SketchStore.from_dataframe(_df),
+                                   sources=[DATA_PATH, __file__, SketchStore])
+
+sketch_store = get_sketch_store(df_data)
 
-# Load data and model
-df_data = load_data('data/WA_Fn-UseC_-Telco-Customer-Churn.csv')
-model = load_model('src/models/catboost_churn_model.joblib')
+# --- Query Backend ---
+# 'pandas' (default, in-memory) or 'duckdb' (embedded SQL over a Parquet copy of the data)
+QUERY_BACKEND = os.environ.get('CHURN_QUERY_BACKEND', 'pandas')
 
-# --- XAI Setup ---
+@tracing.traced_cache('get_query_backend')
 @st.cache_resource
-def get_shap_explainer(_model):
-    """Creates a SHAP Tree explainer for the given model."""
-    return shap.TreeExplainer(_model)
+def get_query_backend(name, _df, _filter_index, _sketch_store):
+    """Creates the backend answering the analytics page queries."""
+    tracing.record_cache_miss('get_query_backend')
+    return create_backend(name, _df, _filter_index, _sketch_store, source_path=DATA_PATH)
 
-explainer = get_shap_explainer(model)
+query_backend = get_query_backend(QUERY_BACKEND, df_data, filter_index, sketch_store)
+
+# --- Figure Cache (shared by all sessions) ---
+@tracing.traced_cache('get_figure_cache')
+@st.cache_resource
+def get_figure_cache():
+    """LRU cache of serialized analytics figures, optionally spilling to disk."""
+    tracing.record_cache_miss('get_figure_cache')
+    return FigureCache(
+        max_entries=int(os.environ.get('CHURN_FIGURE_CACHE_SIZE', 256)),
+        spill_dir=os.environ.get('CHURN_FIGURE_CACHE_DIR'),
+        max_spill_bytes=int(os.environ.get('CHURN_FIGURE_CACHE_SPILL_MB', 256)) << 20,
+        # The code behind the cached charts: the page builders, their queries and the waterfall
+        sources=[page_global_analytics, create_backend, BitmapIndex, page_customer_diagnosis, build_waterfall_figure]
+    )
+
+figure_cache = get_figure_cache()
+
+# Date-partitioned customer snapshots (read lazily, per query)
+snapshot_store = SnapshotStore()
+
+# --- Precomputed Scores & SHAP Matrix (keyed by model version) ---
+# 'int8' (default), 'float16' or 'topk' store them quantized (see quantized_store.py);
+# 'exact' keeps float32 arrays
+EXPLANATION_ENCODING = os.environ.get('CHURN_EXPLANATION_ENCODING', 'int8')
+if EXPLANATION_ENCODING not in ENCODINGS + ('exact',):
+    raise ValueError(f"CHURN_EXPLANATION_ENCODING must be one of {', '.join(ENCODINGS + ('exact',))}")
+
+@tracing.traced_cache('get_explanation_store')
+@st.cache_resource(max_entries=2)
+def get_explanation_store(model_version, encoding, _model, _explainer, _features):
+    """
+    Scores and explains every customer once, for the segment views and the diagnosis
+    page. Served memory-mapped from the disk cache.
+    """
+    tracing.record_cache_miss('get_explanation_store')
+    if encoding == 'exact':
+        build = lambda: ExplanationStore.build(_model, _explainer, _features)
+    else:
+        build = lambda: QuantizedExplanationStore.build(_model, _explainer, _features, encoding=encoding)
+    return disk_cache.get_or_build(
+        'explanation_store', build,
+        sources=[DATA_PATH, ModelRegistry().model_path(model_version), FeaturePipeline, ExplanationStore,
+                 QuantizedExplanationStore],
+        key_parts={'model_version': model_version, 'encoding': encoding},
+        mmap_mode='r'
+    )
+
+explanation_store = get_explanation_store(model_version, EXPLANATION_ENCODING, model, explainer, model_inputs)
+
+@tracing.traced_cache('get_risk_ranking')
+@st.cache_resource(max_entries=2)
+def get_risk_ranking(model_version, _df, _explanation_store):
+    """Revenue-at-risk scores for every customer, from the precomputed probabilities."""
+    tracing.record_cache_miss('get_risk_ranking')
+    return RiskRanking.build(_df, _explanation_store.probabilities)
+
+risk_ranking = get_risk_ranking(model_version, df_data, explanation_store)
+
+def warm_model_caches(bundle):
+    """Builds the caches keyed by model version for a new bundle, in the watcher's loading thread before the swap."""
+    features = get_model_inputs(bundle.version, bundle.pipeline, DATA_PATH)
+    get_pipeline_version(bundle.version, bundle.pipeline)
+    store = get_explanation_store(bundle.version, EXPLANATION_ENCODING, bundle.model, bundle.explainer, features)
+    get_risk_ranking(bundle.version, df_data, store)
+    get_student_model(bundle.version, model_watcher.registry_stamp)
+
+# Attached here rather than in get_model_watcher: the cached functions are defined after the watcher
+model_watcher.warm = warm_model_caches
+
+@tracing.traced_cache('get_similarity_index')
+@st.cache_resource
+def get_similarity_index(_df):
+    """Nearest-neighbor index over encoded customer features."""
+    tracing.record_cache_miss('get_similarity_index')
+    return disk_cache.get_or_build('similarity_index', lambda: SimilarityIndex.from_features(_df),
+                                   sources=[DATA_PATH, __file__, SimilarityIndex])
+
+similarity_index = get_similarity_index(df_data)
+
+# --- Live Updates from the Customer Event Log (optional, see event_stream.py) ---
+# Set CHURN_EVENT_LOG to a .jsonl file or SQLite database of customer attribute changes.
+# Customer Diagnosis and At-Risk Customers then serve live scores and segments; the analytics page
+# keeps the loaded snapshot (its indexes and sketches are built once).
+EVENT_LOG = os.environ.get('CHURN_EVENT_LOG')
+
+@tracing.traced_cache('get_event_ingestor')
+@st.cache_resource(max_entries=1, on_release=lambda ingestor: ingestor.stop())
+def get_event_ingestor(model_version, encoding, path, _df, _features, _explanation_store, _customer_index, _loaded_model):
+    """Live copy of the customer table fed by a background thread; each model version replays the log from the start."""
+    tracing.record_cache_miss('get_event_ingestor')
+    table = LiveCustomerTable(_df, _features, _explanation_store, _customer_index, _loaded_model.pipeline,
+                              _loaded_model.model, _loaded_model.explainer)
+    return EventIngestor(open_source(path), table).start()
+
+event_ingestor = get_event_ingestor(model_version, EXPLANATION_ENCODING, EVENT_LOG, df_data, model_inputs,
+                                    explanation_store, customer_index, loaded_model) if EVENT_LOG else None
+if event_ingestor is not None:
+    # One snapshot per rerun: every page reads the same applied batch
+    live = event_ingestor.table.snapshot()
+    customers, customer_inputs, customer_explanations = live.df, live.features, live.explanations
+    customer_ranking, customer_filter_index = live.risk_ranking, live.filter_index
+else:
+    customers, customer_inputs, customer_explanations = df_data, model_inputs, explanation_store
+    customer_ranking, customer_filter_index = risk_ranking, filter_index
+
+# --- Job Scheduler (shared by all sessions) ---
+@tracing.traced_cache('get_job_scheduler')
+@st.cache_resource
+def get_job_scheduler():
+    """Interactive pool for per-customer scoring/SHAP and chart builds, bulk pool for segment rescoring (see job_scheduler.py)."""
+    tracing.record_cache_miss('get_job_scheduler')
+    return JobScheduler(
+        interactive_workers=int(os.environ.get('CHURN_INTERACTIVE_WORKERS', 2)),
+        bulk_workers=int(os.environ.get('CHURN_BULK_WORKERS', 1))
+    )
+
+job_scheduler = get_job_scheduler()
+
+# --- Drift Monitoring (built on first visit of the Data Drift page) ---
+CURRENT_DATA = 'Current data'
+
+@tracing.traced_cache('get_drift_reference')
+@st.cache_resource(max_entries=2)
+def get_drift_reference(model_version, _pipeline):
+    """Training-data histograms saved with the model; built from the data file for older versions."""
+    tracing.record_cache_miss('get_drift_reference')
+    reference = ModelRegistry().load_artifact(model_version, REFERENCE_FILE)
+    return reference or DriftReference.fit(pd.read_csv(DATA_PATH), _pipeline)
+
+@tracing.traced_cache('get_drift_state')
+@st.cache_resource(max_entries=8)
+def get_drift_state(model_version, source, data_version, _reference):
+    """Scans the dashboard data or a snapshot once per model version; alerts are logged on each new scan."""
+    tracing.record_cache_miss('get_drift_state')
+    if source == CURRENT_DATA:
+        extract = pd.read_csv(DATA_PATH)
+    else:
+        snapshot_date = datetime.date.fromisoformat(source)
+        extract = snapshot_store.read(start=snapshot_date, end=snapshot_date)
+    state = scan(extract, _reference)
+    emit_alerts(find_alerts(drift_report(_reference, state), source))
+    return state
 
 # --- Sidebar ---
-sidebar_result = render_sidebar(df_data)
+with tracing.span('render_sidebar'):
+    sidebar_result = render_sidebar(df_data)
+    use_student = student is not None and render_scoring_model_choice(student[0])
+    if event_ingestor is not None:
+        with st.sidebar:
+            render_live_status(event_ingestor)
+
+# Interactive scoring (diagnosis, what-if) can use the student; SHAP explanations stay with the full model
+scoring_model, scoring_version = (student[1], f"{student[0]} (student of {model_version})") if use_student \
+    else (model, model_version)
 
 # --- Page Routing ---
 if st.session_state.page == 'Customer Diagnosis':
-    page_customer_diagnosis(df_data, model, explainer, sidebar_result)
+    with tracing.span('page_customer_diagnosis'):
+        page_customer_diagnosis(customers, customer_inputs, customer_index, scoring_model, explainer, sidebar_result,
+                                similarity_index, scoring_version, model_threshold, figure_cache, job_scheduler,
+                                customer_explanations, data_version, pipeline_version)
 elif st.session_state.page == 'Global Analytics':
-    page_global_analytics(df_data, sidebar_result)
\ No newline at end of file
+    with tracing.span('page_global_analytics'):
+        page_global_analytics(df_data, model_inputs, scoring_model, query_backend, filter_index,
+                              explanation_store, sketch_store, snapshot_store, figure_cache, data_version, job_scheduler,
+                              model_threshold, model_is_student=use_student)
+elif st.session_state.page == 'At-Risk Customers':
+    with tracing.span('page_risk_ranking'):
+        page_risk_ranking(customers, customer_ranking, customer_filter_index, sidebar_result)
+elif st.session_state.page == 'Data Drift':
+    with tracing.span('page_data_drift'):
+        drift_reference = get_drift_reference(model_version, loaded_model.pipeline)
+        drift_sources = [CURRENT_DATA] + [d.isoformat() for d in reversed(snapshot_store.snapshot_dates())]
+        page_data_drift(drift_reference, drift_sources,
+                        lambda source: get_drift_state(model_version, source, data_version, drift_reference),
+                        model_version)
+
+# --- Performance admin panel (hidden: add ?admin=1 to the URL, requires CHURN_TRACE=1) ---
+if tracing.ENABLED and st.query_params.get('admin') == '1':
+    render_admin_panel(tracing.span_stats(), tracing.cache_stats(), figure_cache.stats(), disk_cache.stats(),
+                       [job.summary() for job in job_scheduler.jobs()])
+tracing.flush()
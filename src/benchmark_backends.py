@@ -0,0 +1,121 @@
+# =============================================================================
+# File: src/benchmark_backends.py
+# Role: Benchmarks the pandas and DuckDB query backends on synthetic customer
+#       tables built by resampling the Telco dataset.
+#
+# Usage: python src/benchmark_backends.py --sizes 1000000 50000000
+# =============================================================================
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from tabulate import tabulate
+
+from bitmap_index import BitmapIndex
+from query_backend import DuckDBBackend, PandasBackend
+from sketches import SketchStore
+
+DATA_PATH = os.path.join('data', 'WA_Fn-UseC_-Telco-Customer-Churn.csv')
+BENCH_DIR = os.path.join('data', 'benchmark')
+
+# Filter combinations exercised by the page (one query suite per selection)
+SELECTIONS = [
+    {},
+    {'Contract': 'Month-to-month'},
+    {'Contract': 'One year', 'InternetService': 'DSL'},
+    {'Contract': 'Month-to-month', 'InternetService': 'Fiber optic', 'PaymentMethod': 'Electronic check'},
+]
+
+
+def load_base():
+    df = pd.read_csv(DATA_PATH)
+    df['TotalCharges'] = pd.to_numeric(df['TotalCharges'], errors='coerce').fillna(0)
+    return df
+
+
+def make_synthetic_parquet(base, n_rows, path, batch_size=1_000_000, seed=42):
+    """Writes `n_rows` resampled customers to Parquet batch by batch, so memory stays bounded."""
+    if os.path.exists(path):
+        return path
+    rng = np.random.default_rng(seed)
+    writer = None
+    for start in range(0, n_rows, batch_size):
+        size = min(batch_size, n_rows - start)
+        batch = base.iloc[rng.integers(0, len(base), size)].reset_index(drop=True)
+        batch['customerID'] = [f"SYN-{i:09d}" for i in range(start, start + size)]
+        table = pa.Table.from_pandas(batch, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(path + '.tmp', table.schema)
+        writer.write_table(table)
+    writer.close()
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def run_queries(backend):
+    """Runs every page query for every selection once."""
+    for selection in SELECTIONS:
+        backend.kpis(selection)
+        backend.churn_rate_by_tenure_group(selection)
+        backend.value_counts('Contract', selection)
+        backend.value_counts('gender', selection)
+        backend.churn_rate_by('InternetService', selection)
+        backend.churn_rate_by('PaymentMethod', selection)
+        backend.churn_rate_by('SeniorCitizen', selection)
+        backend.churn_rate_by('Partner', selection)
+        backend.adoption_rates(['OnlineSecurity', 'OnlineBackup', 'DeviceProtection', 'TechSupport'], selection)
+        backend.rows(['tenure', 'MonthlyCharges', 'Churn', 'TotalCharges'], selection, limit=20_000)
+
+
+def time_backend(build, repeats):
+    """Returns (setup seconds, median seconds per full query suite)."""
+    start = time.perf_counter()
+    backend = build()
+    setup = time.perf_counter() - start
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run_queries(backend)
+        timings.append(time.perf_counter() - start)
+    return setup, float(np.median(timings))
+
+
+def build_pandas(path):
+    df = pd.read_parquet(path)
+    filter_index = BitmapIndex.from_dataframe(df)
+    return PandasBackend(df, filter_index, SketchStore.from_dataframe(df))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the analytics query backends.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000, 50_000_000])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--skip-pandas-above', type=int, default=None,
+                        help="Skip the in-memory backend above this many rows (e.g. on small-RAM hosts)")
+    args = parser.parse_args()
+
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    base = load_base()
+    suite_size = len(SELECTIONS)
+
+    results = []
+    for n_rows in args.sizes:
+        path = make_synthetic_parquet(base, n_rows, os.path.join(BENCH_DIR, f"customers_{n_rows}.parquet"))
+        print(f"Benchmarking {n_rows:,} rows...")
+
+        setup, suite = time_backend(lambda: DuckDBBackend(path), args.repeats)
+        results.append(["duckdb", n_rows, setup, suite, suite / suite_size * 1000])
+
+        if args.skip_pandas_above is None or n_rows <= args.skip_pandas_above:
+            setup, suite = time_backend(lambda: build_pandas(path), args.repeats)
+            results.append(["pandas", n_rows, setup, suite, suite / suite_size * 1000])
+
+    headers = ["Backend", "Rows", "Setup (s)", "Query Suite (s)", "Per Page Render (ms)"]
+    print("\n--- Query Backend Benchmark ---")
+    print(tabulate(results, headers=headers, floatfmt=".3f", tablefmt="grid", intfmt=","))
@@ -0,0 +1,110 @@
+# =============================================================================
+# File: src/benchmark_event_stream.py
+# Role: Throughput and freshness of the customer event ingestion (event_stream.py)
+#       with the served model:
+#
+#   drain    - a backlog of events applied in micro-batches of each size:
+#              sustained events/s (read + validate + rescore + SHAP)
+#   steady   - a producer appends events at a fixed rate while the background
+#              ingestor polls: seconds from an event being written to its
+#              customer's new score being visible
+#
+# Usage: python src/benchmark_event_stream.py --events 20000 --rate 1000 --seconds 10
+# =============================================================================
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from tabulate import tabulate
+
+from benchmark_scheduler import load_serving_model
+from event_stream import EventIngestor, LiveCustomerTable, append_events, open_source, synthetic_events
+from segment_explanation import ExplanationStore
+from train import DATA_PATH
+
+BATCH_SIZES = [100, 1_000, 5_000]
+
+
+def make_table(loaded, raw):
+    features = loaded.pipeline.transform_frame(raw)
+    df = raw.copy()
+    df['TotalCharges'] = pd.to_numeric(df['TotalCharges'], errors='coerce').fillna(0)
+    store = ExplanationStore.build(loaded.model, loaded.explainer, features)
+    return LiveCustomerTable(df, features, store, pd.Index(df['customerID']), loaded.pipeline,
+                             loaded.model, loaded.explainer)
+
+
+def drain(loaded, raw, path, max_batch):
+    ingestor = EventIngestor(open_source(path), make_table(loaded, raw), max_batch=max_batch)
+    start = time.perf_counter()
+    while ingestor.run_once():
+        pass
+    elapsed = time.perf_counter() - start
+    batch_ms = [seconds * 1000 for _, seconds, _ in ingestor.recent]
+    return {
+        'log': os.path.splitext(path)[1],
+        'batch size': max_batch,
+        'events': ingestor.totals['events'],
+        'events/s': ingestor.totals['events'] / elapsed,
+        'batch p50 ms': np.percentile(batch_ms, 50),
+        'batch max ms': max(batch_ms),
+    }
+
+
+def steady(loaded, raw, path, rate, seconds, seed=0):
+    """Producer at `rate` events/s for `seconds`, ingestor on its background thread."""
+    ingestor = EventIngestor(open_source(path), make_table(loaded, raw)).start()
+    rng = np.random.default_rng(seed)
+    customer_ids = raw['customerID'].to_numpy()
+    tick = 0.1
+    start = time.perf_counter()
+    produced = 0
+    while time.perf_counter() - start < seconds:
+        batch = int(rate * tick)
+        append_events(path, synthetic_events(customer_ids, batch, rng))
+        produced += batch
+        time.sleep(max(0.0, start + (produced / rate) - time.perf_counter()))
+    # Wait for the backlog to drain
+    while ingestor.totals['events'] < produced:
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    ingestor.stop()
+    lags = [lag for _, _, lag in ingestor.recent]
+    return {
+        'log': os.path.splitext(path)[1],
+        'target events/s': rate,
+        'sustained events/s': produced / elapsed,
+        'batches': ingestor.totals['batches'],
+        'freshness p50 s': np.percentile(lags, 50),
+        'freshness max s': max(lags),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Customer event ingestion benchmark.")
+    parser.add_argument('--events', type=int, default=20_000, help="Backlog size for the drain runs")
+    parser.add_argument('--rate', type=float, default=1_000, help="Producer rate for the steady run (events/s)")
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    loaded = load_serving_model()
+    raw = pd.read_csv(DATA_PATH)
+    customer_ids = raw['customerID'].to_numpy()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        drains, steadies = [], []
+        for extension in ('.jsonl', '.db'):
+            path = os.path.join(scratch, f"backlog{extension}")
+            append_events(path, synthetic_events(customer_ids, args.events, np.random.default_rng(42)))
+            drains.extend(drain(loaded, raw, path, max_batch) for max_batch in BATCH_SIZES)
+            steadies.append(steady(loaded, raw, os.path.join(scratch, f"live{extension}"), args.rate, args.seconds))
+
+    print(f"Drain of {args.events:,} events (model {loaded.version})")
+    print(tabulate(drains, headers="keys", floatfmt=",.1f", tablefmt="grid"))
+    print(f"\nSteady producer at {args.rate:,.0f} events/s for {args.seconds:.0f}s")
+    print(tabulate(steadies, headers="keys", floatfmt=",.2f", tablefmt="grid"))
@@ -0,0 +1,108 @@
+# =============================================================================
+# File: src/benchmark_quantized_store.py
+# Role: Footprint, accuracy and query time of the quantized explanation store
+#       encodings against the exact float64 SHAP matrix, on customers resampled
+#       from the Telco dataset.
+#
+# Usage: python src/benchmark_quantized_store.py --rows 200000 [--top-k 6 --topk-tolerance 0.3]
+# =============================================================================
+
+import argparse
+import os
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from tabulate import tabulate
+
+from benchmark_scheduler import full_table, load_serving_model
+from quantized_store import ENCODINGS, TOPK_TOLERANCE, QuantizationError, QuantizedExplanationStore
+from segment_explanation import ExplanationStore
+from train import DATA_PATH
+
+# Segments queried (contract types), as selected in the sidebar
+SEGMENTS = ['Month-to-month', 'One year', 'Two year']
+
+
+def exact_matrices(loaded, table, chunk_size=50_000):
+    shap_matrix = np.empty(table.shape, dtype=np.float64)
+    probabilities = np.empty(len(table), dtype=np.float64)
+    for start in range(0, len(table), chunk_size):
+        chunk = table.iloc[start:start + chunk_size]
+        shap_matrix[start:start + len(chunk)] = loaded.explainer.shap_values(chunk)
+        probabilities[start:start + len(chunk)] = loaded.model.predict_proba(chunk)[:, 1]
+    return shap_matrix, probabilities
+
+
+def query_seconds(store, masks, repeat=3):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for mask in masks:
+            store.explain_segment(mask)
+            store.probability_distribution(mask)
+    return (time.perf_counter() - start) / (repeat * len(masks))
+
+
+def top_features_agree(store, reference, masks, top_n=5):
+    """Share of segments whose top-n features (by mean |SHAP|) match the exact ranking."""
+    return np.mean([
+        store.explain_segment(mask)['feature'].head(top_n).tolist()
+        == reference.explain_segment(mask)['feature'].head(top_n).tolist()
+        for mask in masks
+    ])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Quantized explanation store footprint and accuracy.")
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--top-k', type=int, default=6)
+    parser.add_argument('--topk-tolerance', type=float, default=TOPK_TOLERANCE,
+                        help="Largest |SHAP| the topk encoding may drop")
+    args = parser.parse_args()
+
+    loaded = load_serving_model()
+    table = full_table(loaded.pipeline.transform_frame(pd.read_csv(DATA_PATH)), args.rows)
+    masks = [(table['Contract'] == contract).to_numpy() for contract in SEGMENTS]
+
+    print(f"Explaining {args.rows:,} customers...")
+    shap_matrix, probabilities = exact_matrices(loaded, table)
+    base_value = float(np.ravel(loaded.explainer.expected_value)[0])
+    exact = ExplanationStore(shap_matrix.astype(np.float32), probabilities.astype(np.float32),
+                             table.columns, base_value)
+
+    rows = [{
+        'encoding': 'float32 (exact store)',
+        'MB': (exact.shap_matrix.nbytes + exact.probabilities.nbytes) / 2 ** 20,
+        'vs float64': (shap_matrix.nbytes + probabilities.nbytes) / (exact.shap_matrix.nbytes + exact.probabilities.nbytes),
+        'max SHAP error': float(np.abs(exact.shap_matrix - shap_matrix).max()),
+        'error bound': np.nan,
+        'top-5 agree': 1.0,
+        'segment query ms': query_seconds(exact, masks) * 1000,
+    }]
+    with tempfile.TemporaryDirectory() as scratch:
+        for encoding in ENCODINGS:
+            name = f"{encoding} (k={args.top_k})" if encoding == 'topk' else encoding
+            try:
+                store = QuantizedExplanationStore.from_exact(shap_matrix, probabilities, table.columns, base_value,
+                                                             encoding, args.top_k, args.topk_tolerance)
+            except QuantizationError as exc:
+                print(f"{name}: {exc}")
+                continue
+            # Query it the way the dashboard does: memory-mapped from its cache file
+            path = os.path.join(scratch, f"{encoding}.joblib")
+            joblib.dump(store, path)
+            mapped = joblib.load(path, mmap_mode='r')
+            rows.append({
+                'encoding': name,
+                'MB': store.nbytes / 2 ** 20,
+                'vs float64': store.exact_nbytes / store.nbytes,
+                'max SHAP error': float(store.max_errors.max()),
+                'error bound': float(store.error_bounds.max()),
+                'top-5 agree': top_features_agree(mapped, exact, masks),
+                'segment query ms': query_seconds(mapped, masks) * 1000,
+            })
+            del mapped
+
+    print(tabulate(rows, headers="keys", floatfmt=".4g", tablefmt="grid"))
@@ -0,0 +1,157 @@
+# =============================================================================
+# File: src/benchmark_scheduler.py
+# Role: Measures interactive latency (one customer's predict_proba + SHAP, as on
+#       the Customer Diagnosis page) while a full-table what-if rescoring runs in
+#       the same process:
+#
+#   idle         - no background work
+#   scheduled    - background rescoring as a chunked bulk job on the JobScheduler
+#   unscheduled  - the same rescoring on plain threads (what the page did before)
+#
+# Usage: python src/benchmark_scheduler.py --rows 200000 --requests 300 [--budget-ms 60]
+# =============================================================================
+
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import shap
+from tabulate import tabulate
+
+from feature_pipeline import FeaturePipeline
+from job_scheduler import JobScheduler
+from model_registry import ModelRegistry, ModelWatcher
+from train import DATA_PATH
+from what_if import simulate_segment_steps
+
+SCENARIO = {'Contract': 'Two year'}
+# The unscheduled rescoring splits the table across this many threads, in large chunks
+UNSCHEDULED_THREADS = 4
+UNSCHEDULED_CHUNK_SIZE = 50_000
+
+
+def load_serving_model():
+    """The model, explainer and pipeline the dashboard would serve."""
+    return ModelWatcher(ModelRegistry(), shap.TreeExplainer,
+                        default_pipeline=lambda: FeaturePipeline().fit(pd.read_csv(DATA_PATH))).poll()
+
+
+def full_table(features, n_rows, seed=42):
+    """`n_rows` customers resampled from the model inputs."""
+    rng = np.random.default_rng(seed)
+    return features.iloc[rng.integers(0, len(features), n_rows)].reset_index(drop=True)
+
+
+def interactive_latencies(loaded, features, n_requests, interval_s, scheduler=None, seed=0):
+    """Wall time (ms) of each single-customer score + explanation."""
+    run = scheduler.run_interactive if scheduler is not None else (lambda func, *args: func(*args))
+    rng = np.random.default_rng(seed)
+    latencies = []
+    for position in rng.integers(0, len(features), n_requests):
+        row = features.iloc[position].to_numpy(dtype=object)[None, :]
+        start = time.perf_counter()
+        run(loaded.model.predict_proba, row)
+        run(loaded.explainer.shap_values, row)
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(interval_s)
+    return np.asarray(latencies)
+
+
+def run_scheduled(loaded, table, scheduler, stop, chunk_size):
+    """Keeps full-table bulk jobs running until `stop` is set; returns the rows rescored."""
+    mask = np.ones(len(table), dtype=bool)
+    rows = 0
+    while not stop.is_set():
+        job = scheduler.submit(simulate_segment_steps, (loaded.model, table, mask, SCENARIO),
+                               {'chunk_size': chunk_size}, name='full_table_what_if')
+        while not job.done():
+            if stop.wait(0.05):
+                job.cancel()
+        rows += job.done_steps
+    return rows
+
+
+def drain(steps):
+    """Runs a chunked job to completion without a scheduler; returns its result."""
+    while True:
+        try:
+            next(steps)
+        except StopIteration as done:
+            return done.value
+
+
+def run_unscheduled(loaded, table, stop):
+    """The same rescoring on plain threads, never pausing for interactive calls; returns the rows rescored."""
+    masks = []
+    for part in np.array_split(np.arange(len(table)), UNSCHEDULED_THREADS):
+        mask = np.zeros(len(table), dtype=bool)
+        mask[part] = True
+        masks.append(mask)
+    rescore = lambda mask: drain(simulate_segment_steps(loaded.model, table, mask, SCENARIO,
+                                                        chunk_size=UNSCHEDULED_CHUNK_SIZE))
+    rows = 0
+    with ThreadPoolExecutor(max_workers=UNSCHEDULED_THREADS) as pool:
+        while not stop.is_set():
+            list(pool.map(rescore, masks))
+            rows += len(table)
+    return rows
+
+
+def measure(name, loaded, features, args, background=None, scheduler=None):
+    stop = threading.Event()
+    rows = {}
+    thread = None
+    if background is not None:
+        thread = threading.Thread(target=lambda: rows.setdefault('rows', background(stop)), daemon=True)
+        thread.start()
+        time.sleep(0.5)  # let the background job get going
+    start = time.perf_counter()
+    latencies = interactive_latencies(loaded, features, args.requests, args.interval_ms / 1000, scheduler)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    if thread is not None:
+        thread.join()
+    return {
+        'scenario': name,
+        'p50_ms': np.percentile(latencies, 50),
+        'p95_ms': np.percentile(latencies, 95),
+        'p99_ms': np.percentile(latencies, 99),
+        'max_ms': latencies.max(),
+        'bulk_rows_per_s': rows.get('rows', 0) / elapsed,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Interactive latency under a background full-table job.")
+    parser.add_argument('--rows', type=int, default=200_000, help="Rows of the background table")
+    parser.add_argument('--requests', type=int, default=300, help="Interactive requests per scenario")
+    parser.add_argument('--interval-ms', type=float, default=20, help="Pause between interactive requests")
+    parser.add_argument('--chunk-size', type=int, default=2_000, help="Rows per bulk chunk")
+    parser.add_argument('--budget-ms', type=float, help="Exit with status 1 if the scheduled p99 exceeds this")
+    args = parser.parse_args()
+
+    loaded = load_serving_model()
+    features = loaded.pipeline.transform_frame(pd.read_csv(DATA_PATH))
+    table = full_table(features, args.rows)
+    scheduler = JobScheduler()
+
+    results = [
+        measure('idle', loaded, features, args, scheduler=scheduler),
+        measure('scheduled', loaded, features, args, scheduler=scheduler,
+                background=lambda stop: run_scheduled(loaded, table, scheduler, stop, args.chunk_size)),
+        measure('unscheduled', loaded, features, args,
+                background=lambda stop: run_unscheduled(loaded, table, stop)),
+    ]
+    print(f"Interactive latency with a {args.rows:,}-row background rescoring "
+          f"(model {loaded.version}, {args.requests} requests per scenario)")
+    print(tabulate(results, headers="keys", floatfmt=".1f", tablefmt="grid"))
+    print(f"Bulk pauses: {scheduler.bulk_pauses} ({scheduler.bulk_paused_s:.1f}s)")
+
+    scheduled_p99 = results[1]['p99_ms']
+    if args.budget_ms is not None and scheduled_p99 > args.budget_ms:
+        print(f"❌ Scheduled p99 {scheduled_p99:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
@@ -0,0 +1,134 @@
+# =============================================================================
+# File: src/bitmap_index.py
+# Role: Precomputed bitmap indexes used to resolve sidebar filter combinations.
+# =============================================================================
+
+import numpy as np
+import pandas as pd
+
+# --- Filterable dimensions ---
+# Adding a new filter only means adding its column here (and a widget in the
+# sidebar): the cost of a query stays one AND per active filter.
+FILTER_COLUMNS = ['Contract', 'InternetService', 'PaymentMethod', 'SeniorCitizen', 'gender', 'TenureBand']
+
+# Sidebar tuple order -> column name
+SIDEBAR_FILTER_COLUMNS = ['Contract', 'InternetService', 'PaymentMethod']
+
+# Tenure bands (months) shared by the TenureBand filter and the churn-by-tenure chart of
+# every query backend. Right-closed, with the first band also holding tenure 0 (new customers).
+TENURE_BINS = [0, 12, 24, 36, 48, 72]
+TENURE_LABELS = ['0-12', '12-24', '24-36', '36-48', '48+']
+
+# Number of set bits for every possible byte value
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def tenure_band(tenure):
+    """Maps tenure (months) to its TENURE_BINS band, as an ordered categorical."""
+    return pd.cut(tenure, bins=TENURE_BINS, labels=TENURE_LABELS, include_lowest=True)
+
+
+def add_derived_columns(df):
+    """Adds the derived filter dimensions (e.g. TenureBand) to a dataframe copy."""
+    df = df.copy()
+    df['TenureBand'] = tenure_band(df['tenure']).astype(str)
+    return df
+
+
+def filters_to_selection(filters):
+    """Converts the sidebar filter tuple into a {column: value} dict, dropping 'All'."""
+    return {
+        column: value
+        for column, value in zip(SIDEBAR_FILTER_COLUMNS, filters)
+        if value != 'All'
+    }
+
+
+def popcount(bits):
+    """Counts the set bits of a packed bitset."""
+    return int(_POPCOUNT_TABLE[bits].sum(dtype=np.int64))
+
+
+class BitmapIndex:
+    """
+    One packed bitset (8 rows per byte) per distinct value of each filterable column.
+    A filter combination is resolved by AND-ing the bitsets of the selected values.
+    """
+
+    def __init__(self, n_rows, bitmaps):
+        self.n_rows = n_rows
+        self.bitmaps = bitmaps
+        self._all = np.packbits(np.ones(n_rows, dtype=bool))
+        self._empty = np.zeros_like(self._all)
+
+    @classmethod
+    def from_dataframe(cls, df, columns=FILTER_COLUMNS):
+        """Builds the index for every column in `columns` (derived columns are added if missing)."""
+        if 'TenureBand' in columns and 'TenureBand' not in df.columns:
+            df = add_derived_columns(df)
+
+        bitmaps = {}
+        for column in columns:
+            codes, uniques = pd.factorize(df[column], sort=True)
+            bitmaps[column] = {
+                value: np.packbits(codes == code)
+                for code, value in enumerate(uniques.tolist())
+            }
+        return cls(len(df), bitmaps)
+
+    def updated(self, df, positions, columns):
+        """
+        Copy of the index with the rows at `positions` re-read from `df`, after a
+        change to `columns`. Bitsets of unaffected columns are shared with this index.
+        """
+        affected = [column for column in self.bitmaps
+                    if column in columns or (column == 'TenureBand' and 'tenure' in columns)]
+        if not affected:
+            return self
+        rows = df.iloc[positions]
+        if 'TenureBand' in affected:
+            rows = add_derived_columns(rows)
+
+        bitmaps = dict(self.bitmaps)
+        for column in affected:
+            values = rows[column].to_numpy()
+            column_bitmaps = {}
+            for value in [*self.bitmaps[column], *pd.unique(values).tolist()]:
+                if value in column_bitmaps:
+                    continue
+                bits = self.bitmaps[column].get(value)
+                mask = np.unpackbits(bits, count=self.n_rows).astype(bool) if bits is not None \
+                    else np.zeros(self.n_rows, dtype=bool)
+                mask[positions] = values == value
+                column_bitmaps[value] = np.packbits(mask)
+            bitmaps[column] = column_bitmaps
+        return BitmapIndex(self.n_rows, bitmaps)
+
+    def values(self, column):
+        """Returns the distinct indexed values of a column."""
+        return list(self.bitmaps[column].keys())
+
+    def query(self, selection):
+        """Returns the packed bitset of rows matching every {column: value} in `selection`."""
+        if not selection:
+            return self._all
+
+        bitsets = []
+        for column, value in selection.items():
+            bitset = self.bitmaps[column].get(value)
+            if bitset is None:
+                return self._empty
+            bitsets.append(bitset)
+        return np.bitwise_and.reduce(bitsets)
+
+    def count(self, selection):
+        """Number of rows matching a filter combination."""
+        return popcount(self.query(selection))
+
+    def mask(self, selection):
+        """Boolean row mask for a filter combination."""
+        return np.unpackbits(self.query(selection), count=self.n_rows).astype(bool)
+
+    def nbytes(self):
+        """Memory used by all bitsets."""
+        return sum(bits.nbytes for column in self.bitmaps.values() for bits in column.values())
@@ -1,84 +1,179 @@
 # ====== INSTALL LIBRARIES (uncomment if needed) ======
 # pip install pandas scikit-learn xgboost lightgbm catboost
+#
+# Usage: python src/comparison.py --folds 5 --workers 3 [--force cv_XGBoost]
+#
+# Features are encoded once into compact integer/float arrays; each library's
+# k-fold CV is then an independent branch of a cached pipeline (pipeline_runner.py).
+# Branches run concurrently, with each library's thread count capped so
+# branches x threads <= cores, and only branches whose inputs changed re-run.
 
-import pandas as pd
+import argparse
+import os
 import time
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, f1_score
-from sklearn.preprocessing import LabelEncoder
-import xgboost as xgb
-import lightgbm as lgb
-from catboost import CatBoostClassifier
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import StratifiedKFold
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
 from tabulate import tabulate
+from threshold_eval import threshold_sweep, summarize, SUMMARY_HEADERS
+from feature_pipeline import FeaturePipeline
+from pipeline_runner import PipelineRunner, Stage
+
+DATA_PATH = os.path.join("data", "WA_Fn-UseC_-Telco-Customer-Churn.csv")
+LIBRARIES = ["XGBoost", "LightGBM", "CatBoost"]
+
+
+# ====== 1. LOAD & ENCODE ONCE ======
+def load_encoded(path=DATA_PATH):
+    """
+    Returns (codes, numeric, y, feature_names): categoricals as int8 category codes
+    (sorted vocabularies, like LabelEncoder) and numerics as float32, both from the
+    same FeaturePipeline that train.py saves with the model.
+    """
+    df = pd.read_csv(path)
+    y = (df["Churn"] == "Yes").to_numpy(dtype=np.int8)
+    pipeline = FeaturePipeline().fit(df)
+    codes, numeric = pipeline.encode(df)
+    return codes, numeric, y, pipeline.categorical + pipeline.numeric
+
+
+# ====== 2. FOLD FITS ======
+def _make_model(library, n_threads):
+    if library == "XGBoost":
+        import xgboost as xgb
+        return xgb.XGBClassifier(n_estimators=300, learning_rate=0.1, max_depth=6,
+                                 random_state=42, n_jobs=n_threads)
+    if library == "LightGBM":
+        import lightgbm as lgb
+        return lgb.LGBMClassifier(n_estimators=300, learning_rate=0.1, max_depth=-1,
+                                  random_state=42, n_jobs=n_threads, verbose=-1)
+    from catboost import CatBoostClassifier
+    return CatBoostClassifier(iterations=300, learning_rate=0.1, depth=6,
+                              random_state=42, verbose=False, thread_count=n_threads)
+
+
+def _features(library, encoded, rows):
+    codes, numeric, _, feature_names = encoded
+    codes, numeric = codes[rows], numeric[rows]
+    if library == "CatBoost":
+        # CatBoost needs integer categorical columns, so keep them out of the float matrix
+        frame = pd.DataFrame(codes, columns=feature_names[:codes.shape[1]])
+        for i, name in enumerate(feature_names[codes.shape[1]:]):
+            frame[name] = numeric[:, i]
+        return frame
+    return np.hstack([codes.astype(np.float32), numeric])
+
+
+def run_fold(library, fold, encoded, train_idx, test_idx, n_threads):
+    """Fits one library on one fold; returns metrics, timings and the fold's probabilities."""
+    model = _make_model(library, n_threads)
+    y = encoded[2]
+    fit_params = {"cat_features": list(range(encoded[0].shape[1]))} if library == "CatBoost" else {}
+
+    X_train, X_test = _features(library, encoded, train_idx), _features(library, encoded, test_idx)
+    start = time.perf_counter()
+    model.fit(X_train, y[train_idx], **fit_params)
+    fit_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    proba = model.predict_proba(X_test)[:, 1]
+    predict_s = time.perf_counter() - start
+
+    preds = (proba >= 0.5).astype(np.int8)
+    return {
+        "library": library,
+        "fold": fold,
+        "test_idx": test_idx,
+        "proba": proba,
+        "accuracy": accuracy_score(y[test_idx], preds),
+        "f1": f1_score(y[test_idx], preds, pos_label=1),
+        "auc": roc_auc_score(y[test_idx], proba),
+        "fit_s": fit_s,
+        "predict_s": predict_s,
+    }
+
+
+def make_folds(encode, n_folds, random_state=42):
+    codes, _, y, _ = encode
+    return list(StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=random_state).split(codes, y))
+
+
+def cross_validate(encode, folds, library, n_threads=1):
+    """All folds of one library: one independent branch of the comparison pipeline."""
+    return [run_fold(library, fold, encode, train_idx, test_idx, n_threads)
+            for fold, (train_idx, test_idx) in enumerate(folds)]
+
+
+# ====== 3. CROSS-VALIDATED COMPARISON ======
+def comparison_stages(n_folds=5, libraries=LIBRARIES, path=DATA_PATH, n_threads=1):
+    """encode -> folds -> one cv_<library> branch per library (cached separately)."""
+    return [
+        Stage("encode", load_encoded, params={"path": path}, files=[path]),
+        Stage("folds", make_folds, inputs=["encode"], params={"n_folds": n_folds}),
+    ] + [
+        Stage(f"cv_{library}", cross_validate, inputs=["encode", "folds"], params={"library": library},
+              options={"n_threads": n_threads})
+        for library in libraries
+    ]
+
+
+def compare(n_folds=5, n_workers=None, libraries=LIBRARIES, path=DATA_PATH, force=()):
+    """
+    Runs k-fold CV for every library, the library branches concurrently, each fit
+    capped so branches x threads <= cores. Branches whose inputs did not change are
+    read from the pipeline cache. Returns (per-fold results, out-of-fold probabilities
+    per library, y, wall time in seconds).
+    """
+    cores = os.cpu_count() or 1
+    n_workers = min(n_workers or cores, len(libraries))
+    n_threads = max(1, cores // n_workers)
+
+    start = time.perf_counter()
+    runner = PipelineRunner(comparison_stages(n_folds, libraries, path, n_threads))
+    outputs = runner.run(workers=n_workers, force=force)
+    wall_s = time.perf_counter() - start
+
+    y = outputs["encode"][2]
+    results = [result for library in libraries for result in outputs[f"cv_{library}"]]
+    oof = {library: np.zeros(len(y)) for library in libraries}
+    for result in results:
+        oof[result["library"]][result["test_idx"]] = result["proba"]
+    print(f"{len(libraries)} libraries x {n_folds} folds on {n_workers} branches x {n_threads} threads "
+          f"in {wall_s:.2f}s (sum of fit times {sum(r['fit_s'] for r in results):.2f}s)")
+    return results, oof, y, wall_s
+
+
+def summary_table(results, libraries=LIBRARIES):
+    """One row per library with mean±std of each metric and timing across folds."""
+    frame = pd.DataFrame([{k: v for k, v in r.items() if k not in ("test_idx", "proba")} for r in results])
+    rows = []
+    for library in libraries:
+        folds = frame[frame["library"] == library]
+        rows.append([library] + [
+            f"{folds[col].mean():.4f} ± {folds[col].std():.4f}"
+            for col in ("accuracy", "f1", "auc", "fit_s", "predict_s")
+        ])
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-validated comparison of XGBoost, LightGBM and CatBoost.")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent library branches (default: one per core)")
+    parser.add_argument("--force", nargs="*", default=[], help="Stages to re-run even when cached")
+    args = parser.parse_args()
+
+    results, oof, y, wall_s = compare(args.folds, args.workers, force=args.force)
+
+    # ====== 4. DISPLAY RESULTS ======
+    headers = ["Model", "Accuracy", "F1 Score", "ROC AUC", "Fit Time (s)", "Predict Time (s)"]
+    print(f"\n--- Model Comparison ({args.folds}-fold CV, mean ± std) ---")
+    print(tabulate(summary_table(results), headers=headers, tablefmt="grid"))
 
-# ====== 1. LOAD DATA ======
-df = pd.read_csv(r"data\WA_Fn-UseC_-Telco-Customer-Churn.csv")  # change filename if needed
-
-# Clean TotalCharges (convert to numeric, handle missing)
-df["TotalCharges"] = pd.to_numeric(df["TotalCharges"], errors="coerce")
-df["TotalCharges"].fillna(df["TotalCharges"].median(), inplace=True)
-
-# Drop customerID (not useful)
-df.drop("customerID", axis=1, inplace=True)
-
-# ====== 2. SPLIT FEATURES / TARGET ======
-X = df.drop("Churn", axis=1)
-y = df["Churn"]
-
-# Encode target variable
-le_y = LabelEncoder()
-y = le_y.fit_transform(y)
-
-# ====== 3. TRAIN/TEST SPLIT ======
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, stratify=y, random_state=42
-)
-
-# ====== 4. ENCODING FOR XGBOOST & LIGHTGBM ======
-# Copy to avoid affecting CatBoost
-X_train_enc = X_train.copy()
-X_test_enc = X_test.copy()
-
-label_encoders = {}
-for col in X_train_enc.columns:
-    if X_train_enc[col].dtype == "object":
-        le = LabelEncoder()
-        X_train_enc[col] = le.fit_transform(X_train_enc[col])
-        X_test_enc[col] = le.transform(X_test_enc[col])
-        label_encoders[col] = le
-
-# ====== 5. TRAIN & EVALUATE ======
-
-results = []
-def evaluate_model(name, model, X_train, y_train, X_test, y_test, **fit_params):
-    start = time.time()
-    model.fit(X_train, y_train, **fit_params)
-    end = time.time()
-    preds = model.predict(X_test)
-    acc = accuracy_score(y_test, preds)
-    f1 = f1_score(y_test, preds, pos_label=1)
-    results.append([name, acc, f1, end - start])
-
-# XGBoost
-xgb_model = xgb.XGBClassifier(
-    n_estimators=300, learning_rate=0.1, max_depth=6, random_state=42, n_jobs=-1
-)
-evaluate_model("XGBoost", xgb_model, X_train_enc, y_train, X_test_enc, y_test)
-
-# LightGBM
-lgb_model = lgb.LGBMClassifier(
-    n_estimators=300, learning_rate=0.1, max_depth=-1, random_state=42, n_jobs=-1
-)
-evaluate_model("LightGBM", lgb_model, X_train_enc, y_train, X_test_enc, y_test)
-
-# CatBoost
-cat_features = [i for i, col in enumerate(X_train.columns) if X_train[col].dtype == "object"]
-cat_model = CatBoostClassifier(
-    iterations=300, learning_rate=0.1, depth=6, random_state=42, verbose=False
-)
-evaluate_model("CatBoost", cat_model, X_train, y_train, X_test, y_test, cat_features=cat_features)
-
-# ====== 6. DISPLAY RESULTS ======
-headers = ["Model", "Accuracy", "F1 Score", "Training Time (s)"]
-print("\n--- Model Comparison ---")
-print(tabulate(results, headers=headers, floatfmt=".4f", tablefmt="grid"))
+    # ====== 5. THRESHOLD SWEEP ======
+    # All models are evaluated at every cutoff on their out-of-fold probabilities
+    sweep = threshold_sweep(y, list(oof.values()), model_names=list(oof))
+    print("\n--- Best F1 Threshold per Model (out-of-fold) ---")
+    print(tabulate(summarize(sweep), headers=SUMMARY_HEADERS, floatfmt=".4f", tablefmt="grid"))
@@ -1,13 +1,29 @@
+import numpy as np
 import streamlit as st
 import pandas as pd
 import shap
 import matplotlib.pyplot as plt
 from streamlit_shap import st_shap
+import tracing
+from shap_waterfall import build_waterfall_figure
 
-def page_customer_diagnosis(df_data, model, explainer, selected_customer_id):
+EXPLANATION_CHARTS = ["Waterfall (fast)", "Force plot (interactive)"]
+
+def page_customer_diagnosis(df_data, model_inputs, customer_index, model, explainer, selected_customer_id,
+                            similarity_index, model_version='legacy', threshold=0.5, figure_cache=None,
+                            scheduler=None, explanation_store=None, data_version=None, pipeline_version=None):
     """
     Displays the page for diagnosing a single customer.
+    `model_inputs` holds the FeaturePipeline output aligned with `df_data` (the display
+    frame), and `customer_index` maps customer IDs to row positions. Scoring and SHAP
+    run on the interactive pool of `scheduler` (a JobScheduler), ahead of bulk jobs.
+    With `explanation_store` (built by `explainer`'s model on `model_inputs`), the
+    customer's SHAP values are read from it instead of being computed.
+    `data_version` and `pipeline_version` (FeaturePipeline.fingerprint) key the cached
+    waterfall together with the model version.
     """
+    run = scheduler.run_interactive if scheduler is not None else (lambda func, *args: func(*args))
+
     # Professional header
     st.markdown("""
     <div class="main-header">
@@ -23,14 +39,19 @@ def page_customer_diagnosis(df_data, model, explainer, selected_customer_id):
     </div>
     """, unsafe_allow_html=True)
 
-    # Retrieving the data row for the selected customer
-    client_info = df_data[df_data['customerID'] == selected_customer_id]
+    # Retrieving the data row for the selected customer (display values)
+    position = customer_index.get_loc(selected_customer_id)
+    client_info = df_data.iloc[position]
 
-    # Preprocess the customer data for prediction
-    prediction_features = client_info.drop(columns=['customerID', 'Churn'])
+    # Model input row, already validated and encoded by the pipeline: a (1, n_features)
+    # object array goes straight to CatBoost and SHAP without a per-request DataFrame
+    feature_names = model_inputs.columns
+    feature_values = model_inputs.iloc[position].to_numpy(dtype=object)
+    prediction_features = feature_values[None, :]
 
     # Make prediction
-    churn_probability = model.predict_proba(prediction_features)[0][1]
+    with tracing.span('predict_proba'):
+        churn_probability = run(model.predict_proba, prediction_features)[0][1]
 
     # Professional prediction display
     st.markdown(f"""
@@ -44,7 +65,7 @@ def page_customer_diagnosis(df_data, model, explainer, selected_customer_id):
     """, unsafe_allow_html=True)
 
     # Status indicator
-    if churn_probability > 0.5:
+    if churn_probability >= threshold:
         st.markdown("""
         <div class="status-high-risk">
             🔴 HIGH RISK: This customer is likely to churn - Immediate intervention recommended
@@ -62,13 +83,14 @@ def page_customer_diagnosis(df_data, model, explainer, selected_customer_id):
 
     # Left column: Model information
     with col1:
-        st.markdown("""
+        st.markdown(f"""
         <div class="info-card">
             <h4 style="color: #0059b3; margin-bottom: 1rem;">🤖 Model Information</h4>
             <p style="color: #2c3e50;"><strong>Algorithm:</strong> CatBoost Gradient Boosting</p>
             <p style="color: #2c3e50;"><strong>Prediction Type:</strong> Binary Classification</p>
             <p style="color: #2c3e50;"><strong>Confidence Level:</strong> High Accuracy Model</p>
-            <p style="color: #2c3e50;"><strong>Last Updated:</strong> Current Session</p>
+            <p style="color: #2c3e50;"><strong>Model Version:</strong> {model_version}</p>
+            <p style="color: #2c3e50;"><strong>High-Risk Threshold:</strong> {threshold:.0%}</p>
         </div>
         """, unsafe_allow_html=True)
 
@@ -81,11 +103,11 @@ def page_customer_diagnosis(df_data, model, explainer, selected_customer_id):
         
         # Display key customer metrics in a clean format
         key_metrics = {
-            'Gender': client_info['gender'].iloc[0],
-            'Contract Type': client_info['Contract'].iloc[0],
-            'Monthly Charges': f"${client_info['MonthlyCharges'].iloc[0]:.2f}",
-            'Tenure (Months)': client_info['tenure'].iloc[0],
-            'Total Charges': f"${client_info['TotalCharges'].iloc[0]:.2f}"
+            'Gender': client_info['gender'],
+            'Contract Type': client_info['Contract'],
+            'Monthly Charges': f"${client_info['MonthlyCharges']:.2f}",
+            'Tenure (Months)': client_info['tenure'],
+            'Total Charges': f"${client_info['TotalCharges']:.2f}"
         }
         
         for key, value in key_metrics.items():
@@ -100,22 +122,49 @@ def page_customer_diagnosis(df_data, model, explainer, selected_customer_id):
     </div>
     """, unsafe_allow_html=True)
 
-    # Calculate SHAP values for the selected customer
-    shap_values = explainer.shap_values(prediction_features)
+    # SHAP values of the selected customer: stored (possibly quantized) row, or computed
+    with tracing.span('shap_values'):
+        if explanation_store is not None:
+            shap_values = explanation_store.shap_rows([position])
+            base_value = explanation_store.base_value
+        else:
+            shap_values = run(explainer.shap_values, prediction_features)
+            # The explainer holds a 1-element array until shap_values has run once
+            base_value = float(np.ravel(explainer.expected_value)[0])
 
     # --- Display SHAP Force Plot ---
     st.markdown('<h3 style="color: #0059b3;">📈 Factor Contribution Visualization</h3>', unsafe_allow_html=True)
     
-    with st.container():
-        # Generate the SHAP force plot as a SHAP object
-        force_plot = shap.force_plot(
-            base_value=explainer.expected_value,
-            shap_values=shap_values[0, :],
-            features=prediction_features.iloc[0, :]
-        )
-        
-        # Use st_shap to display the interactive plot
-        st_shap(force_plot, height=200)
+    explanation_chart = st.radio("Chart", EXPLANATION_CHARTS, horizontal=True, key='explanation_chart',
+                                 label_visibility="collapsed")
+
+    if explanation_chart == EXPLANATION_CHARTS[0]:
+        # Native Plotly waterfall: a small JSON payload, cached per (customer, model version,
+        # data file, feature pipeline) and, for live stores (event_stream.py), per update of
+        # the customer's row
+        with st.container(), tracing.span('shap_waterfall'):
+            build = lambda: build_waterfall_figure(
+                shap_values[0, :], feature_names, feature_values, base_value
+            )
+            chart_key = {'customerID': selected_customer_id, 'data_version': data_version,
+                         'pipeline_version': pipeline_version}
+            if hasattr(explanation_store, 'row_version'):
+                chart_key['row_version'] = explanation_store.row_version(position)
+            fig = figure_cache.get_or_build(
+                'shap_waterfall', chart_key, model_version, build
+            ) if figure_cache is not None else build()
+            st.plotly_chart(fig, use_container_width=True)
+    else:
+        with st.container(), tracing.span('shap_force_plot'):
+            # Generate the SHAP force plot as a SHAP object
+            force_plot = shap.force_plot(
+                base_value=base_value,
+                shap_values=shap_values[0, :],
+                features=pd.Series(feature_values, index=feature_names)
+            )
+
+            # Use st_shap to display the interactive plot (embeds SHAP's JS bundle)
+            st_shap(force_plot, height=200)
 
     # Enhanced explanation section
     st.markdown("""
@@ -129,7 +178,7 @@ def page_customer_diagnosis(df_data, model, explainer, selected_customer_id):
             <li><strong>Final Prediction:</strong> Combined effect of all factors</li>
         </ul>
     </div>
-    """.format(explainer.expected_value), unsafe_allow_html=True)
+    """.format(base_value), unsafe_allow_html=True)
 
     # --- Generate Enhanced Text-Based Explanation ---
     st.markdown("""
@@ -139,8 +188,6 @@ def page_customer_diagnosis(df_data, model, explainer, selected_customer_id):
     """, unsafe_allow_html=True)
     
     # Create a DataFrame for easier analysis
-    feature_names = prediction_features.columns
-    feature_values = prediction_features.iloc[0].values
     shap_df = pd.DataFrame({
         'feature': feature_names,
         'value': feature_values,
@@ -153,7 +200,6 @@ def page_customer_diagnosis(df_data, model, explainer, selected_customer_id):
     positive_contributors = shap_df[shap_df['shap_value'] > 0]
     negative_contributors = shap_df[shap_df['shap_value'] < 0]
 
-    base_value = explainer.expected_value
     final_prediction = churn_probability
 
     col1, col2 = st.columns(2, gap="large")
@@ -195,6 +241,28 @@ def page_customer_diagnosis(df_data, model, explainer, selected_customer_id):
     """.format(
         base_value, 
         final_prediction,
-        "Focus on retention strategies targeting the key risk factors identified above." if churn_probability > 0.5 
+        "Focus on retention strategies targeting the key risk factors identified above." if churn_probability >= threshold
         else "Continue current engagement strategies while monitoring for changes in risk factors."
     ), unsafe_allow_html=True)
+
+    # --- Similar Customers (nearest neighbors in encoded feature space) ---
+    st.markdown("""
+    <div class="section-header">
+        <h2>👥 Similar Customers</h2>
+    </div>
+    """, unsafe_allow_html=True)
+
+    with tracing.span('similar_customers'):
+        similar = similarity_index.similar_customers(df_data, position, k=10)
+    churned_neighbors = int((similar['Churn'] == 'Yes').sum())
+
+    st.markdown(f"""
+    <p style="color: #2c3e50;"><strong>{churned_neighbors} of {len(similar)}</strong> most similar customers churned.</p>
+    """, unsafe_allow_html=True)
+    st.dataframe(
+        similar.style.apply(
+            lambda row: ['background-color: #fde8e8' if row['Churn'] == 'Yes' else '' for _ in row], axis=1
+        ),
+        use_container_width=True,
+        hide_index=True
+    )
@@ -0,0 +1,96 @@
+import plotly.express as px
+import streamlit as st
+
+from drift_monitor import DRIFT_THRESHOLDS, drift_report, find_alerts
+import tracing
+
+STATUS_COLORS = {'ok': '', 'warning': 'background-color: #fefcbf', 'alert': 'background-color: #fde8e8'}
+
+def page_data_drift(reference, sources, load_state, model_version='legacy'):
+    """
+    Displays how far a customer extract has drifted from the data the served model
+    was trained on. `sources` are the selectable extracts and `load_state(source)`
+    returns the (cached) DriftState of one of them.
+    """
+    # Professional header
+    st.markdown("""
+    <div class="main-header">
+        <h1>🛰️ Data Drift</h1>
+        <p>Feature distributions of current customers compared with the model's training data.</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    source = st.selectbox("Compare", sources, help="The dashboard data or one of the stored snapshots")
+    with st.spinner("Scanning extract..."), tracing.span('drift_scan'):
+        state = load_state(source)
+    report = drift_report(reference, state)
+    alerts = find_alerts(report, source)
+
+    col1, col2, col3, col4 = st.columns(4, gap="medium")
+    col1.metric("Rows Scanned", f"{state.n_rows:,}")
+    col2.metric("Training Rows", f"{reference.baseline.n_rows:,}")
+    col3.metric("Warnings", int((report['status'] == 'warning').sum()))
+    col4.metric("Alerts", int((report['status'] == 'alert').sum()))
+
+    st.caption(f"Model {model_version} · PSI warning/alert at {DRIFT_THRESHOLDS['psi'][0]}/{DRIFT_THRESHOLDS['psi'][1]}, "
+               f"KS at {DRIFT_THRESHOLDS['ks'][0]}/{DRIFT_THRESHOLDS['ks'][1]}, "
+               f"category share change at {DRIFT_THRESHOLDS['category_delta'][0]:.0%}/{DRIFT_THRESHOLDS['category_delta'][1]:.0%}")
+
+    for alert in alerts:
+        message = f"**{alert['feature']}**: {alert['metric']} = {alert['value']:.3f} (threshold {alert['threshold']})"
+        if alert['level'] == 'alert':
+            st.error(message, icon="🚨")
+        else:
+            st.warning(message, icon="⚠️")
+    if not alerts:
+        st.success("No feature has drifted past its thresholds.", icon="✅")
+
+    # --- Per-feature PSI ---
+    st.markdown("""
+    <div class="section-header">
+        <h2>📏 Population Stability by Feature</h2>
+    </div>
+    """, unsafe_allow_html=True)
+
+    fig = px.bar(report, x='feature', y='psi', color='status',
+                 color_discrete_map={'ok': '#48bb78', 'warning': '#ed8936', 'alert': '#f56565'})
+    for level, dash in zip(DRIFT_THRESHOLDS['psi'], ('dot', 'dash')):
+        fig.add_hline(y=level, line_dash=dash, line_color='#718096')
+    fig.update_layout(
+        font=dict(color='#2d3748'),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        xaxis_title="", yaxis_title="<b>PSI</b>",
+        legend_title_text="Status"
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.dataframe(
+        report.style.apply(lambda row: [STATUS_COLORS[row['status']] for _ in row], axis=1),
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            'psi': st.column_config.NumberColumn("PSI", format="%.3f"),
+            'ks': st.column_config.NumberColumn("KS", format="%.3f"),
+            'category_delta': st.column_config.NumberColumn("Max Share Change", format="%.3f"),
+            'unseen': st.column_config.NumberColumn("Unseen Share", format="%.3f"),
+            'reference_missing': st.column_config.NumberColumn("Missing (train)", format="%.3f"),
+            'missing': st.column_config.NumberColumn("Missing", format="%.3f"),
+        }
+    )
+
+    # --- Distribution of one feature ---
+    feature = st.selectbox("Feature distribution", report['feature'].tolist())
+    distribution = reference.distribution(state, feature).melt(
+        id_vars='bin', value_vars=['reference', 'current'], var_name='Data', value_name='Share'
+    )
+    fig = px.bar(distribution, x='bin', y='Share', color='Data', barmode='group',
+                 color_discrete_map={'reference': '#a0aec0', 'current': '#008080'})
+    fig.update_layout(
+        title=f"<b>{feature}: Training vs Current</b>",
+        font=dict(color='#2d3748'),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        xaxis_title="", yaxis_tickformat='.0%'
+    )
+    st.plotly_chart(fig, use_container_width=True)
@@ -0,0 +1,167 @@
+# =============================================================================
+# File: src/disk_cache.py
+# Role: Persistent artifact cache that survives server restarts, under the
+#       in-process Streamlit caches.
+#
+# - Entries live in a versioned directory (<root>/v<CACHE_FORMAT>/<name>/<key>.joblib);
+#   bumping CACHE_FORMAT orphans every old entry at once.
+# - Keys hash the content of the declared sources (data files, model artifacts,
+#   the modules that build the artifact), explicit key parts and the versions of
+#   the libraries whose objects are pickled.
+# - Writes go to a temporary file that is renamed into place; readers never see
+#   a partial entry. The total size is bounded with least-recently-used eviction
+#   (hits refresh an entry's mtime).
+# =============================================================================
+
+import hashlib
+import importlib.metadata
+import inspect
+import json
+import os
+import sys
+import tempfile
+import threading
+
+import joblib
+
+CACHE_FORMAT = 1
+CACHE_DIR = os.path.join('output', 'disk_cache')
+# Libraries whose objects end up in cached pickles
+KEY_LIBRARIES = ['numpy', 'pandas', 'pyarrow', 'scikit-learn', 'catboost', 'shap']
+
+
+def library_versions(libraries=KEY_LIBRARIES):
+    versions = {'python': '.'.join(map(str, sys.version_info[:3]))}
+    for library in libraries:
+        try:
+            versions[library] = importlib.metadata.version(library)
+        except importlib.metadata.PackageNotFoundError:
+            versions[library] = None
+    return versions
+
+
+class DiskCache:
+    """
+    `get_or_build(name, builder, sources, key_parts)` returns the stored artifact
+    when its key matches, otherwise calls `builder()` and stores the result.
+    With `mmap_mode='r'` the numpy arrays of the artifact are served memory-mapped
+    from the entry file (also right after a build). With `root=None` the cache is
+    disabled and every call builds.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=1 << 30):
+        self.root = os.path.join(root, f"v{CACHE_FORMAT}") if root else None
+        self.max_bytes = max_bytes
+        self.libraries = library_versions()
+        self._lock = threading.Lock()
+        self._file_hashes = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _source_hash(self, source):
+        """Content hash of a file (or of the module defining a class/function), memoized by size and mtime."""
+        path = source if isinstance(source, str) else inspect.getfile(source)
+        stat = os.stat(path)
+        memo_key = (path, stat.st_size, stat.st_mtime_ns)
+        digest = self._file_hashes.get(memo_key)
+        if digest is None:
+            sha = hashlib.sha1()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    sha.update(block)
+            digest = self._file_hashes[memo_key] = sha.hexdigest()
+        return digest
+
+    def make_key(self, name, sources=(), key_parts=None):
+        payload = {
+            'name': name,
+            'parts': key_parts or {},
+            'sources': [self._source_hash(source) for source in sources],
+            'libraries': self.libraries,
+        }
+        return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def _path(self, name, key):
+        return os.path.join(self.root, name, f"{key}.joblib")
+
+    def get_or_build(self, name, builder, sources=(), key_parts=None, mmap_mode=None):
+        if self.root is None:
+            return builder()
+        path = self._path(name, self.make_key(name, sources, key_parts))
+        try:
+            value = joblib.load(path, mmap_mode=mmap_mode)
+            os.utime(path)
+            with self._lock:
+                self.hits += 1
+            return value
+        except FileNotFoundError:
+            pass
+        except Exception:
+            # Truncated or unreadable entry (e.g. written by an incompatible build): rebuild it
+            self._remove(path)
+
+        with self._lock:
+            self.misses += 1
+        value = builder()
+        self._write(path, value)
+        self._evict()
+        if mmap_mode is not None and os.path.exists(path):
+            # Serve the mapped copy so the built arrays can be freed
+            return joblib.load(path, mmap_mode=mmap_mode)
+        return value
+
+    def _write(self, path, value):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                joblib.dump(value, f)
+            os.replace(tmp_path, path)
+        except Exception:
+            self._remove(tmp_path)
+            raise
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _entries(self):
+        """(mtime, size, path) of every stored entry."""
+        entries = []
+        for directory, _, files in os.walk(self.root):
+            for file_name in files:
+                if file_name.endswith('.joblib'):
+                    path = os.path.join(directory, file_name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        """Deletes least recently used entries until the cache fits in `max_bytes`."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def stats(self):
+        entries = self._entries() if self.root else []
+        with self._lock:
+            return {
+                'entries': len(entries),
+                'bytes': sum(size for _, size, _ in entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
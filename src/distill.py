@@ -0,0 +1,162 @@
+# =============================================================================
+# File: src/distill.py
+# Role: Distills the current registry model (the teacher) into compact students
+#       trained on the teacher's probabilities, reports the latency/fidelity
+#       trade-off and registers the chosen student for interactive scoring.
+#
+# Usage: python src/distill.py --synthetic 20000 --register catboost-small
+# =============================================================================
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import f1_score, roc_auc_score
+from sklearn.model_selection import train_test_split
+from tabulate import tabulate
+
+from feature_pipeline import FeaturePipeline, PIPELINE_FILE
+from model_registry import ModelRegistry, LEGACY_VERSION
+from student_models import LookupTableStudent, catboost_student
+
+DATA_PATH = os.path.join('data', 'WA_Fn-UseC_-Telco-Customer-Churn.csv')
+SWAP_RATE = 0.3          # share of cells replaced in each synthetic row
+JITTER = 0.05            # relative noise on swapped numeric cells
+
+
+def load_features(pipeline, path=DATA_PATH):
+    """Features and labels, through the teacher's feature pipeline."""
+    df = pd.read_csv(path)
+    return pipeline.transform_frame(df), (df['Churn'] == 'Yes').to_numpy(dtype=np.int8)
+
+
+def synthesize(X, n_samples, seed=42):
+    """
+    Synthetic customers around the real ones: resampled rows where each cell is
+    replaced, with probability SWAP_RATE, by the same column of another random row
+    (numeric cells also get a small multiplicative jitter). This fills in feature
+    combinations the teacher has an opinion on but the dataset rarely shows.
+    """
+    rng = np.random.default_rng(seed)
+    synthetic = X.iloc[rng.integers(0, len(X), n_samples)].reset_index(drop=True)
+    for column in synthetic.columns:
+        swap = rng.random(n_samples) < SWAP_RATE
+        donors = X[column].to_numpy()[rng.integers(0, len(X), swap.sum())]
+        values = synthetic[column].to_numpy().copy()
+        if pd.api.types.is_numeric_dtype(X[column]):
+            donors = (donors * rng.normal(1.0, JITTER, len(donors))).astype(values.dtype)
+        values[swap] = donors
+        synthetic[column] = values
+    return synthetic
+
+
+def fit_students(X_distill, teacher_proba):
+    """Candidate students, all trained on the same teacher probabilities."""
+    cat_features = [column for column in X_distill.columns if not pd.api.types.is_numeric_dtype(X_distill[column])]
+    students = {
+        'catboost-small': catboost_student(iterations=50, depth=3),
+        'catboost-tiny': catboost_student(iterations=20, depth=2),
+    }
+    fitted = {}
+    for name, student in students.items():
+        start = time.perf_counter()
+        student.fit(X_distill, teacher_proba, cat_features=cat_features)
+        fitted[name] = (student, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    fitted['lookup-table'] = (LookupTableStudent().fit(X_distill, teacher_proba), time.perf_counter() - start)
+    return fitted
+
+
+def latency(model, X, n_single=200, seed=0):
+    """(single-row p50 ms, single-row p95 ms, batch rows per second) for predict_proba."""
+    rng = np.random.default_rng(seed)
+    timings = []
+    for position in rng.integers(0, len(X), n_single):
+        row = X.iloc[position:position + 1]
+        start = time.perf_counter()
+        model.predict_proba(row)
+        timings.append(time.perf_counter() - start)
+    timings = np.asarray(timings) * 1000
+
+    start = time.perf_counter()
+    model.predict_proba(X)
+    batch_s = time.perf_counter() - start
+    return np.percentile(timings, 50), np.percentile(timings, 95), int(len(X) / batch_s)
+
+
+def evaluate(name, model, X_test, y_test, teacher_test, threshold, X_all, fit_s=None):
+    """One report row: fidelity to the teacher, quality on true labels and latency."""
+    proba = model.predict_proba(X_test)[:, 1]
+    p50, p95, throughput = latency(model, X_all)
+    return {
+        'model': name,
+        'mae_vs_teacher': float(np.abs(proba - teacher_test).mean()),
+        'agreement': float(((proba >= threshold) == (teacher_test >= threshold)).mean()),
+        'auc': float(roc_auc_score(y_test, proba)),
+        'f1': float(f1_score(y_test, proba >= threshold)),
+        'p50_ms': p50,
+        'p95_ms': p95,
+        'rows_per_s': throughput,
+        'fit_s': fit_s,
+    }
+
+
+def distill(n_synthetic=20_000, registry=None, register=None, seed=42):
+    """
+    Trains the students, prints the trade-off table and optionally registers the
+    student named `register` (not activated: the teacher stays current).
+    """
+    registry = registry or ModelRegistry()
+    teacher_version = registry.current_version() or LEGACY_VERSION
+    teacher, teacher_metadata = registry.load(teacher_version)
+    threshold = teacher_metadata.get('threshold', 0.5)
+    # Pre-pipeline teachers were trained on the full file with median-filled TotalCharges
+    pipeline = registry.load_artifact(teacher_version, PIPELINE_FILE) or FeaturePipeline().fit(pd.read_csv(DATA_PATH))
+
+    X, y = load_features(pipeline)
+    # Same split as train.py: quality is reported on the teacher's held-out rows
+    _, X_test, _, y_test = train_test_split(X, y, test_size=0.2, stratify=y, random_state=42)
+
+    X_distill = pd.concat([X, synthesize(X, n_synthetic, seed)], ignore_index=True)
+    print(f"Scoring {len(X_distill):,} rows ({n_synthetic:,} synthetic) with teacher {teacher_version}...")
+    teacher_proba = teacher.predict_proba(X_distill)[:, 1]
+    teacher_test = teacher.predict_proba(X_test)[:, 1]
+
+    students = fit_students(X_distill, teacher_proba)
+    rows = [evaluate(f"teacher ({teacher_version})", teacher, X_test, y_test, teacher_test, threshold, X)]
+    rows += [evaluate(name, student, X_test, y_test, teacher_test, threshold, X, fit_s)
+             for name, (student, fit_s) in students.items()]
+
+    headers = ["Model", "MAE vs Teacher", "Agreement", "ROC AUC", "F1", "p50 (ms)", "p95 (ms)", "Rows/s", "Fit (s)"]
+    print(f"\n--- Distillation Trade-off (threshold {threshold:.3f}) ---")
+    print(tabulate([list(row.values()) for row in rows], headers=headers, floatfmt=".4f",
+                   tablefmt="grid", intfmt=",", missingval="-"))
+
+    if register is None:
+        return rows, None
+    report = next(row for row in rows if row['model'] == register)
+    version = registry.register(
+        students[register][0],
+        params={'student': register, 'n_synthetic': n_synthetic},
+        metrics={key: value for key, value in report.items() if key != 'model'},
+        data_hash=teacher_metadata.get('data_hash'),
+        artifacts={PIPELINE_FILE: pipeline},
+        activate=False,
+        role='student',
+        teacher_version=teacher_version,
+        threshold=threshold
+    )
+    print(f"Student '{register}' registered as {version} for teacher {teacher_version}")
+    return rows, version
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Distill the current model into a compact student.")
+    parser.add_argument('--synthetic', type=int, default=20_000, help="Synthetic samples added to the real rows")
+    parser.add_argument('--register', choices=['catboost-small', 'catboost-tiny', 'lookup-table'],
+                        help="Register this student for the dashboard")
+    args = parser.parse_args()
+    distill(args.synthetic, register=args.register)
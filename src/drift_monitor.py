@@ -0,0 +1,335 @@
+# =============================================================================
+# File: src/drift_monitor.py
+# Role: Data-drift monitoring against the training data of the served model.
+#
+# - At training time a DriftReference stores histograms of every feature of the
+#   training rows: quantile bins for numerics, vocabulary counts for categoricals.
+# - New data is reduced chunk by chunk to a DriftState (plain bin counts). States
+#   merge by addition, so large files are scanned in parallel and combined.
+# - `drift_report` turns a state into PSI, KS and category-share deltas per
+#   feature, and `find_alerts` flags the features past DRIFT_THRESHOLDS.
+#
+# Usage: python src/drift_monitor.py <extract.csv|.parquet> [--version v0002] [--workers 4]
+# =============================================================================
+
+import argparse
+import datetime
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from tabulate import tabulate
+
+DATA_PATH = os.path.join('data', 'WA_Fn-UseC_-Telco-Customer-Churn.csv')
+REFERENCE_FILE = 'drift_reference.joblib'
+ALERT_LOG = os.environ.get('CHURN_DRIFT_ALERTS', os.path.join('output', 'drift_alerts.jsonl'))
+PSI_BINS = 10
+KS_BINS = 100
+# Empty bins are floored at this share so PSI stays finite
+MIN_SHARE = 1e-4
+# (warning, alert) levels per metric; PSI levels are the usual 0.1 / 0.25 rule of thumb
+DRIFT_THRESHOLDS = {
+    'psi': (0.10, 0.25),
+    'ks': (0.10, 0.20),
+    'category_delta': (0.05, 0.10),
+    'missing_delta': (0.02, 0.05),
+    # Share of categories the model never saw (the feature pipeline rejects them)
+    'unseen': (0.001, 0.01),
+}
+STATUS_LEVELS = ['ok', 'warning', 'alert']
+
+
+class DriftState:
+    """Bin counts of one or more chunks. Plain arrays, so states pickle and add up cheaply."""
+
+    def __init__(self, n_rows, counts, missing):
+        self.n_rows = n_rows
+        self.counts = counts      # {(feature, 'psi'|'ks'|'categories'): int64 array}
+        self.missing = missing    # {feature: missing values}
+
+    def merge(self, other):
+        """Adds `other` into this state and returns it."""
+        self.n_rows += other.n_rows
+        for key, counts in other.counts.items():
+            self.counts[key] = self.counts[key] + counts
+        for feature, missing in other.missing.items():
+            self.missing[feature] += missing
+        return self
+
+
+class DriftReference:
+    """
+    Bin edges and vocabularies learned from the training rows, plus the training
+    rows' own DriftState as the baseline every scan is compared with.
+    """
+
+    def __init__(self, numeric_edges, vocabularies):
+        self.numeric_edges = numeric_edges    # {feature: (psi_edges, ks_edges)}
+        self.vocabularies = vocabularies      # {feature: sorted categories}
+        self.baseline = None
+
+    def empty_state(self):
+        return DriftState(0, {key: np.zeros_like(counts) for key, counts in self.baseline.counts.items()},
+                          dict.fromkeys(self.baseline.missing, 0))
+
+    @property
+    def feature_names(self):
+        return list(self.numeric_edges) + list(self.vocabularies)
+
+    @classmethod
+    def fit(cls, df, pipeline):
+        """Reference for the features of a fitted FeaturePipeline, from its training rows."""
+        numeric_edges = {}
+        for feature in pipeline.numeric:
+            values = pd.to_numeric(df[feature], errors='coerce').to_numpy(dtype=np.float64)
+            values = values[np.isfinite(values)]
+            numeric_edges[feature] = tuple(
+                np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1]))
+                for n_bins in (PSI_BINS, KS_BINS)
+            )
+        reference = cls(numeric_edges, {feature: list(pipeline.vocabularies[feature]) for feature in pipeline.categorical})
+        reference.baseline = reference.partial(df)
+        return reference
+
+    def partial(self, chunk):
+        """DriftState of one chunk of raw rows (vectorized per column)."""
+        counts, missing = {}, {}
+        for feature, edges in self.numeric_edges.items():
+            values = pd.to_numeric(chunk[feature], errors='coerce').to_numpy(dtype=np.float64)
+            finite = np.isfinite(values)
+            missing[feature] = int((~finite).sum())
+            for kind, kind_edges in zip(('psi', 'ks'), edges):
+                bins = np.searchsorted(kind_edges, values[finite], side='right')
+                counts[(feature, kind)] = np.bincount(bins, minlength=len(kind_edges) + 1).astype(np.int64)
+        for feature, vocabulary in self.vocabularies.items():
+            values = chunk[feature]
+            is_missing = values.isna().to_numpy()
+            missing[feature] = int(is_missing.sum())
+            codes = pd.Index(vocabulary).get_indexer(values[~is_missing])
+            # Unseen categories go to the extra last bin
+            codes = np.where(codes < 0, len(vocabulary), codes)
+            counts[(feature, 'categories')] = np.bincount(codes, minlength=len(vocabulary) + 1).astype(np.int64)
+        return DriftState(len(chunk), counts, missing)
+
+    def distribution(self, state, feature):
+        """Reference vs current share per bin (or category) of one feature, for charts."""
+        if feature in self.vocabularies:
+            labels = self.vocabularies[feature] + ['(unseen)']
+            kind = 'categories'
+        else:
+            edges = self.numeric_edges[feature][0]
+            bounds = [-np.inf] + list(edges) + [np.inf]
+            labels = [f"[{low:g}, {high:g})" for low, high in zip(bounds[:-1], bounds[1:])]
+            kind = 'psi'
+        reference = self.baseline.counts[(feature, kind)]
+        current = state.counts[(feature, kind)]
+        return pd.DataFrame({
+            'bin': labels,
+            'reference': reference / max(reference.sum(), 1),
+            'current': current / max(current.sum(), 1),
+        })
+
+
+# --- Metrics ---
+def _shares(counts):
+    return counts / max(counts.sum(), 1)
+
+
+def population_stability_index(expected_counts, actual_counts):
+    expected = np.maximum(_shares(expected_counts), MIN_SHARE)
+    actual = np.maximum(_shares(actual_counts), MIN_SHARE)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def ks_statistic(expected_counts, actual_counts):
+    """Largest CDF gap, evaluated at the reference percentile edges (binned two-sample KS)."""
+    return float(np.max(np.abs(np.cumsum(_shares(expected_counts)) - np.cumsum(_shares(actual_counts)))))
+
+
+def _level(metric, value):
+    warning, alert = DRIFT_THRESHOLDS[metric]
+    return 2 if value >= alert else 1 if value >= warning else 0
+
+
+def drift_report(reference, state):
+    """
+    One row per feature: PSI, KS (numerics), largest category-share change and
+    unseen share (categoricals), missing rates and the worst threshold status.
+    """
+    baseline = reference.baseline
+    rows = []
+    for feature in reference.feature_names:
+        is_numeric = feature in reference.numeric_edges
+        kind = 'psi' if is_numeric else 'categories'
+        expected, actual = baseline.counts[(feature, kind)], state.counts[(feature, kind)]
+        row = {
+            'feature': feature,
+            'type': 'numeric' if is_numeric else 'categorical',
+            'psi': population_stability_index(expected, actual),
+            'ks': ks_statistic(baseline.counts[(feature, 'ks')], state.counts[(feature, 'ks')]) if is_numeric else np.nan,
+            'category_delta': np.nan,
+            'largest_change': '',
+            'unseen': np.nan,
+            'reference_missing': baseline.missing[feature] / max(baseline.n_rows, 1),
+            'missing': state.missing[feature] / max(state.n_rows, 1),
+        }
+        if not is_numeric:
+            deltas = _shares(actual) - _shares(expected)
+            largest = int(np.argmax(np.abs(deltas)))
+            labels = reference.vocabularies[feature] + ['(unseen)']
+            row['category_delta'] = float(np.abs(deltas[largest]))
+            row['largest_change'] = f"{labels[largest]} {deltas[largest] * 100:+.1f} pp"
+            row['unseen'] = float(_shares(actual)[-1])
+
+        levels = [_level('psi', row['psi']), _level('missing_delta', abs(row['missing'] - row['reference_missing']))]
+        if is_numeric:
+            levels.append(_level('ks', row['ks']))
+        else:
+            levels += [_level('category_delta', row['category_delta']), _level('unseen', row['unseen'])]
+        row['status'] = STATUS_LEVELS[max(levels)]
+        rows.append(row)
+
+    # Worst features first
+    report = pd.DataFrame(rows)
+    rank = report['status'].map(STATUS_LEVELS.index)
+    return report.assign(rank=rank).sort_values(['rank', 'psi'], ascending=False) \
+        .drop(columns='rank').reset_index(drop=True)
+
+
+def find_alerts(report, source):
+    """Alert records for every metric past its warning or alert level."""
+    alerts = []
+    timestamp = datetime.datetime.now().isoformat(timespec='seconds')
+    for row in report.itertuples(index=False):
+        values = {'psi': row.psi, 'ks': row.ks, 'category_delta': row.category_delta, 'unseen': row.unseen,
+                  'missing_delta': abs(row.missing - row.reference_missing)}
+        for metric, value in values.items():
+            if np.isnan(value) or _level(metric, value) == 0:
+                continue
+            alerts.append({
+                'time': timestamp,
+                'source': str(source),
+                'feature': row.feature,
+                'metric': metric,
+                'value': round(float(value), 4),
+                'level': STATUS_LEVELS[_level(metric, value)],
+                'threshold': DRIFT_THRESHOLDS[metric][_level(metric, value) - 1],
+            })
+    return alerts
+
+
+def emit_alerts(alerts, path=ALERT_LOG):
+    """Appends alerts to the JSONL alert log (picked up by whatever watches it)."""
+    if not alerts:
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        for alert in alerts:
+            f.write(json.dumps(alert) + '\n')
+
+
+# --- Scanning (parallel over chunks) ---
+# The reference is handed to each worker once through the pool initializer
+_shared = {}
+
+
+def _init_worker(reference):
+    _shared['reference'] = reference
+
+
+def _scan_frame(chunk):
+    return _shared['reference'].partial(chunk)
+
+
+def _scan_row_group(path, row_group):
+    reference = _shared['reference']
+    chunk = pq.ParquetFile(path).read_row_group(row_group, columns=reference.feature_names).to_pandas()
+    return reference.partial(chunk)
+
+
+def _tasks(source, reference, chunk_size):
+    """(function, args) per chunk; Parquet row groups are read by the workers themselves."""
+    if isinstance(source, str) and source.endswith('.parquet'):
+        return ((_scan_row_group, (source, i)) for i in range(pq.ParquetFile(source).num_row_groups))
+    if isinstance(source, pd.DataFrame):
+        chunks = (source.iloc[start:start + chunk_size] for start in range(0, len(source), chunk_size))
+    else:
+        chunks = pd.read_csv(source, usecols=reference.feature_names, chunksize=chunk_size)
+    return ((_scan_frame, (chunk,)) for chunk in chunks)
+
+
+def scan(source, reference, chunk_size=100_000, workers=1):
+    """
+    DriftState of a DataFrame, CSV or Parquet file. With `workers` > 1 the chunks
+    are reduced in a process pool, at most 2 x workers in flight, and the partial
+    states are merged in order as they complete.
+    """
+    state = reference.empty_state()
+    tasks = _tasks(source, reference, chunk_size)
+    if workers <= 1:
+        _init_worker(reference)
+        for function, args in tasks:
+            state.merge(function(*args))
+        return state
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(reference,)) as pool:
+        pending = deque()
+        for function, args in tasks:
+            pending.append(pool.submit(function, *args))
+            if len(pending) >= 2 * workers:
+                state.merge(pending.popleft().result())
+        while pending:
+            state.merge(pending.popleft().result())
+    return state
+
+
+def load_reference(version=None, registry=None, data_path=None):
+    """
+    Reference saved with a registry version (default: current). Versions trained
+    before drift references existed get one built from the training data file.
+    """
+    from feature_pipeline import PIPELINE_FILE, FeaturePipeline
+    from model_registry import ModelRegistry, LEGACY_VERSION
+
+    registry = registry or ModelRegistry()
+    version = version or registry.current_version() or LEGACY_VERSION
+    reference = registry.load_artifact(version, REFERENCE_FILE)
+    if reference is None:
+        df = pd.read_csv(data_path or DATA_PATH)
+        pipeline = registry.load_artifact(version, PIPELINE_FILE) or FeaturePipeline().fit(df)
+        reference = DriftReference.fit(df, pipeline)
+    return version, reference
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check a customer extract for drift against the model's training data.")
+    parser.add_argument('extract', help="CSV or Parquet extract in the Telco schema")
+    parser.add_argument('--version', help="Registry version to compare with (default: current)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--alert-log', default=ALERT_LOG)
+    args = parser.parse_args()
+
+    version, reference = load_reference(args.version)
+    start = time.perf_counter()
+    state = scan(args.extract, reference, args.chunk_size, args.workers)
+    elapsed = time.perf_counter() - start
+    report = drift_report(reference, state)
+
+    print(f"Scanned {state.n_rows:,} rows in {elapsed:.2f}s against {version} ({reference.baseline.n_rows:,} training rows)")
+    print(tabulate(report, headers="keys", showindex=False, floatfmt=".4f", tablefmt="grid"))
+
+    alerts = find_alerts(report, args.extract)
+    emit_alerts(alerts, args.alert_log)
+    for alert in alerts:
+        print(f"{'🚨' if alert['level'] == 'alert' else '⚠️ '} {alert['feature']}: {alert['metric']} "
+              f"{alert['value']:.3f} >= {alert['threshold']}")
+    if alerts:
+        print(f"{len(alerts)} drift alerts appended to {args.alert_log}")
+    # Non-zero exit when any feature reaches the alert level, for schedulers
+    raise SystemExit(1 if (report['status'] == 'alert').any() else 0)
@@ -0,0 +1,563 @@
+# =============================================================================
+# File: src/event_stream.py
+# Role: Near-real-time score updates from a local, append-only log of customer
+#       attribute changes (stand-in for the CRM change feed).
+#
+# - Sources: a JSONL file tailed from a byte offset, or a SQLite table read by
+#   increasing id. One event per line/row:
+#       {"customerID": "7590-VHVEG", "changes": {"Contract": "One year"}, "ts": 1760000000.0}
+# - LiveCustomerTable applies a micro-batch of events (looked up by customerID):
+#   it validates the changed rows with the model's FeaturePipeline, rescores and
+#   re-explains only them, and publishes a new immutable LiveSnapshot with the
+#   changed rows in an overlay on top of the loaded frames. The overlay is merged
+#   into the frames and explanation store once it exceeds MAX_OVERLAY_SHARE.
+# - EventIngestor polls the source on a background thread; the dashboard picks
+#   up each applied batch on its next rerun.
+#
+# Malformed records, customer IDs not in the loaded table and invalid values are
+# counted and skipped: positions stay aligned with the dashboard's indexes.
+#
+# Usage (append synthetic changes, e.g. to watch the dashboard update):
+#   python src/event_stream.py data/events.jsonl --simulate 1000 --rate 50
+# =============================================================================
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from bitmap_index import BitmapIndex
+from feature_pipeline import FeatureValidationError
+from quantized_store import QuantizationError
+from risk_ranking import RiskRanking
+from segment_explanation import ExplanationStore
+
+SQLITE_TABLE = 'customer_events'
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+POLL_INTERVAL = 0.5
+MAX_BATCH = 5_000
+# Share of the customers that can be changed (kept in the overlay) before a compaction
+MAX_OVERLAY_SHARE = 0.05
+
+# Attribute changes produced by the simulator: (column, candidate values)
+SIMULATED_CHANGES = [
+    ('Contract', ['Month-to-month', 'One year', 'Two year']),
+    ('TechSupport', ['Yes', 'No']),
+    ('OnlineSecurity', ['Yes', 'No']),
+    ('StreamingTV', ['Yes', 'No']),
+    ('PaymentMethod', ['Electronic check', 'Mailed check', 'Bank transfer (automatic)', 'Credit card (automatic)']),
+    ('PaperlessBilling', ['Yes', 'No']),
+]
+
+
+# --- Sources ---
+class JsonlEventSource:
+    """
+    Tails an append-only JSONL file. A last line without its newline is left for the
+    next read; malformed lines are skipped and counted in `rejected`.
+    """
+
+    def __init__(self, path, offset=0):
+        self.path = path
+        self.offset = offset
+        self.rejected = 0
+
+    def checkpoint(self):
+        return self.offset, self.rejected
+
+    def rollback(self, checkpoint):
+        """Rewinds to a `checkpoint()`: the records read since are read again."""
+        self.offset, self.rejected = checkpoint
+
+    def read(self, max_events=MAX_BATCH):
+        if not os.path.exists(self.path):
+            return []
+        events = []
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            while len(events) < max_events:
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    break
+                if line.strip():
+                    event = _parse_event(line)
+                    if event is None:
+                        self.rejected += 1
+                    else:
+                        events.append(event)
+                self.offset += len(line)
+        return events
+
+
+class SqliteEventSource:
+    """Reads new rows of the `customer_events` table in id order; rows with malformed changes are counted in `rejected`."""
+
+    def __init__(self, path, last_id=0):
+        self.path = path
+        self.last_id = last_id
+        self.rejected = 0
+        self._connection = None
+
+    def checkpoint(self):
+        return self.last_id, self.rejected
+
+    def rollback(self, checkpoint):
+        """Rewinds to a `checkpoint()`: the rows read since are read again."""
+        self.last_id, self.rejected = checkpoint
+
+    def read(self, max_events=MAX_BATCH):
+        if self._connection is None:
+            # Opened by the thread that polls (sqlite connections are per thread)
+            self._connection = sqlite3.connect(self.path)
+            _create_table(self._connection)
+        rows = self._connection.execute(
+            f"SELECT id, customer_id, changes, ts FROM {SQLITE_TABLE} WHERE id > ? ORDER BY id LIMIT ?",
+            (self.last_id, max_events)
+        ).fetchall()
+        events = []
+        for row_id, customer_id, changes, ts in rows:
+            try:
+                changes = json.loads(changes)
+            except (TypeError, ValueError):
+                changes = None
+            if isinstance(changes, dict):
+                events.append({'customerID': customer_id, 'changes': changes, 'ts': ts})
+            else:
+                self.rejected += 1
+            self.last_id = row_id
+        return events
+
+
+def _parse_event(line):
+    """The event encoded on a JSONL line, or None if it is not an event object."""
+    try:
+        event = json.loads(line)
+    except ValueError:  # includes invalid UTF-8
+        return None
+    if not isinstance(event, dict) or not isinstance(event.get('changes', {}), dict):
+        return None
+    return event
+
+
+def _create_table(connection):
+    connection.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SQLITE_TABLE} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id TEXT NOT NULL,
+            changes TEXT NOT NULL,
+            ts REAL
+        )
+    """)
+
+
+def open_source(path):
+    """JSONL source for .jsonl files, SQLite source for .db/.sqlite files."""
+    if path.endswith(SQLITE_EXTENSIONS):
+        return SqliteEventSource(path)
+    if path.endswith(('.jsonl', '.json')):
+        return JsonlEventSource(path)
+    raise ValueError(f"Unsupported event log '{path}' (expected .jsonl or {'/'.join(SQLITE_EXTENSIONS)})")
+
+
+def append_events(path, events):
+    """Appends events (dicts with customerID, changes and optional ts) to a JSONL or SQLite log."""
+    now = time.time()
+    if path.endswith(SQLITE_EXTENSIONS):
+        with sqlite3.connect(path) as connection:
+            _create_table(connection)
+            connection.executemany(
+                f"INSERT INTO {SQLITE_TABLE} (customer_id, changes, ts) VALUES (?, ?, ?)",
+                [(event['customerID'], json.dumps(event['changes']), event.get('ts', now)) for event in events]
+            )
+        return
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(''.join(json.dumps({'ts': now, **event}) + '\n' for event in events))
+
+
+def synthetic_events(customer_ids, n_events, rng):
+    """Random contract, service and billing changes of random customers."""
+    events = []
+    for customer_id in rng.choice(customer_ids, n_events):
+        column, values = SIMULATED_CHANGES[rng.integers(len(SIMULATED_CHANGES))]
+        changes = {column: values[rng.integers(len(values))]}
+        if rng.random() < 0.3:
+            changes['MonthlyCharges'] = round(float(rng.uniform(18, 120)), 2)
+        events.append({'customerID': str(customer_id), 'changes': changes})
+    return events
+
+
+# --- Live table ---
+class LiveBase:
+    """
+    Full frames and arrays of a LiveSnapshot, never modified. Replaced only when
+    the overlay of changed customers is compacted into a new base.
+    """
+
+    def __init__(self, df, features, risk_ranking, filter_index, store, row_versions):
+        self.df = df
+        self.features = features
+        self.risk_ranking = risk_ranking
+        self.filter_index = filter_index
+        # Explanation store with the SHAP rows and probabilities of every customer
+        self.store = store
+        # Version of the batch that last changed each customer (0: as loaded)
+        self.row_versions = row_versions
+
+
+class RowUpdate:
+    """A changed customer in the overlay: its validated changes since the base, score, SHAP row and version."""
+
+    __slots__ = ('changes', 'probability', 'shap_values', 'version')
+
+    def __init__(self, changes, probability, shap_values, version):
+        self.changes = changes
+        self.probability = probability
+        self.shap_values = shap_values
+        self.version = version
+
+
+class LiveSnapshot:
+    """
+    One consistent state of the live table: a LiveBase plus an overlay
+    {position: RowUpdate} of the customers changed since. Never modified: `apply`
+    publishes a new snapshot, so a rerun reads every value from the same batch.
+    The full frames (`df`, `features`, `probabilities`, `risk_ranking`,
+    `filter_index`) are merged from base and overlay on first access, once per
+    snapshot; per-customer reads (`feature_rows`, `explanations`) never merge.
+    """
+
+    def __init__(self, version, base, overlay):
+        self.version = version
+        self.base = base
+        self.overlay = overlay
+        self.explanations = LiveExplanationStore(self)
+        self._merged = None
+        self._lock = threading.Lock()
+
+    def _merge(self):
+        with self._lock:
+            if self._merged is None:
+                base = self.base
+                if not self.overlay:
+                    self._merged = (base.df, base.features, base.risk_ranking, base.filter_index)
+                else:
+                    positions = np.fromiter(self.overlay, dtype=np.intp, count=len(self.overlay))
+                    updates = [self.overlay[position] for position in positions.tolist()]
+                    df = _with_changes(base.df, positions, updates)
+                    risk_ranking = RiskRanking(base.risk_ranking.scores.copy(), base.risk_ranking.probabilities.copy())
+                    risk_ranking.update(df, positions, np.array([update.probability for update in updates],
+                                                                dtype=np.float32))
+                    columns = {column for update in updates for column in update.changes}
+                    self._merged = (df, _with_changes(base.features, positions, updates), risk_ranking,
+                                    base.filter_index.updated(df, positions, columns))
+            return self._merged
+
+    @property
+    def df(self):
+        return self._merge()[0]
+
+    @property
+    def features(self):
+        return self._merge()[1]
+
+    @property
+    def risk_ranking(self):
+        return self._merge()[2]
+
+    @property
+    def probabilities(self):
+        return self._merge()[2].probabilities
+
+    @property
+    def filter_index(self):
+        return self._merge()[3]
+
+    def feature_rows(self, positions):
+        """Model input rows of the customers at `positions`, without merging the full frame."""
+        updates = [self.overlay.get(position) for position in positions.tolist()]
+        return _with_changes(self.base.features.iloc[positions].reset_index(drop=True),
+                             np.arange(len(positions)), updates)
+
+
+def _with_changes(frame, positions, updates):
+    """Copy of `frame` with each RowUpdate's changes written at its position (None: unchanged)."""
+    by_column = {}
+    for position, update in zip(positions.tolist(), updates):
+        if update is not None:
+            for column, value in update.changes.items():
+                rows, values = by_column.setdefault(column, ([], []))
+                rows.append(position)
+                values.append(value)
+    frame = frame.copy()
+    for column, (rows, values) in by_column.items():
+        frame.iloc[rows, frame.columns.get_loc(column)] = values
+    return frame
+
+
+class LiveCustomerTable:
+    """
+    Display frame, model inputs, churn probabilities, revenue-at-risk ranking and
+    filter index of every customer, kept current by `apply(events)`. Readers take
+    `snapshot()` once per rerun; writers are serialized by `lock`.
+
+    A batch costs O(changed customers + overlay): changed rows go to an overlay on
+    top of the full frames. Once more than `max_overlay` customers are in it
+    (default MAX_OVERLAY_SHARE of the table), it is compacted: merged into new base
+    frames and its SHAP rows written into the explanation store (`store.updated`).
+    """
+
+    def __init__(self, df, features, explanation_store, customer_index, pipeline, model, explainer,
+                 max_overlay=None):
+        self.customer_index = customer_index
+        self.pipeline, self.model, self.explainer = pipeline, model, explainer
+        self.max_overlay = max_overlay if max_overlay is not None else max(1, int(len(df) * MAX_OVERLAY_SHARE))
+        self.lock = threading.Lock()
+        probabilities = np.array(explanation_store.probabilities, dtype=np.float32)
+        base = LiveBase(df.copy(), features.copy(), RiskRanking.build(df, probabilities),
+                        BitmapIndex.from_dataframe(df), explanation_store, np.zeros(len(df), dtype=np.int64))
+        self._snapshot = LiveSnapshot(0, base, {})
+
+    def snapshot(self):
+        """The current LiveSnapshot."""
+        return self._snapshot
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def _merge(self, events, counts):
+        """{position: {column: value}} with the last value of each field winning."""
+        merged = {}
+        positions = self.customer_index.get_indexer([event.get('customerID') for event in events])
+        for event, position in zip(events, positions.tolist()):
+            if position < 0:
+                counts['unknown_customers'] += 1
+                continue
+            changes = event.get('changes') or {}
+            unknown = [column for column in changes if column not in self.pipeline.feature_names]
+            if unknown:
+                counts['rejected'] += 1
+                continue
+            merged.setdefault(position, {}).update(changes)
+        return merged
+
+    def _validated_rows(self, rows, positions, merged, counts):
+        """Changed model input rows through the pipeline; customers with invalid values are dropped."""
+        # As objects, so events can carry values of any type (e.g. numbers as text)
+        rows = rows.astype(object)
+        for i, position in enumerate(positions):
+            for column, value in merged[position].items():
+                rows.at[i, column] = value
+        try:
+            return positions, self.pipeline.transform_frame(rows)
+        except FeatureValidationError:
+            valid = []
+            for i in range(len(rows)):
+                try:
+                    self.pipeline.transform_frame(rows.iloc[[i]])
+                    valid.append(i)
+                except FeatureValidationError:
+                    counts['rejected'] += 1
+            return positions[valid], self.pipeline.transform_frame(rows.iloc[valid].reset_index(drop=True))
+
+    def apply(self, events):
+        """Applies a micro-batch of events, rescores the changed customers and returns counts."""
+        counts = {'events': len(events), 'customers': 0, 'unknown_customers': 0, 'rejected': 0}
+        merged = self._merge(events, counts)
+        if not merged:
+            return counts
+
+        with self.lock:
+            current = self._snapshot
+            positions = np.fromiter(merged, dtype=np.intp)
+            positions, validated = self._validated_rows(current.feature_rows(positions), positions, merged, counts)
+            if len(positions) == 0:
+                return counts
+            probabilities = self.model.predict_proba(validated)[:, 1].astype(np.float32)
+            shap_values = self.explainer.shap_values(validated).astype(np.float32)
+
+            version = current.version + 1
+            columns = {column: validated[column].to_numpy()
+                       for column in sorted({column for position in positions for column in merged[position]})}
+            overlay = dict(current.overlay)
+            for i, position in enumerate(positions.tolist()):
+                previous = overlay.get(position)
+                changes = dict(previous.changes) if previous is not None else {}
+                changes.update((column, columns[column][i]) for column in merged[position])
+                overlay[position] = RowUpdate(changes, probabilities[i], shap_values[i], version)
+            snapshot = LiveSnapshot(version, current.base, overlay)
+            if len(overlay) > self.max_overlay:
+                snapshot = self._compacted(snapshot)
+            self._snapshot = snapshot
+        counts['customers'] = len(positions)
+        return counts
+
+    @staticmethod
+    def _compacted(snapshot):
+        """The same state with its overlay merged into a new base (full frames, store and row versions)."""
+        df, features, risk_ranking, filter_index = snapshot._merge()
+        positions = np.fromiter(snapshot.overlay, dtype=np.intp, count=len(snapshot.overlay))
+        updates = [snapshot.overlay[position] for position in positions.tolist()]
+        shap_rows = np.stack([update.shap_values for update in updates])
+        probabilities = np.array([update.probability for update in updates])
+        store = snapshot.base.store
+        try:
+            store = store.updated(positions, shap_rows, probabilities)
+        except QuantizationError:
+            # The changed rows break the encoding's bound (e.g. topk drops too much): serve exact values
+            all_rows = np.arange(len(df))
+            store = ExplanationStore(store.shap_rows(all_rows), np.array(store.probabilities, dtype=np.float32),
+                                     store.feature_names, store.base_value).updated(positions, shap_rows,
+                                                                                   probabilities)
+        row_versions = snapshot.base.row_versions.copy()
+        row_versions[positions] = [update.version for update in updates]
+        base = LiveBase(df, features, risk_ranking, filter_index, store, row_versions)
+        return LiveSnapshot(snapshot.version, base, {})
+
+
+class LiveExplanationStore:
+    """
+    Explanation queries of a LiveSnapshot: the base store's values with the
+    probabilities and fresh SHAP rows of the customers in the overlay. Segment SHAP
+    reductions come from the base store (which includes every compacted change).
+    """
+
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+        self.base_value = snapshot.base.store.base_value
+        self.feature_names = snapshot.base.store.feature_names
+
+    @property
+    def probabilities(self):
+        return self._snapshot.probabilities
+
+    def shap_rows(self, positions):
+        overlay = self._snapshot.overlay
+        rows = np.array(self._snapshot.base.store.shap_rows(positions), dtype=np.float32)
+        for i, position in enumerate(np.asarray(positions).tolist()):
+            update = overlay.get(position)
+            if update is not None:
+                rows[i] = update.shap_values
+        return rows
+
+    def row_version(self, position):
+        """Version of the batch that last changed the customer at `position` (0: as loaded)."""
+        update = self._snapshot.overlay.get(position)
+        return update.version if update is not None else int(self._snapshot.base.row_versions[position])
+
+    def explain_segment(self, mask):
+        return self._snapshot.base.store.explain_segment(mask)
+
+    def probability_distribution(self, mask, bins=20):
+        counts, edges = np.histogram(self.probabilities[mask], bins=bins, range=(0.0, 1.0))
+        return pd.DataFrame({
+            'Probability': (edges[:-1] + edges[1:]) / 2,
+            'Customers': counts,
+        })
+
+    def mean_probability(self, mask):
+        segment = self.probabilities[mask]
+        return float(segment.mean()) if len(segment) else 0.0
+
+
+# --- Background ingestion ---
+class EventIngestor:
+    """Polls an event source every `poll_interval` seconds and applies what it finds in micro-batches."""
+
+    def __init__(self, source, table, poll_interval=POLL_INTERVAL, max_batch=MAX_BATCH):
+        self.source = source
+        self.table = table
+        self.poll_interval = poll_interval
+        self.max_batch = max_batch
+        self.totals = {'events': 0, 'customers': 0, 'unknown_customers': 0, 'rejected': 0, 'batches': 0}
+        self.last_applied = None
+        self.last_error = None
+        # (events, seconds, lag seconds) of recent batches
+        self.recent = deque(maxlen=100)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        """
+        Reads and applies one batch; returns the number of records read (applied or
+        rejected). If applying raises, the source is rewound so the batch is read again.
+        """
+        checkpoint = self.source.checkpoint()
+        rejected = self.source.rejected
+        events = self.source.read(self.max_batch)
+        start = time.perf_counter()
+        try:
+            counts = self.table.apply(events) if events else {}
+        except Exception:
+            self.source.rollback(checkpoint)
+            raise
+        malformed = self.source.rejected - rejected
+        self.totals['rejected'] += malformed
+        if not events:
+            return malformed
+        applied = time.time()
+        oldest = min((event['ts'] for event in events if event.get('ts') is not None), default=applied)
+        for key, value in counts.items():
+            self.totals[key] += value
+        self.totals['batches'] += 1
+        self.recent.append((len(events), time.perf_counter() - start, applied - oldest))
+        self.last_applied = applied
+        self.last_error = None
+        return len(events) + malformed
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                # Drain a backlog without pausing, then wait for new events
+                if self.run_once() < self.max_batch:
+                    self._stop.wait(self.poll_interval)
+            except Exception as exc:  # shown in the sidebar; the batch is read again on the next poll
+                self.last_error = repr(exc)
+                self._stop.wait(self.poll_interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='event-ingestor', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def stats(self):
+        recent = list(self.recent)
+        events = sum(n for n, _, _ in recent)
+        seconds = sum(s for _, s, _ in recent)
+        return {
+            **self.totals,
+            'events_per_s': events / seconds if seconds else 0.0,
+            'max_lag_s': max((lag for _, _, lag in recent), default=0.0),
+            'last_applied': self.last_applied,
+            'error': self.last_error,
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Append synthetic customer changes to an event log.")
+    parser.add_argument('log', help="Event log (.jsonl, or .db/.sqlite for SQLite)")
+    parser.add_argument('--data', default=os.path.join('data', 'WA_Fn-UseC_-Telco-Customer-Churn.csv'))
+    parser.add_argument('--simulate', type=int, default=100, help="Events to append")
+    parser.add_argument('--rate', type=float, default=0, help="Events per second (0: all at once)")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    customer_ids = pd.read_csv(args.data, usecols=['customerID'])['customerID'].to_numpy()
+    batch = max(1, int(args.rate)) if args.rate else args.simulate
+    for start in range(0, args.simulate, batch):
+        append_events(args.log, synthetic_events(customer_ids, min(batch, args.simulate - start), rng))
+        if args.rate:
+            time.sleep(batch / args.rate)
+    print(f"Appended {args.simulate} events to {args.log}")
@@ -0,0 +1,187 @@
+# =============================================================================
+# File: src/feature_pipeline.py
+# Role: The single preprocessing path from raw customer records to model inputs.
+#       Fit once at training time and saved next to the model in the registry,
+#       so training and serving apply the same columns, vocabularies and fills.
+# =============================================================================
+
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+from segment_explanation import NON_FEATURE_COLUMNS
+
+PIPELINE_FILE = 'feature_pipeline.joblib'
+# A text column is treated as numeric when at least this share of its values parse
+NUMERIC_PARSE_RATE = 0.95
+# Up to this many rows, category checks use Python set lookups instead of pandas hashing
+SMALL_BATCH = 256
+
+
+class FeatureValidationError(ValueError):
+    """Raised when records are missing columns or carry values the pipeline cannot encode."""
+
+
+def _is_blank(values):
+    """Vectorized missing check for object arrays: None/NaN or whitespace-only strings."""
+    missing = pd.isna(values)
+    text = ~missing & np.frompyfunc(lambda value: isinstance(value, str), 1, 1)(values).astype(bool)
+    if text.any():
+        missing[text] = np.char.strip(values[text].astype(str)) == ''
+    return missing
+
+
+class FeaturePipeline:
+    """
+    Column order, categorical vocabularies, numeric imputation values and dtypes
+    learned from the training frame. `transform` accepts a DataFrame, a single
+    record dict, a list of record dicts or a pyarrow Table/RecordBatch.
+    """
+
+    def fit(self, df):
+        features = df.drop(columns=NON_FEATURE_COLUMNS, errors='ignore')
+        self.feature_names = list(features.columns)
+        self.numeric, self.categorical, self.integer = [], [], []
+        self.vocabularies, self.fill_values = {}, {}
+        for column in self.feature_names:
+            parsed = pd.to_numeric(features[column], errors='coerce')
+            if pd.api.types.is_numeric_dtype(features[column]) or parsed.notna().mean() >= NUMERIC_PARSE_RATE:
+                self.numeric.append(column)
+                self.fill_values[column] = float(parsed.median())
+                if pd.api.types.is_integer_dtype(features[column]):
+                    # Counts such as tenure stay integers (and display as such)
+                    self.integer.append(column)
+                    self.fill_values[column] = float(round(self.fill_values[column]))
+            else:
+                self.categorical.append(column)
+                self.vocabularies[column] = sorted(features[column].dropna().astype(str).unique().tolist())
+        return self
+
+    @property
+    def _vocabulary_sets(self):
+        # Built lazily so pickled pipelines stay plain data
+        if getattr(self, '_sets', None) is None:
+            self._sets = {column: frozenset(vocabulary) for column, vocabulary in self.vocabularies.items()}
+        return self._sets
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_sets', None)
+        return state
+
+    def fingerprint(self):
+        """
+        Short hash of the fitted state and of this module's code: it changes whenever the
+        same raw record could be encoded (and displayed) differently.
+        """
+        digest = hashlib.sha1(json.dumps(self.__getstate__(), sort_keys=True, default=str).encode('utf-8'))
+        with open(__file__, 'rb') as f:
+            digest.update(f.read())
+        return digest.hexdigest()[:12]
+
+    @property
+    def cat_feature_indices(self):
+        return [self.feature_names.index(column) for column in self.categorical]
+
+    @property
+    def dtypes(self):
+        return {column: ('int64' if column in self.integer else 'float64' if column in self.numeric else 'category')
+                for column in self.feature_names}
+
+    # --- Input adapters ---
+    def _columns(self, data):
+        """{column: 1-D numpy array} for the feature columns of any supported input."""
+        if isinstance(data, dict):
+            data = [data]
+        if isinstance(data, list):
+            missing = [column for column in self.feature_names if data and column not in data[0]]
+            self._check_missing(missing)
+            return {column: np.asarray([record.get(column) for record in data], dtype=object)
+                    for column in self.feature_names}
+        if isinstance(data, pd.DataFrame):
+            self._check_missing([column for column in self.feature_names if column not in data.columns])
+            return {column: data[column].to_numpy() for column in self.feature_names}
+        if hasattr(data, 'schema') and hasattr(data, 'column'):
+            # pyarrow Table or RecordBatch
+            self._check_missing([column for column in self.feature_names if column not in data.schema.names])
+            return {column: data.column(column).to_numpy(zero_copy_only=False) for column in self.feature_names}
+        raise TypeError(f"Unsupported input type: {type(data).__name__}")
+
+    @staticmethod
+    def _check_missing(missing):
+        if missing:
+            raise FeatureValidationError(f"Missing feature columns: {', '.join(missing)}")
+
+    # --- Validation and conversion (vectorized per column) ---
+    def _parse_numeric(self, column, values, problems):
+        if values.dtype.kind in 'iuf':
+            parsed = values.astype(np.float64, copy=True)
+        else:
+            try:
+                parsed = values.astype(np.float64)
+            except (TypeError, ValueError):
+                # Text such as ' ' for a new customer's TotalCharges: blanks are imputed, the rest is invalid
+                parsed = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=np.float64, copy=True)
+                invalid = np.isnan(parsed) & ~_is_blank(values)
+                if invalid.any():
+                    problems.append(f"{column}: {int(invalid.sum())} non-numeric values, e.g. {values[invalid][:3].tolist()}")
+        parsed[np.isnan(parsed)] = self.fill_values[column]
+        if column in self.integer:
+            return parsed.astype(np.int64)
+        return parsed
+
+    def _check_categorical(self, column, values, problems):
+        if len(values) <= SMALL_BATCH:
+            known = np.frompyfunc(self._vocabulary_sets[column].__contains__, 1, 1)(values).astype(bool)
+        else:
+            known = pd.Index(self.vocabularies[column]).get_indexer(values) >= 0
+        if not known.all():
+            problems.append(f"{column}: {int((~known).sum())} unknown values, e.g. {sorted(set(map(str, values[~known][:3])))}")
+        return values
+
+    def _convert(self, data, strict=True):
+        columns = self._columns(data)
+        problems = []
+        for column in self.numeric:
+            columns[column] = self._parse_numeric(column, columns[column], problems)
+        for column in self.categorical:
+            columns[column] = self._check_categorical(column, columns[column], problems)
+        if problems and strict:
+            raise FeatureValidationError("Invalid feature values -> " + "; ".join(problems))
+        return columns
+
+    # --- Outputs ---
+    def transform(self, data, strict=True):
+        """
+        Model input matrix (n, n_features) as an object array in training column
+        order: categoricals as str, numerics as int or float. CatBoost and SHAP take this
+        directly, without building a DataFrame per request.
+        """
+        columns = self._convert(data, strict)
+        n_rows = len(columns[self.feature_names[0]])
+        matrix = np.empty((n_rows, len(self.feature_names)), dtype=object)
+        for i, column in enumerate(self.feature_names):
+            matrix[:, i] = columns[column]
+        return matrix
+
+    def transform_frame(self, data, strict=True):
+        """Same inputs as `transform`, as a DataFrame (for batch paths that select columns by name)."""
+        columns = self._convert(data, strict)
+        return pd.DataFrame({column: columns[column] for column in self.feature_names})
+
+    def encode(self, data, strict=True):
+        """
+        Compact arrays for libraries without native categoricals: (codes, numeric),
+        codes as int8/int16 vocabulary positions (-1 for unknown), numerics as float32.
+        Column order is `self.categorical` then `self.numeric`.
+        """
+        columns = self._convert(data, strict)
+        code_dtype = np.int8 if max(map(len, self.vocabularies.values()), default=0) < 127 else np.int16
+        codes = np.column_stack([
+            pd.Index(self.vocabularies[column]).get_indexer(columns[column]).astype(code_dtype)
+            for column in self.categorical
+        ])
+        numeric = np.column_stack([columns[column] for column in self.numeric]).astype(np.float32)
+        return codes, numeric
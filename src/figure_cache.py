@@ -0,0 +1,191 @@
+# =============================================================================
+# File: src/figure_cache.py
+# Role: Bounded LRU cache of serialized Plotly figures shared across sessions,
+#       keyed by chart id, filter combination, data version and figure code.
+# =============================================================================
+
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+
+from disk_cache import library_versions
+from model_registry import file_hash
+
+# Libraries whose version changes the figure JSON built from the same data
+FIGURE_LIBRARIES = ['numpy', 'pandas', 'plotly']
+
+
+class FigureCache:
+    """
+    Stores figure JSON per (chart id, filter selection, data version). A hit skips
+    both the aggregation and the figure construction. Entries evicted from memory
+    are spilled to `spill_dir` (if set) and read back from there on a later miss;
+    the spill directory is kept under `max_spill_bytes` with least-recently-used
+    eviction, tracked in memory (spills left by earlier processes are listed once,
+    oldest mtime first; disk hits refresh a file's mtime for them).
+    Spills outlive the process, so every key also hashes `sources` (files, or the
+    modules defining the given classes/functions: the code that builds the figures)
+    and the versions of FIGURE_LIBRARIES, as disk_cache.py does.
+    """
+
+    def __init__(self, max_entries=256, spill_dir=None, max_spill_bytes=256 << 20, sources=()):
+        self.max_entries = max_entries
+        self.spill_dir = spill_dir
+        self.max_spill_bytes = max_spill_bytes
+        self.code_version = self._code_version(sources)
+        self._entries = OrderedDict()
+        self._spill_sizes = OrderedDict()
+        self._spill_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.spill_evictions = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            for _, size, path in sorted(self._spilled()):
+                self._spill_sizes[os.path.basename(path)[:-len('.json')]] = size
+                self._spill_bytes += size
+
+    @staticmethod
+    def _code_version(sources):
+        paths = [source if isinstance(source, str) else inspect.getfile(source) for source in sources]
+        payload = json.dumps([[file_hash(path) for path in paths], library_versions(FIGURE_LIBRARIES)])
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+    def make_key(self, chart_id, selection, data_version):
+        payload = json.dumps([chart_id, sorted(selection.items()), data_version, self.code_version], default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, f"{key}.json")
+
+    def _get(self, key):
+        with self._lock:
+            figure_json = self._entries.get(key)
+            if figure_json is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return figure_json
+
+        if not self.spill_dir:
+            return None
+        path = self._spill_path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                figure_json = f.read()
+        except FileNotFoundError:  # never spilled, or evicted from disk
+            self._forget_spill(key)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            if key in self._spill_sizes:
+                self._spill_sizes.move_to_end(key)
+        self._put(key, figure_json)
+        with self._lock:
+            self.disk_hits += 1
+        return figure_json
+
+    def _put(self, key, figure_json):
+        evicted = []
+        with self._lock:
+            self._entries[key] = figure_json
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False))
+                self.evictions += 1
+
+        if self.spill_dir and evicted:
+            for evicted_key, evicted_json in evicted:
+                self._spill(evicted_key, evicted_json)
+            self._evict_spilled()
+
+    def _spill(self, key, figure_json):
+        # A unique temporary file renamed into place: concurrent spills of the same
+        # key never interleave and readers never see a partial file
+        data = figure_json.encode('utf-8')
+        fd, tmp_path = tempfile.mkstemp(dir=self.spill_dir, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._spill_path(key))
+        except Exception:
+            self._remove(tmp_path)
+            raise
+        with self._lock:
+            self._spill_bytes += len(data) - self._spill_sizes.pop(key, 0)
+            self._spill_sizes[key] = len(data)
+
+    def _forget_spill(self, key):
+        with self._lock:
+            self._spill_bytes -= self._spill_sizes.pop(key, 0)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _spilled(self):
+        """(mtime, size, path) of every spilled figure on disk."""
+        entries = []
+        for file_name in os.listdir(self.spill_dir):
+            if file_name.endswith('.json'):
+                path = os.path.join(self.spill_dir, file_name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+        return entries
+
+    def _evict_spilled(self):
+        """Deletes least recently used spilled figures until the directory fits in `max_spill_bytes`."""
+        evicted = []
+        with self._lock:
+            while self._spill_bytes > self.max_spill_bytes and self._spill_sizes:
+                key, size = self._spill_sizes.popitem(last=False)
+                self._spill_bytes -= size
+                self.spill_evictions += 1
+                evicted.append(key)
+        for key in evicted:
+            self._remove(self._spill_path(key))
+
+    def get_or_build(self, chart_id, selection, data_version, builder):
+        """Returns the cached figure, or calls `builder()` and caches its result."""
+        key = self.make_key(chart_id, selection, data_version)
+        figure_json = self._get(key)
+        if figure_json is None:
+            with self._lock:
+                self.misses += 1
+            figure_json = builder().to_json()
+            self._put(key, figure_json)
+        return pio.from_json(figure_json)
+
+    def stats(self):
+        """Hit/miss counters and current size."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'spill_evictions': self.spill_evictions,
+                'spill_bytes': self._spill_bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -1,36 +1,599 @@
+from functools import partial
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from bitmap_index import filters_to_selection
+from job_scheduler import INTERACTIVE
+from sidebar import render_segment_filters
+import tracing
+from what_if import SCENARIO_OPTIONS, simulate_segment_steps
+
+# Point-level charts draw at most this many (randomly sampled) customers
+SCATTER_SAMPLE_SIZE = 20_000
+HISTOGRAM_SAMPLE_SIZE = 200_000
+
+# Chart builds queue behind single-customer scoring (priority 0) on the interactive pool
+CHART_PRIORITY = 1
+
+@tracing.traced('chart.churn_by_tenure')
+def build_churn_by_tenure_figure(query_backend, selection):
+    """Churn Rate Trend by Tenure Groups."""
+    churn_by_tenure = query_backend.churn_rate_by_tenure_group(selection)
+
+    fig = px.line(
+        churn_by_tenure,
+        x='Tenure Group',
+        y='Churn Rate',
+        title="<b>Churn Rate by Tenure Groups</b>",
+        markers=True,
+        color_discrete_sequence=['#008080']
+    )
+    fig.update_traces(line=dict(width=4), marker=dict(size=12))
+    fig.update_layout(
+        font=dict(color='#2d3748', size=16),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        title_font_size=20,
+        title_font_color='#2d3748',
+        height=550,
+        xaxis_title="<b>Tenure (Months)</b>",
+        yaxis_title="<b>Churn Rate (%)</b>",
+        hovermode='x unified',
+        xaxis=dict(
+            tickfont=dict(size=12, color='#2d3748'),
+            title=dict(font=dict(size=14, color='#2d3748'))
+        ),
+        yaxis=dict(
+            tickfont=dict(size=12, color='#2d3748'),
+            title=dict(font=dict(size=14, color='#2d3748'))
+        )
+    )
+    return fig
+
+
+@tracing.traced('chart.contract_distribution')
+def build_contract_distribution_figure(query_backend, selection):
+    """Contract Distribution."""
+    contract_dist = query_backend.value_counts('Contract', selection)
+
+    fig = px.pie(
+        contract_dist,
+        values='Count',
+        names='Contract',
+        title="<b>Contract Type Distribution</b>",
+        color_discrete_sequence=['#008080', '#20b2aa', '#5fc7c7'],
+        hole=0.4
+    )
+    fig.update_traces(textposition='inside', textfont_size=18, textfont_color='white')
+    fig.update_layout(
+        font=dict(color='#2d3748', size=16),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        title_font_size=20,
+        title_font_color='#2d3748',
+        height=550,
+        showlegend=True,
+        legend=dict(font=dict(size=14))
+    )
+    return fig
+
+
+@tracing.traced('chart.churn_by_internet_service')
+def build_churn_by_internet_service_figure(query_backend, selection):
+    """Internet Service Distribution."""
+    internet_churn = query_backend.churn_rate_by('InternetService', selection)
+    internet_churn.columns = ['Internet Service', 'Churn Rate']
+
+    fig = px.bar(
+        internet_churn,
+        x='Internet Service',
+        y='Churn Rate',
+        title="<b>Churn by Internet Service</b>",
+        color='Churn Rate',
+        color_continuous_scale=['#48bb78', '#f56565'],
+        text_auto='.1f'
+    )
+    fig.update_traces(texttemplate='%{y:.1f}%', textposition='outside', textfont_size=15)
+    fig.update_layout(
+        font=dict(color='#2d3748', size=14),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        title_font_size=18,
+        title_font_color='#2d3748',
+        height=500,
+        showlegend=False,
+        xaxis_title="<b>Service Type</b>",
+        yaxis_title="<b>Churn Rate (%)</b>",
+        xaxis=dict(
+            tickfont=dict(size=13, color='#2d3748'),
+            title=dict(font=dict(size=14, color='#2d3748'))
+        ),
+        yaxis=dict(
+            tickfont=dict(size=13, color='#2d3748'),
+            title=dict(font=dict(size=14, color='#2d3748'))
+        )
+    )
+    return fig
+
+
+@tracing.traced('chart.churn_by_payment_method')
+def build_churn_by_payment_method_figure(query_backend, selection):
+    """Payment Method Churn."""
+    payment_churn = query_backend.churn_rate_by('PaymentMethod', selection)
+    payment_churn.columns = ['Payment Method', 'Churn Rate']
+
+    fig = px.bar(
+        payment_churn,
+        x='Payment Method',
+        y='Churn Rate',
+        title="<b>Churn by Payment Method</b>",
+        color='Churn Rate',
+        color_continuous_scale=['#48bb78', '#f56565'],
+        text_auto='.1f'
+    )
+    fig.update_traces(texttemplate='%{y:.1f}%', textposition='outside', textfont_size=15)
+    fig.update_layout(
+        font=dict(color='#2d3748', size=14),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        title_font_size=18,
+        title_font_color='#2d3748',
+        height=500,
+        showlegend=False,
+        xaxis_title="<b>Payment Method</b>",
+        yaxis_title="<b>Churn Rate (%)</b>",
+        xaxis=dict(
+            tickfont=dict(size=12, color='#2d3748'),
+            title=dict(font=dict(size=14, color='#2d3748')),
+            tickangle=-45
+        ),
+        yaxis=dict(
+            tickfont=dict(size=13, color='#2d3748'),
+            title=dict(font=dict(size=14, color='#2d3748'))
+        )
+    )
+    return fig
+
+
+@tracing.traced('chart.gender_distribution')
+def build_gender_distribution_figure(query_backend, selection):
+    """Gender Distribution."""
+    gender_dist = query_backend.value_counts('gender', selection)
+    gender_dist.columns = ['Gender', 'Count']
+
+    fig = px.pie(
+        gender_dist,
+        values='Count',
+        names='Gender',
+        title="<b>Gender Distribution</b>",
+        color_discrete_sequence=['#008080', '#20b2aa'],
+        hole=0.3
+    )
+    fig.update_traces(textposition='inside', textinfo='percent+label', textfont_size=16, textfont_color='white')
+    fig.update_layout(
+        font=dict(color='#2d3748', size=14),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        title_font_size=18,
+        title_font_color='#2d3748',
+        height=500,
+        showlegend=False
+    )
+    return fig
+
+
+@tracing.traced('chart.charges_vs_tenure')
+def build_charges_vs_tenure_figure(query_backend, selection):
+    """Monthly Charges vs Tenure Scatter."""
+    scatter_rows = query_backend.rows(['tenure', 'MonthlyCharges', 'Churn', 'TotalCharges'], selection, limit=SCATTER_SAMPLE_SIZE)
+    fig = px.scatter(
+        scatter_rows,
+        x='tenure',
+        y='MonthlyCharges',
+        color='Churn',
+        title='<b>Monthly Charges vs. Tenure Analysis</b>',
+        labels={'tenure': '<b>Tenure (Months)</b>', 'MonthlyCharges': '<b>Monthly Charges ($)</b>'},
+        color_discrete_map={'Yes': '#f56565', 'No': '#48bb78'},
+        opacity=0.6,
+        size='TotalCharges',
+        size_max=15
+    )
+    fig.update_layout(
+        font=dict(color='#2d3748', size=16),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        title_font_size=20,
+        title_font_color='#2d3748',
+        height=550,
+        legend=dict(title='<b>Churn Status</b>', font=dict(size=14)),
+        xaxis=dict(
+            tickfont=dict(size=14, color='#2d3748'),
+            title=dict(text='<b>Tenure (Months)</b>', font=dict(size=16, color='#2d3748'))
+        ),
+        yaxis=dict(
+            tickfont=dict(size=14, color='#2d3748'),
+            title=dict(text='<b>Monthly Charges ($)</b>', font=dict(size=16, color='#2d3748'))
+        )
+    )
+    return fig
+
 
-def page_global_analytics(df_data, filters):
+@tracing.traced('chart.service_adoption')
+def build_service_adoption_figure(query_backend, selection):
+    """Additional Services Adoption."""
+    add_services = ['OnlineSecurity', 'OnlineBackup', 'DeviceProtection', 'TechSupport']
+    service_df = query_backend.adoption_rates(add_services, selection)
+    service_df['Service'] = service_df['Service'].str.replace('Online', '')
+    fig = px.bar(
+        service_df,
+        y='Service',
+        x='Adoption',
+        title="<b>Service Adoption Rates</b>",
+        orientation='h',
+        color='Adoption',
+        color_continuous_scale=['#e0f2f1', '#008080'],
+        text_auto='.1f'
+    )
+    fig.update_traces(texttemplate='%{x:.1f}%', textposition='outside', textfont_size=15)
+    fig.update_layout(
+        font=dict(color='#2d3748', size=16),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        title_font_size=20,
+        title_font_color='#2d3748',
+        height=550,
+        showlegend=False,
+        xaxis_title="<b>Adoption Rate (%)</b>",
+        yaxis_title="<b>Service Type</b>",
+        xaxis=dict(
+            tickfont=dict(size=14, color='#2d3748'),
+            title=dict(font=dict(size=16, color='#2d3748'))
+        ),
+        yaxis=dict(
+            tickfont=dict(size=14, color='#2d3748'),
+            title=dict(font=dict(size=16, color='#2d3748'))
+        )
+    )
+    return fig
+
+
+@tracing.traced('chart.demographic_churn')
+def build_demographic_churn_figure(query_backend, selection):
+    """Senior Citizen vs Churn."""
+    senior_churn = query_backend.churn_rate_by('SeniorCitizen', selection).set_index('SeniorCitizen')['Churn Rate']
+    partner_churn = query_backend.churn_rate_by('Partner', selection).set_index('Partner')['Churn Rate']
+    demographics = [
+        {'Category': 'Senior Citizens', 'Churn Rate': senior_churn.get(1, 0)},
+        {'Category': 'Non-Seniors', 'Churn Rate': senior_churn.get(0, 0)},
+        {'Category': 'With Partner', 'Churn Rate': partner_churn.get('Yes', 0)},
+        {'Category': 'No Partner', 'Churn Rate': partner_churn.get('No', 0)},
+    ]
+
+    demo_df = pd.DataFrame(demographics)
+    fig = px.bar(
+        demo_df,
+        x='Category',
+        y='Churn Rate',
+        title="<b>Demographic Churn Analysis</b>",
+        color='Category',
+        color_discrete_sequence=['#008080', '#20b2aa', '#5fc7c7', '#7dd3d3'],
+        text_auto='.1f'
+    )
+    fig.update_traces(texttemplate='%{y:.1f}%', textposition='outside', textfont_size=15)
+    fig.update_layout(
+        font=dict(color='#2d3748', size=16),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        title_font_size=20,
+        title_font_color='#2d3748',
+        height=550,
+        showlegend=False,
+        xaxis_title="<b>Demographic Category</b>",
+        yaxis_title="<b>Churn Rate (%)</b>",
+        xaxis=dict(
+            tickfont=dict(size=14, color='#2d3748'),
+            title=dict(font=dict(size=16, color='#2d3748'))
+        ),
+        yaxis=dict(
+            tickfont=dict(size=14, color='#2d3748'),
+            title=dict(font=dict(size=16, color='#2d3748'))
+        )
+    )
+    return fig
+
+
+@tracing.traced('chart.tenure_distribution')
+def build_tenure_distribution_figure(query_backend, selection):
+    """Tenure Distribution Histogram."""
+    tenure_rows = query_backend.rows(['tenure'], selection, limit=HISTOGRAM_SAMPLE_SIZE)
+    fig = px.histogram(
+        tenure_rows,
+        x='tenure',
+        nbins=40,
+        title="<b>Customer Tenure Distribution</b>",
+        color_discrete_sequence=['#008080'],
+        marginal='box'
+    )
+    fig.update_layout(
+        font=dict(color='#2d3748', size=16),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        title_font_size=20,
+        title_font_color='#2d3748',
+        height=550,
+        xaxis_title="<b>Tenure (Months)</b>",
+        yaxis_title="<b>Number of Customers</b>",
+        showlegend=False,
+        xaxis=dict(
+            tickfont=dict(size=14, color='#2d3748'),
+            title=dict(font=dict(size=16, color='#2d3748'))
+        ),
+        yaxis=dict(
+            tickfont=dict(size=14, color='#2d3748'),
+            title=dict(font=dict(size=16, color='#2d3748'))
+        )
+    )
+    return fig
+
+
+# Chart grid layout: (column widths, [(chart id, figure builder), ...]) per row
+CHART_ROWS = [
+    # Main charts: churn by tenure group, contract distribution
+    ([1.2, 1], [('churn_by_tenure', build_churn_by_tenure_figure),
+                ('contract_distribution', build_contract_distribution_figure)]),
+    # Internet service, payment method and gender
+    (3, [('churn_by_internet_service', build_churn_by_internet_service_figure),
+         ('churn_by_payment_method', build_churn_by_payment_method_figure),
+         ('gender_distribution', build_gender_distribution_figure)]),
+    # Monthly charges vs tenure scatter, additional services adoption
+    ([1.5, 1], [('charges_vs_tenure', build_charges_vs_tenure_figure),
+                ('service_adoption', build_service_adoption_figure)]),
+    # Demographics: senior citizen churn, tenure histogram
+    (2, [('demographic_churn', build_demographic_churn_figure),
+         ('tenure_distribution', build_tenure_distribution_figure)]),
+]
+
+
+def submit_charts(figure_cache, query_backend, selection, data_version, scheduler):
     """
-    Displays the global analytics page with Power BI-style layout.
+    Queues every chart of the grid as an interactive job on the shared `scheduler`; returns
+    {chart id: job}. Chart aggregations (pandas/numpy or DuckDB) release the GIL for most of
+    their work, so they overlap with each other and with the KPI cards, while bulk jobs of
+    other sessions pause for them like for any interactive call.
     """
-    selected_contract, selected_internet, selected_payment = filters
-    
-    # Professional header
+    return {
+        chart_id: scheduler.submit(
+            figure_cache.get_or_build,
+            (chart_id, selection, data_version, partial(builder, query_backend, selection)),
+            kind=INTERACTIVE, name=f'chart.{chart_id}', priority=CHART_PRIORITY
+        )
+        for _, charts in CHART_ROWS
+        for chart_id, builder in charts
+    }
+
+
+def describe_selection(selection):
+    """Human-readable filter selection, e.g. "Contract = Month-to-month" or "all customers"."""
+    return " · ".join(f"{column} = {value}" for column, value in selection.items()) or "all customers"
+
+
+@st.fragment(run_every=0.5)
+def render_job_progress(job, label):
+    """Progress bar and cancel button of a running bulk job, polled twice a second; reruns the app once it ends."""
+    if job.done():
+        st.rerun()
+    progress = job.progress
+    st.progress(progress or 0.0, text=f"{label} ({job.status}, {progress or 0.0:.0%})")
+    if st.button("⏹️ Cancel", key=f"cancel_job_{job.id}", disabled=job.cancel_requested):
+        job.cancel()
+
+
+@st.fragment
+def render_what_if(model, model_inputs, filter_index, explanation_store, threshold, model_is_student, scheduler):
+    """
+    What-if section. As a fragment, editing the scenario or running it reruns only
+    this section instead of the whole app and every chart above it; filter changes
+    do not rerun it either, a run uses the segment selected at that moment. The
+    rescoring runs as a bulk job on `scheduler`, so it never delays diagnosis
+    scoring of other sessions and can be cancelled.
+    """
+    selection = st.session_state.get('analytics_selection', {})
+    segment_mask = filter_index.mask(selection)
+
+    # --- SEVENTH ROW: What-If Simulation ---
     st.markdown("""
-    <div class="main-header">
-        <h1>📈 Global Customer Analytics Dashboard</h1>
-        <p>Comprehensive overview of customer base patterns and trends for strategic business insights.</p>
+    <div class="section-header">
+        <h2>🔮 What-If Simulation</h2>
     </div>
     """, unsafe_allow_html=True)
 
-    # Create a filtered dataframe to be used by all charts
-    filtered_df = df_data.copy()
-    if selected_contract != 'All':
-        filtered_df = filtered_df[filtered_df['Contract'] == selected_contract]
-    if selected_internet != 'All':
-        filtered_df = filtered_df[filtered_df['InternetService'] == selected_internet]
-    if selected_payment != 'All':
-        filtered_df = filtered_df[filtered_df['PaymentMethod'] == selected_payment]
-
-    # Calculate KPIs
-    total_customers = filtered_df.shape[0]
-    churn_rate = (filtered_df['Churn'].value_counts(normalize=True).get('Yes', 0) * 100)
-    average_tenure = filtered_df['tenure'].mean()
-    avg_monthly_charges = filtered_df['MonthlyCharges'].mean()
-    total_revenue = filtered_df['TotalCharges'].sum()
+    col1, col2, col3 = st.columns([1, 1, 1], gap="medium")
+    with col1:
+        scenario_feature = st.selectbox("Change feature", list(SCENARIO_OPTIONS.keys()))
+    with col2:
+        scenario_value = st.selectbox("To value", SCENARIO_OPTIONS[scenario_feature])
+    with col3:
+        st.markdown("<div style='margin-top: 1.75rem;'></div>", unsafe_allow_html=True)
+        run_simulation = st.button("▶️ Run Simulation", use_container_width=True)
+
+    st.caption(f"High-risk customers are those scored at or above the model's operating threshold ({threshold:.0%}).")
+
+    scenario_key = (tuple(sorted(selection.items())), scenario_feature, scenario_value, threshold, model_is_student)
+    if run_simulation:
+        running_key, running_job = st.session_state.get('what_if_job', (None, None))
+        if running_job is not None:
+            running_job.cancel()
+        with tracing.span('what_if_submit'):
+            st.session_state.what_if_job = (scenario_key, scheduler.submit(
+                simulate_segment_steps,
+                (model, model_inputs, segment_mask, {scenario_feature: scenario_value}),
+                {'baseline': None if model_is_student else explanation_store.probabilities, 'threshold': threshold},
+                name='what_if'
+            ))
+
+    job_key, job = st.session_state.get('what_if_job', (None, None))
+    if job is not None and not job.done():
+        if job_key == scenario_key:
+            render_job_progress(job, "Rescoring segment")
+            return
+        job.cancel()
+    if job is not None:
+        del st.session_state['what_if_job']
+        if job.status == 'done':
+            st.session_state.what_if_result = (job_key, job.result())
+        elif job.status == 'failed':
+            st.error(f"Simulation failed: {job.error}", icon="🚨")
+        elif job_key == scenario_key:
+            st.info("Simulation cancelled.", icon="⏹️")
+
+    stored_key, result = st.session_state.get('what_if_result', (None, None))
+    if stored_key == scenario_key and result is not None:
+        st.caption(f"Segment: {describe_selection(selection)}")
+        col1, col2, col3, col4 = st.columns(4, gap="medium")
+        col1.metric("Customers", f"{result['customers']:,}")
+        col2.metric("Avg Churn Risk", f"{result['scenario_mean']:.1%}", f"{result['mean_shift']:+.1%}", delta_color="inverse")
+        col3.metric("High-Risk Customers", f"{result['scenario_high_risk']:,}",
+                    f"{result['scenario_high_risk'] - result['baseline_high_risk']:+,}", delta_color="inverse")
+        col4.metric("Expected Churned Revenue / Month", f"${result['scenario_churned_revenue']:,.0f}",
+                    f"{-result['revenue_saved']:+,.0f}", delta_color="inverse")
+
+        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+        fig = px.bar(
+            result['distribution'],
+            x='Probability',
+            y='Customers',
+            color='Scenario',
+            barmode='group',
+            title=f"<b>Predicted Churn: Current vs. {scenario_feature} = {scenario_value}</b>",
+            color_discrete_map={'Current': '#a0aec0', 'What-if': '#008080'}
+        )
+        fig.update_layout(
+            font=dict(color='#2d3748', size=16),
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            title_font_size=20,
+            title_font_color='#2d3748',
+            height=450,
+            xaxis_title="<b>Predicted Churn Probability</b>",
+            yaxis_title="<b>Number of Customers</b>",
+            xaxis=dict(
+                tickformat='.0%',
+                tickfont=dict(size=14, color='#2d3748'),
+                title=dict(font=dict(size=16, color='#2d3748'))
+            ),
+            yaxis=dict(
+                tickfont=dict(size=14, color='#2d3748'),
+                title=dict(font=dict(size=16, color='#2d3748'))
+            )
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        st.markdown('</div>', unsafe_allow_html=True)
+    elif not segment_mask.any():
+        st.info("No customers match the current filters.")
+
+
+@st.fragment
+def render_snapshot_trend(snapshot_store):
+    """
+    Snapshot trend section; the range slider and segment picker rerun only this fragment.
+    Filter changes do not rerun it: it reads the selected segment on its own reruns.
+    """
+    selection = st.session_state.get('analytics_selection', {})
+    # --- EIGHTH ROW: Churn Trend Across Snapshots ---
+    st.markdown("""
+    <div class="section-header">
+        <h2>📅 Churn Trend Across Snapshots</h2>
+    </div>
+    """, unsafe_allow_html=True)
+
+    snapshot_dates = snapshot_store.snapshot_dates()
+    if not snapshot_dates:
+        st.info("No customer snapshots yet. Ingest periodic extracts with `python src/snapshot_store.py <extract.csv> --date YYYY-MM-DD`.")
+        return
+
+    col1, col2 = st.columns([2, 1], gap="medium")
+    with col1:
+        if len(snapshot_dates) > 1:
+            start_date, end_date = st.select_slider(
+                "Snapshot range",
+                options=snapshot_dates,
+                value=(snapshot_dates[0], snapshot_dates[-1])
+            )
+        else:
+            start_date = end_date = snapshot_dates[0]
+    with col2:
+        trend_segment = st.selectbox("Segment by", ['None', 'Contract', 'InternetService', 'PaymentMethod'])
+    segment_column = None if trend_segment == 'None' else trend_segment
+    st.caption(f"Segment: {describe_selection(selection)}")
+
+    # Only the partitions inside the selected range are read
+    with tracing.span('snapshot_trend'):
+        trend = snapshot_store.churn_trend(start_date, end_date, segment_column, selection)
+
+    col1, col2 = st.columns(2, gap="medium")
+    for column, (metric, title) in zip(
+        (col1, col2),
+        [('ChurnRate', 'Churn Rate (%)'), ('PredictedRisk', 'Avg Predicted Risk (%)')]
+    ):
+        with column:
+            st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+            fig = px.line(
+                trend,
+                x='SnapshotDate',
+                y=metric,
+                color=segment_column,
+                title=f"<b>{title} over Time</b>",
+                markers=True,
+                color_discrete_sequence=['#008080', '#20b2aa', '#5fc7c7', '#7dd3d3']
+            )
+            fig.update_traces(line=dict(width=4), marker=dict(size=10))
+            fig.update_layout(
+                font=dict(color='#2d3748', size=16),
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                title_font_size=20,
+                title_font_color='#2d3748',
+                height=450,
+                xaxis_title="<b>Snapshot Date</b>",
+                yaxis_title=f"<b>{title}</b>",
+                hovermode='x unified',
+                xaxis=dict(
+                    tickfont=dict(size=14, color='#2d3748'),
+                    title=dict(font=dict(size=16, color='#2d3748'))
+                ),
+                yaxis=dict(
+                    tickfont=dict(size=14, color='#2d3748'),
+                    title=dict(font=dict(size=16, color='#2d3748'))
+                )
+            )
+            st.plotly_chart(fig, use_container_width=True)
+            st.markdown('</div>', unsafe_allow_html=True)
+
+
+@st.fragment
+def render_filtered_overview(df_data, query_backend, filter_index, explanation_store, sketch_store, figure_cache,
+                             data_version, scheduler):
+    """
+    KPI cards, chart grid and segment explanation for the sidebar filters. The filters are
+    rendered by this fragment, so changing them reruns only this part of the page, not the
+    what-if and trend fragments below; the selection is shared with them in session state.
+    """
+    # All charts query the same filter selection through the query backend
+    selection = filters_to_selection(render_segment_filters(df_data))
+    st.session_state.analytics_selection = selection
+    segment_mask = filter_index.mask(selection)
+    # Chart aggregations run on the scheduler's interactive pool while the KPI cards render
+    chart_jobs = submit_charts(figure_cache, query_backend, selection, data_version, scheduler)
+
+    # Calculate KPIs (served from the partition sketches by the pandas backend)
+    with tracing.span('kpis'):
+        kpis = query_backend.kpis(selection)
+    total_customers = kpis['total_customers']
+    churn_rate = kpis['churn_rate']
+    average_tenure = kpis['average_tenure']
+    avg_monthly_charges = kpis['avg_monthly_charges']
+    total_revenue = kpis['total_revenue']
 
     # --- TOP ROW: KPI Cards (Power BI Style) ---
     col1, col2, col3, col4 = st.columns(4, gap="medium")
@@ -87,213 +650,68 @@ def page_global_analytics(df_data, filters):
         </div>
         """, unsafe_allow_html=True)
 
-    st.markdown("<div style='margin: 2rem 0;'></div>", unsafe_allow_html=True)
-
-    # --- SECOND ROW: Main Charts (2 columns) ---
-    col1, col2 = st.columns([1.2, 1], gap="medium")
-
-    with col1:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        # Churn Rate Trend by Tenure Groups
-        filtered_df['TenureGroup'] = pd.cut(filtered_df['tenure'], 
-                                            bins=[0, 12, 24, 36, 48, 72], 
-                                            labels=['0-12', '12-24', '24-36', '36-48', '48+'])
-        churn_by_tenure = filtered_df.groupby('TenureGroup')['Churn'].apply(
-            lambda x: (x == 'Yes').sum() / len(x) * 100
-        ).reset_index()
-        churn_by_tenure.columns = ['Tenure Group', 'Churn Rate']
-        
-        fig = px.line(
-            churn_by_tenure,
-            x='Tenure Group',
-            y='Churn Rate',
-            title="<b>Churn Rate by Tenure Groups</b>",
-            markers=True,
-            color_discrete_sequence=['#008080']
-        )
-        fig.update_traces(line=dict(width=4), marker=dict(size=12))
-        fig.update_layout(
-            font=dict(color='#2d3748', size=16),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            title_font_size=20,
-            title_font_color='#2d3748',
-            height=550,
-            xaxis_title="<b>Tenure (Months)</b>",
-            yaxis_title="<b>Churn Rate (%)</b>",
-            hovermode='x unified',
-            xaxis=dict(
-                tickfont=dict(size=12, color='#2d3748'),
-                title=dict(font=dict(size=14, color='#2d3748'))
-            ),
-            yaxis=dict(
-                tickfont=dict(size=12, color='#2d3748'),
-                title=dict(font=dict(size=14, color='#2d3748'))
-            )
-        )
-        st.plotly_chart(fig, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
-
-    with col2:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        # Contract Distribution
-        contract_dist = filtered_df['Contract'].value_counts().reset_index()
-        contract_dist.columns = ['Contract', 'Count']
-        
-        fig = px.pie(
-            contract_dist,
-            values='Count',
-            names='Contract',
-            title="<b>Contract Type Distribution</b>",
-            color_discrete_sequence=['#008080', '#20b2aa', '#5fc7c7'],
-            hole=0.4
+    # Percentile bands answered from the quantile sketches
+    with st.expander("📐 Percentile Bands"):
+        summary = sketch_store.kpis(selection)
+        st.markdown(
+            f"Median tenure: **{summary['median_tenure']:.0f} months** · "
+            f"Median monthly charge: **${summary['median_monthly_charges']:.2f}** · "
+            f"Total revenue: **${total_revenue:,.0f}**"
         )
-        fig.update_traces(textposition='inside', textfont_size=18, textfont_color='white')
-        fig.update_layout(
-            font=dict(color='#2d3748', size=16),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            title_font_size=20,
-            title_font_color='#2d3748',
-            height=550,
-            showlegend=True,
-            legend=dict(font=dict(size=14))
+        band_selection = {column: value for column, value in selection.items() if column != 'Contract'}
+        st.dataframe(
+            sketch_store.percentile_bands('Contract', 'MonthlyCharges', selection=band_selection),
+            use_container_width=True,
+            hide_index=True
         )
-        st.plotly_chart(fig, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
 
-    st.markdown("<div style='margin: 1.5rem 0;'></div>", unsafe_allow_html=True)
+    st.markdown("<div style='margin: 2rem 0;'></div>", unsafe_allow_html=True)
 
-    # --- THIRD ROW: 3 Medium Charts ---
-    col1, col2, col3 = st.columns(3, gap="medium")
+    # --- SECOND TO FIFTH ROWS: Chart grid ---
+    # Every chart's aggregation was queued above; render them row by row
+    for widths, charts in CHART_ROWS:
+        columns = st.columns(widths, gap="medium")
+        for column, (chart_id, _) in zip(columns, charts):
+            with column:
+                st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+                st.plotly_chart(chart_jobs[chart_id].result(), use_container_width=True)
+                st.markdown('</div>', unsafe_allow_html=True)
+        if charts is not CHART_ROWS[-1][1]:
+            st.markdown("<div style='margin: 1.5rem 0;'></div>", unsafe_allow_html=True)
 
-    with col1:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        # Internet Service Distribution
-        internet_churn = filtered_df.groupby('InternetService')['Churn'].apply(
-            lambda x: (x == 'Yes').sum() / len(x) * 100
-        ).reset_index()
-        internet_churn.columns = ['Internet Service', 'Churn Rate']
-        
-        fig = px.bar(
-            internet_churn,
-            x='Internet Service',
-            y='Churn Rate',
-            title="<b>Churn by Internet Service</b>",
-            color='Churn Rate',
-            color_continuous_scale=['#48bb78', '#f56565'],
-            text_auto='.1f'
-        )
-        fig.update_traces(texttemplate='%{y:.1f}%', textposition='outside', textfont_size=15)
-        fig.update_layout(
-            font=dict(color='#2d3748', size=14),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            title_font_size=18,
-            title_font_color='#2d3748',
-            height=500,
-            showlegend=False,
-            xaxis_title="<b>Service Type</b>",
-            yaxis_title="<b>Churn Rate (%)</b>",
-            xaxis=dict(
-                tickfont=dict(size=13, color='#2d3748'),
-                title=dict(font=dict(size=14, color='#2d3748'))
-            ),
-            yaxis=dict(
-                tickfont=dict(size=13, color='#2d3748'),
-                title=dict(font=dict(size=14, color='#2d3748'))
-            )
-        )
-        st.plotly_chart(fig, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
-
-    with col2:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        # Payment Method Churn
-        payment_churn = filtered_df.groupby('PaymentMethod')['Churn'].apply(
-            lambda x: (x == 'Yes').sum() / len(x) * 100
-        ).reset_index()
-        payment_churn.columns = ['Payment Method', 'Churn Rate']
-        
-        fig = px.bar(
-            payment_churn,
-            x='Payment Method',
-            y='Churn Rate',
-            title="<b>Churn by Payment Method</b>",
-            color='Churn Rate',
-            color_continuous_scale=['#48bb78', '#f56565'],
-            text_auto='.1f'
-        )
-        fig.update_traces(texttemplate='%{y:.1f}%', textposition='outside', textfont_size=15)
-        fig.update_layout(
-            font=dict(color='#2d3748', size=14),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            title_font_size=18,
-            title_font_color='#2d3748',
-            height=500,
-            showlegend=False,
-            xaxis_title="<b>Payment Method</b>",
-            yaxis_title="<b>Churn Rate (%)</b>",
-            xaxis=dict(
-                tickfont=dict(size=12, color='#2d3748'),
-                title=dict(font=dict(size=14, color='#2d3748')),
-                tickangle=-45
-            ),
-            yaxis=dict(
-                tickfont=dict(size=13, color='#2d3748'),
-                title=dict(font=dict(size=14, color='#2d3748'))
-            )
-        )
-        st.plotly_chart(fig, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
-
-    with col3:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        # Gender Distribution
-        gender_dist = filtered_df['gender'].value_counts().reset_index()
-        gender_dist.columns = ['Gender', 'Count']
-        
-        fig = px.pie(
-            gender_dist,
-            values='Count',
-            names='Gender',
-            title="<b>Gender Distribution</b>",
-            color_discrete_sequence=['#008080', '#20b2aa'],
-            hole=0.3
-        )
-        fig.update_traces(textposition='inside', textinfo='percent+label', textfont_size=16, textfont_color='white')
-        fig.update_layout(
-            font=dict(color='#2d3748', size=14),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            title_font_size=18,
-            title_font_color='#2d3748',
-            height=500,
-            showlegend=False
-        )
-        st.plotly_chart(fig, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+    cache_stats = figure_cache.stats()
+    st.caption(f"Figure cache: {cache_stats['hits'] + cache_stats['disk_hits']} hits · {cache_stats['misses']} misses · {cache_stats['entries']} cached")
 
     st.markdown("<div style='margin: 1.5rem 0;'></div>", unsafe_allow_html=True)
 
-    # --- FOURTH ROW: Large Scatter Plot & Services ---
-    col1, col2 = st.columns([1.5, 1], gap="medium")
+    # --- SIXTH ROW: Segment Explanation (aggregated SHAP) ---
+    st.markdown(f"""
+    <div class="section-header">
+        <h2>🧠 Segment Explanation</h2>
+    </div>
+    <p style="color: #718096;">
+        Model drivers for the {total_customers:,} customers matching the current filters
+        (average predicted churn risk: <strong>{explanation_store.mean_probability(segment_mask):.1%}</strong>).
+    </p>
+    """, unsafe_allow_html=True)
+
+    col1, col2 = st.columns([1.2, 1], gap="medium")
 
     with col1:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        # Monthly Charges vs Tenure Scatter
-        fig = px.scatter(
-            filtered_df,
-            x='tenure',
-            y='MonthlyCharges',
-            color='Churn',
-            title='<b>Monthly Charges vs. Tenure Analysis</b>',
-            labels={'tenure': '<b>Tenure (Months)</b>', 'MonthlyCharges': '<b>Monthly Charges ($)</b>'},
-            color_discrete_map={'Yes': '#f56565', 'No': '#48bb78'},
-            opacity=0.6,
-            size='TotalCharges',
-            size_max=15
+        # Mean |SHAP| per feature, colored by the signed mean contribution
+        with tracing.span('segment_explanation'):
+            segment_shap = explanation_store.explain_segment(segment_mask).head(10)
+        fig = px.bar(
+            segment_shap.iloc[::-1],
+            x='mean_abs_shap',
+            y='feature',
+            orientation='h',
+            title="<b>Top Churn Drivers in Segment</b>",
+            color='mean_shap',
+            color_continuous_scale=['#48bb78', '#e2e8f0', '#f56565'],
+            color_continuous_midpoint=0,
+            labels={'mean_abs_shap': 'Mean |SHAP|', 'feature': 'Feature', 'mean_shap': 'Mean SHAP'}
         )
         fig.update_layout(
             font=dict(color='#2d3748', size=16),
@@ -302,14 +720,15 @@ def page_global_analytics(df_data, filters):
             title_font_size=20,
             title_font_color='#2d3748',
             height=550,
-            legend=dict(title='<b>Churn Status</b>', font=dict(size=14)),
+            xaxis_title="<b>Mean |SHAP| (impact on log-odds)</b>",
+            yaxis_title="<b>Feature</b>",
             xaxis=dict(
                 tickfont=dict(size=14, color='#2d3748'),
-                title=dict(text='<b>Tenure (Months)</b>', font=dict(size=16, color='#2d3748'))
+                title=dict(font=dict(size=16, color='#2d3748'))
             ),
             yaxis=dict(
                 tickfont=dict(size=14, color='#2d3748'),
-                title=dict(text='<b>Monthly Charges ($)</b>', font=dict(size=16, color='#2d3748'))
+                title=dict(font=dict(size=16, color='#2d3748'))
             )
         )
         st.plotly_chart(fig, use_container_width=True)
@@ -317,25 +736,15 @@ def page_global_analytics(df_data, filters):
 
     with col2:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        # Additional Services Adoption
-        add_services = ['OnlineSecurity', 'OnlineBackup', 'DeviceProtection', 'TechSupport']
-        service_adoption = []
-        for service in add_services:
-            adoption_rate = (filtered_df[service] == 'Yes').sum() / len(filtered_df) * 100
-            service_adoption.append({'Service': service.replace('Online', ''), 'Adoption': adoption_rate})
-        
-        service_df = pd.DataFrame(service_adoption)
+        # Distribution of predicted churn probability in the segment
+        probability_dist = explanation_store.probability_distribution(segment_mask)
         fig = px.bar(
-            service_df,
-            y='Service',
-            x='Adoption',
-            title="<b>Service Adoption Rates</b>",
-            orientation='h',
-            color='Adoption',
-            color_continuous_scale=['#e0f2f1', '#008080'],
-            text_auto='.1f'
+            probability_dist,
+            x='Probability',
+            y='Customers',
+            title="<b>Predicted Churn Distribution</b>",
+            color_discrete_sequence=['#008080']
         )
-        fig.update_traces(texttemplate='%{x:.1f}%', textposition='outside', textfont_size=15)
         fig.update_layout(
             font=dict(color='#2d3748', size=16),
             plot_bgcolor='rgba(0,0,0,0)',
@@ -343,10 +752,11 @@ def page_global_analytics(df_data, filters):
             title_font_size=20,
             title_font_color='#2d3748',
             height=550,
-            showlegend=False,
-            xaxis_title="<b>Adoption Rate (%)</b>",
-            yaxis_title="<b>Service Type</b>",
+            bargap=0.05,
+            xaxis_title="<b>Predicted Churn Probability</b>",
+            yaxis_title="<b>Number of Customers</b>",
             xaxis=dict(
+                tickformat='.0%',
                 tickfont=dict(size=14, color='#2d3748'),
                 title=dict(font=dict(size=16, color='#2d3748'))
             ),
@@ -358,98 +768,32 @@ def page_global_analytics(df_data, filters):
         st.plotly_chart(fig, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
 
+
+def page_global_analytics(df_data, model_inputs, model, query_backend, filter_index, explanation_store,
+                          sketch_store, snapshot_store, figure_cache, data_version, scheduler, threshold=0.5,
+                          model_is_student=False):
+    """
+    Displays the global analytics page with Power BI-style layout.
+    `model_inputs` are the FeaturePipeline rows aligned with `df_data`, rescored by the what-if
+    as a bulk job on the shared JobScheduler.
+    With `model_is_student`, the what-if baseline is rescored by the student instead of
+    read from the explanation store, so both sides come from the same model.
+    """
+    # Professional header
+    st.markdown("""
+    <div class="main-header">
+        <h1>📈 Global Customer Analytics Dashboard</h1>
+        <p>Comprehensive overview of customer base patterns and trends for strategic business insights.</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    render_filtered_overview(df_data, query_backend, filter_index, explanation_store, sketch_store, figure_cache,
+                             data_version, scheduler)
+
     st.markdown("<div style='margin: 1.5rem 0;'></div>", unsafe_allow_html=True)
 
-    # --- FIFTH ROW: Demographics Analysis ---
-    col1, col2 = st.columns(2, gap="medium")
+    render_what_if(model, model_inputs, filter_index, explanation_store, threshold, model_is_student, scheduler)
 
-    with col1:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        # Senior Citizen vs Churn
-        demographics = []
-        demographics.append({
-            'Category': 'Senior Citizens',
-            'Churn Rate': (filtered_df[filtered_df['SeniorCitizen'] == 1]['Churn'] == 'Yes').sum() / 
-                         len(filtered_df[filtered_df['SeniorCitizen'] == 1]) * 100 if len(filtered_df[filtered_df['SeniorCitizen'] == 1]) > 0 else 0
-        })
-        demographics.append({
-            'Category': 'Non-Seniors',
-            'Churn Rate': (filtered_df[filtered_df['SeniorCitizen'] == 0]['Churn'] == 'Yes').sum() / 
-                         len(filtered_df[filtered_df['SeniorCitizen'] == 0]) * 100 if len(filtered_df[filtered_df['SeniorCitizen'] == 0]) > 0 else 0
-        })
-        demographics.append({
-            'Category': 'With Partner',
-            'Churn Rate': (filtered_df[filtered_df['Partner'] == 'Yes']['Churn'] == 'Yes').sum() / 
-                         len(filtered_df[filtered_df['Partner'] == 'Yes']) * 100 if len(filtered_df[filtered_df['Partner'] == 'Yes']) > 0 else 0
-        })
-        demographics.append({
-            'Category': 'No Partner',
-            'Churn Rate': (filtered_df[filtered_df['Partner'] == 'No']['Churn'] == 'Yes').sum() / 
-                         len(filtered_df[filtered_df['Partner'] == 'No']) * 100 if len(filtered_df[filtered_df['Partner'] == 'No']) > 0 else 0
-        })
-        
-        demo_df = pd.DataFrame(demographics)
-        fig = px.bar(
-            demo_df,
-            x='Category',
-            y='Churn Rate',
-            title="<b>Demographic Churn Analysis</b>",
-            color='Category',
-            color_discrete_sequence=['#008080', '#20b2aa', '#5fc7c7', '#7dd3d3'],
-            text_auto='.1f'
-        )
-        fig.update_traces(texttemplate='%{y:.1f}%', textposition='outside', textfont_size=15)
-        fig.update_layout(
-            font=dict(color='#2d3748', size=16),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            title_font_size=20,
-            title_font_color='#2d3748',
-            height=550,
-            showlegend=False,
-            xaxis_title="<b>Demographic Category</b>",
-            yaxis_title="<b>Churn Rate (%)</b>",
-            xaxis=dict(
-                tickfont=dict(size=14, color='#2d3748'),
-                title=dict(font=dict(size=16, color='#2d3748'))
-            ),
-            yaxis=dict(
-                tickfont=dict(size=14, color='#2d3748'),
-                title=dict(font=dict(size=16, color='#2d3748'))
-            )
-        )
-        st.plotly_chart(fig, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+    st.markdown("<div style='margin: 1.5rem 0;'></div>", unsafe_allow_html=True)
 
-    with col2:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        # Tenure Distribution Histogram
-        fig = px.histogram(
-            filtered_df,
-            x='tenure',
-            nbins=40,
-            title="<b>Customer Tenure Distribution</b>",
-            color_discrete_sequence=['#008080'],
-            marginal='box'
-        )
-        fig.update_layout(
-            font=dict(color='#2d3748', size=16),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            title_font_size=20,
-            title_font_color='#2d3748',
-            height=550,
-            xaxis_title="<b>Tenure (Months)</b>",
-            yaxis_title="<b>Number of Customers</b>",
-            showlegend=False,
-            xaxis=dict(
-                tickfont=dict(size=14, color='#2d3748'),
-                title=dict(font=dict(size=16, color='#2d3748'))
-            ),
-            yaxis=dict(
-                tickfont=dict(size=14, color='#2d3748'),
-                title=dict(font=dict(size=16, color='#2d3748'))
-            )
-        )
-        st.plotly_chart(fig, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+    render_snapshot_trend(snapshot_store)
@@ -0,0 +1,215 @@
+# =============================================================================
+# File: src/job_scheduler.py
+# Role: In-process scheduler that keeps interactive work (single-customer
+#       scoring and SHAP, analytics chart builds) responsive while bulk work
+#       (segment rescoring, full table jobs) runs in the same dashboard process.
+#
+# - Two bounded worker pools, each fed by its own priority queue: interactive
+#   jobs never wait behind bulk jobs for a worker.
+# - Bulk jobs are generators that yield (done, total) between chunks. At every
+#   chunk boundary the worker checks for cancellation and pauses while any
+#   interactive job is queued or running, so an interactive call waits for at
+#   most one bulk chunk (keep chunks to a few tens of milliseconds).
+# - A pause is capped at `max_yield_s`, so a stream of interactive calls
+#   slows bulk jobs down but cannot starve them.
+#
+# Benchmark: python src/benchmark_scheduler.py (interactive p99 with and
+# without a full-table background job).
+# =============================================================================
+
+import inspect
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+
+_job_ids = itertools.count(1)
+
+
+class JobCancelled(Exception):
+    """Raised by `Job.result()` for a job cancelled before it finished."""
+
+
+class Job:
+    """
+    Handle of a submitted job: status ('queued', 'running', 'done', 'failed',
+    'cancelled'), progress reported by the job's chunks, `cancel()` and `result()`.
+    """
+
+    def __init__(self, scheduler, func, args, kwargs, kind, name, priority):
+        self.id = next(_job_ids)
+        self.name = name or getattr(func, '__name__', 'job')
+        self.kind = kind
+        self.priority = priority
+        self.status = 'queued'
+        self.done_steps = 0
+        self.total_steps = None
+        self.error = None
+        self.submitted_at = time.perf_counter()
+        self.started_at = None
+        self.finished_at = None
+        self._scheduler = scheduler
+        self._func, self._args, self._kwargs = func, args, kwargs
+        self._result = None
+        self._cancel_requested = threading.Event()
+        self._finished = threading.Event()
+
+    @property
+    def progress(self):
+        """Fraction of the job's steps done, or None until it reports a total."""
+        if self.status == 'done':
+            return 1.0
+        if not self.total_steps:
+            return None
+        return min(self.done_steps / self.total_steps, 1.0)
+
+    @property
+    def cancel_requested(self):
+        return self._cancel_requested.is_set()
+
+    def done(self):
+        return self._finished.is_set()
+
+    def cancel(self):
+        """Requests cancellation; a running bulk job stops at its next chunk boundary."""
+        self._cancel_requested.set()
+        self._scheduler._wake_bulk()
+
+    def result(self, timeout=None):
+        if not self._finished.wait(timeout):
+            raise TimeoutError(f"Job {self.name} did not finish within {timeout}s")
+        if self.status == 'cancelled':
+            raise JobCancelled(self.name)
+        if self.status == 'failed':
+            raise self.error
+        return self._result
+
+    def _finish(self, status, result=None, error=None):
+        self.status, self._result, self.error = status, result, error
+        self.finished_at = time.perf_counter()
+        self._finished.set()
+
+    def summary(self):
+        """Row for the admin panel."""
+        end = self.finished_at or time.perf_counter()
+        return {
+            'Job': f"{self.name} #{self.id}",
+            'Status': self.status,
+            'Progress': self.progress,
+            'Queued (s)': (self.started_at or end) - self.submitted_at,
+            'Running (s)': end - self.started_at if self.started_at else 0.0,
+        }
+
+
+class JobScheduler:
+    """
+    Runs `submit()`ted jobs on an interactive pool and a bulk pool. A job function
+    returning a generator is a chunked job: it yields (done, total) after each chunk
+    and `return`s its result.
+    """
+
+    def __init__(self, interactive_workers=2, bulk_workers=1, max_yield_s=1.0, history=20):
+        self.max_yield_s = max_yield_s
+        self._queues = {INTERACTIVE: queue.PriorityQueue(), BULK: queue.PriorityQueue()}
+        self._idle = threading.Condition()
+        self._interactive_pending = 0
+        self._history = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self.bulk_pauses = 0
+        self.bulk_paused_s = 0.0
+        for kind, n_workers in ((INTERACTIVE, interactive_workers), (BULK, bulk_workers)):
+            for i in range(n_workers):
+                threading.Thread(target=self._worker, args=(kind,), name=f"{kind}-worker-{i}", daemon=True).start()
+
+    def submit(self, func, args=(), kwargs=None, kind=BULK, name=None, priority=0):
+        """Queues `func(*args, **kwargs)`; lower `priority` values run first within a pool."""
+        if kind not in self._queues:
+            raise ValueError(f"Unknown job kind '{kind}' (expected '{INTERACTIVE}' or '{BULK}')")
+        job = Job(self, func, args, kwargs or {}, kind, name, priority)
+        if kind == INTERACTIVE:
+            with self._idle:
+                self._interactive_pending += 1
+        else:
+            with self._lock:
+                self._history.append(job)
+        self._queues[kind].put((priority, job.id, job))
+        return job
+
+    def run_interactive(self, func, *args, **kwargs):
+        """Runs `func` on the interactive pool and returns its result (for request-path calls)."""
+        return self.submit(func, args, kwargs, kind=INTERACTIVE).result()
+
+    def jobs(self):
+        """Recent bulk jobs, newest first."""
+        with self._lock:
+            return list(reversed(self._history))
+
+    def _worker(self, kind):
+        while True:
+            _, _, job = self._queues[kind].get()
+            try:
+                self._run(job)
+            finally:
+                if kind == INTERACTIVE:
+                    with self._idle:
+                        self._interactive_pending -= 1
+                        self._idle.notify_all()
+
+    def _run(self, job):
+        if job.cancel_requested:
+            job._finish('cancelled')
+            return
+        job.status, job.started_at = 'running', time.perf_counter()
+        try:
+            outcome = job._func(*job._args, **job._kwargs)
+            if inspect.isgenerator(outcome):
+                outcome = self._drive(job, outcome)
+            job._finish('done', result=outcome)
+        except JobCancelled:
+            job._finish('cancelled')
+        except Exception as exc:  # surfaced to the caller by Job.result()
+            job._finish('failed', error=exc)
+
+    def _drive(self, job, steps):
+        """Runs a chunked job to completion, yielding to interactive work between chunks."""
+        while True:
+            try:
+                step = next(steps)
+            except StopIteration as stop:
+                return stop.value
+            if step is not None:
+                job.done_steps, job.total_steps = step
+            if job.cancel_requested:
+                steps.close()
+                raise JobCancelled(job.name)
+            if job.kind == BULK:
+                self._yield_to_interactive(job)
+
+    def _yield_to_interactive(self, job):
+        with self._idle:
+            if self._interactive_pending == 0:
+                return
+            start = time.perf_counter()
+            self._idle.wait_for(lambda: self._interactive_pending == 0 or job.cancel_requested,
+                                timeout=self.max_yield_s)
+            self.bulk_pauses += 1
+            self.bulk_paused_s += time.perf_counter() - start
+
+    def _wake_bulk(self):
+        with self._idle:
+            self._idle.notify_all()
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._history)
+        return {
+            'queued_interactive': self._queues[INTERACTIVE].qsize(),
+            'queued_bulk': self._queues[BULK].qsize(),
+            'running_bulk': sum(job.status == 'running' for job in jobs),
+            'bulk_pauses': self.bulk_pauses,
+            'bulk_paused_s': self.bulk_paused_s,
+        }
@@ -0,0 +1,177 @@
+# =============================================================================
+# File: src/load_test.py
+# Role: Headless load test of the dashboard with Streamlit's in-process AppTest.
+#
+# Simulates N concurrent analyst sessions alternating between Global Analytics
+# filter changes / what-if scenario edits and Customer Diagnosis selections, then reports throughput,
+# rerun latency percentiles and memory growth. Runs fully offline.
+#
+# Usage (from the repository root):
+#   python src/load_test.py --sessions 8 --iterations 20 [--max-p95-ms 1500] [--output results.json]
+# =============================================================================
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+FILTER_LABELS = ["📝 Contract Type", "🌐 Internet Service", "💳 Payment Method"]
+CUSTOMER_LABEL = "🔍 Select Customer ID:"
+WHAT_IF_LABEL = "Change feature"
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (Linux /proc, falling back to peak RSS)."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _widget(elements, label):
+    for element in elements:
+        if element.label == label:
+            return element
+    raise LookupError(f"Widget not found: {label}")
+
+
+def _timed_run(at, timeout):
+    start = time.perf_counter()
+    at.run(timeout=timeout)
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return elapsed
+
+
+class Session:
+    """One simulated analyst: its own AppTest (own session state), shared caches."""
+
+    def __init__(self, session_id, iterations, timeout, seed):
+        self.session_id = session_id
+        self.iterations = iterations
+        self.timeout = timeout
+        self.rng = random.Random(seed + session_id)
+        self.latencies = []
+        self.errors = []
+
+    def _navigate(self, at, label):
+        button = next(button for button in at.sidebar.button if label in button.label)
+        button.click()
+        self.latencies.append(('navigate', _timed_run(at, self.timeout)))
+
+    def _change_filters(self, at):
+        selectbox = _widget(at.sidebar.selectbox, self.rng.choice(FILTER_LABELS))
+        selectbox.select(self.rng.choice(selectbox.options))
+        self.latencies.append(('filter', _timed_run(at, self.timeout)))
+
+    def _change_what_if(self, at):
+        selectbox = _widget(at.main.selectbox, WHAT_IF_LABEL)
+        selectbox.select(self.rng.choice(selectbox.options))
+        self.latencies.append(('what_if', _timed_run(at, self.timeout)))
+
+    def _select_customer(self, at):
+        selectbox = _widget(at.sidebar.selectbox, CUSTOMER_LABEL)
+        selectbox.select(self.rng.choice(selectbox.options))
+        self.latencies.append(('diagnosis', _timed_run(at, self.timeout)))
+
+    def run(self):
+        try:
+            at = AppTest.from_file(APP_PATH, default_timeout=self.timeout)
+            self.latencies.append(('initial', _timed_run(at, self.timeout)))
+            for iteration in range(self.iterations):
+                if iteration % 2 == 0:
+                    self._navigate(at, "Dashboard Analytics")
+                    self._change_filters(at)
+                    self._change_filters(at)
+                    self._change_what_if(at)
+                else:
+                    self._navigate(at, "Customer Diagnosis")
+                    self._select_customer(at)
+        except Exception as exc:  # recorded and reported, the other sessions keep going
+            self.errors.append(repr(exc))
+
+
+def summarize(latencies):
+    values = np.asarray([elapsed for _, elapsed in latencies]) * 1000
+    if len(values) == 0:
+        return {'count': 0}
+    return {
+        'count': int(len(values)),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'max_ms': float(values.max()),
+    }
+
+
+def run_load_test(n_sessions, iterations, timeout=120, seed=42):
+    # Warm the shared caches once so the measurement reflects steady-state serving
+    rss_start = current_rss_mb()
+    warmup = Session(-1, 0, timeout, seed)
+    warmup.run()
+    if warmup.errors:
+        raise RuntimeError(f"Warm-up failed: {warmup.errors[0]}")
+    rss_warm = current_rss_mb()
+
+    sessions = [Session(i, iterations, timeout, seed) for i in range(n_sessions)]
+    threads = [threading.Thread(target=session.run, daemon=True) for session in sessions]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    rss_end = current_rss_mb()
+
+    reruns = [item for session in sessions for item in session.latencies if item[0] != 'initial']
+    by_action = {}
+    for action, elapsed in reruns:
+        by_action.setdefault(action, []).append((action, elapsed))
+
+    return {
+        'sessions': n_sessions,
+        'iterations': iterations,
+        'wall_s': wall,
+        'throughput_reruns_per_s': len(reruns) / wall if wall else 0.0,
+        'latency': summarize(reruns),
+        'latency_by_action': {action: summarize(items) for action, items in by_action.items()},
+        'rss_start_mb': rss_start,
+        'rss_warm_mb': rss_warm,
+        'rss_end_mb': rss_end,
+        'rss_growth_per_session_mb': (rss_end - rss_warm) / n_sessions if n_sessions else 0.0,
+        'errors': [error for session in sessions for error in session.errors],
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Headless load test of the churn dashboard.")
+    parser.add_argument('--sessions', type=int, default=4, help="Concurrent simulated sessions")
+    parser.add_argument('--iterations', type=int, default=10, help="Page alternations per session")
+    parser.add_argument('--timeout', type=float, default=120, help="Per-rerun timeout (s)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write the JSON report to this file")
+    parser.add_argument('--max-p95-ms', type=float, help="Exit with status 1 if rerun p95 exceeds this")
+    args = parser.parse_args()
+
+    report = run_load_test(args.sessions, args.iterations, args.timeout, args.seed)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    failed = bool(report['errors'])
+    if args.max_p95_ms is not None and report['latency'].get('p95_ms', 0) > args.max_p95_ms:
+        print(f"❌ p95 rerun latency {report['latency']['p95_ms']:.0f} ms exceeds {args.max_p95_ms:.0f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,239 @@
+# =============================================================================
+# File: src/model_registry.py
+# Role: Local versioned model registry with an atomic "current" pointer, and a
+#       watcher that hot-swaps the dashboard model in the background.
+#
+# Layout:
+#   src/models/registry/v0001/model.joblib
+#   src/models/registry/v0001/feature_pipeline.joblib   (preprocessing fit with the model)
+#   src/models/registry/v0001/metadata.json   (params, metrics, data hash, training time)
+#   src/models/registry/CURRENT               (name of the active version)
+# =============================================================================
+
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import joblib
+
+from feature_pipeline import PIPELINE_FILE
+
+REGISTRY_ROOT = os.path.join('src', 'models', 'registry')
+LEGACY_MODEL_PATH = os.path.join('src', 'models', 'catboost_churn_model.joblib')
+LEGACY_VERSION = 'legacy'
+MODEL_FILE = 'model.joblib'
+METADATA_FILE = 'metadata.json'
+POINTER_FILE = 'CURRENT'
+
+
+def file_hash(path):
+    """SHA-1 of a file's contents (used as the training data hash)."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _atomic_write_text(path, text):
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class ModelRegistry:
+    """Versioned model artifacts on the local filesystem."""
+
+    def __init__(self, root=REGISTRY_ROOT):
+        self.root = root
+
+    def versions(self):
+        """Registered versions, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if name.startswith('v') and name[1:].isdigit())
+
+    def register(self, model, params=None, metrics=None, data_hash=None, artifacts=None, activate=True, **extra):
+        """
+        Stores a new version and (by default) makes it current. The version directory
+        is written under a temporary name and renamed into place, so readers never
+        see a partial artifact. `artifacts` maps file names to objects saved with joblib.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        existing = self.versions()
+        version = f"v{int(existing[-1][1:]) + 1 if existing else 1:04d}"
+
+        staging = tempfile.mkdtemp(dir=self.root, prefix='.staging-')
+        try:
+            joblib.dump(model, os.path.join(staging, MODEL_FILE))
+            for name, artifact in (artifacts or {}).items():
+                joblib.dump(artifact, os.path.join(staging, name))
+            metadata = {
+                'version': version,
+                'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+                'model_class': type(model).__name__,
+                'params': params or {},
+                'metrics': metrics or {},
+                'data_hash': data_hash,
+                'artifacts': sorted(artifacts or {}),
+                **extra,
+            }
+            with open(os.path.join(staging, METADATA_FILE), 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, indent=2, default=str)
+            os.rename(staging, os.path.join(self.root, version))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        if activate:
+            self.set_current(version)
+        return version
+
+    def set_current(self, version):
+        """Atomically points CURRENT at `version`."""
+        if version not in self.versions():
+            raise ValueError(f"Unknown model version: {version}")
+        _atomic_write_text(os.path.join(self.root, POINTER_FILE), version)
+
+    def current_version(self):
+        """The active version, or None when nothing has been registered."""
+        try:
+            with open(os.path.join(self.root, POINTER_FILE), encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def pointer_stamp(self):
+        """Cheap change detector for the CURRENT pointer (one stat call)."""
+        try:
+            return os.stat(os.path.join(self.root, POINTER_FILE)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def versions_stamp(self):
+        """Cheap change detector for the set of versions: registering renames a directory into the root."""
+        try:
+            return os.stat(self.root).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def metadata(self, version):
+        if version == LEGACY_VERSION:
+            return {'version': LEGACY_VERSION, 'model_class': 'CatBoostClassifier'}
+        with open(os.path.join(self.root, version, METADATA_FILE), encoding='utf-8') as f:
+            return json.load(f)
+
+    def model_path(self, version):
+        """File holding a version's model (content-hashed by caches of artifacts derived from it)."""
+        if version == LEGACY_VERSION:
+            return LEGACY_MODEL_PATH
+        return os.path.join(self.root, version, MODEL_FILE)
+
+    def load(self, version):
+        """Loads (model, metadata) for a version; 'legacy' loads the pre-registry model file."""
+        return joblib.load(self.model_path(version)), self.metadata(version)
+
+    def student_for(self, teacher_version):
+        """Latest student distilled from `teacher_version` (see distill.py), or None."""
+        for version in reversed(self.versions()):
+            metadata = self.metadata(version)
+            if metadata.get('role') == 'student' and metadata.get('teacher_version') == teacher_version:
+                return version
+        return None
+
+    def load_artifact(self, version, name, default=None):
+        """Loads an extra artifact saved with a version, or `default` if absent."""
+        path = os.path.join(self.root, version, name)
+        if version == LEGACY_VERSION or not os.path.exists(path):
+            return default
+        return joblib.load(path)
+
+
+class LoadedModel:
+    """An immutable bundle swapped as a whole, so a rerun never mixes versions."""
+
+    def __init__(self, version, model, explainer, metadata, pipeline=None):
+        self.version = version
+        self.model = model
+        self.explainer = explainer
+        self.metadata = metadata
+        self.pipeline = pipeline
+
+
+class ModelWatcher:
+    """
+    Serves the current model to every session. `poll()` is called on each rerun;
+    at most every `poll_interval` seconds it stats the CURRENT pointer and, when it
+    moved, loads the new version and its explainer in a background thread. Sessions
+    keep using the previous bundle until the new one is ready: `warm(bundle)`, if set,
+    runs in that thread before the swap, to prebuild caches keyed by the new version.
+    Versions saved without a feature pipeline (legacy) get `default_pipeline()`.
+    `registry_stamp` is refreshed by the same polls, so callers can key caches of
+    registry listings on it instead of listing the registry on every rerun.
+    """
+
+    def __init__(self, registry, make_explainer, default_pipeline=None, poll_interval=5.0, warm=None):
+        self.registry = registry
+        self.make_explainer = make_explainer
+        self.default_pipeline = default_pipeline
+        self.poll_interval = poll_interval
+        self.warm = warm
+        self._lock = threading.Lock()
+        self._loading = False
+        self._last_poll = 0.0
+        self._stamp = registry.pointer_stamp()
+        self.registry_stamp = registry.versions_stamp()
+        self.active = self._load(registry.current_version() or LEGACY_VERSION)
+
+    def _load(self, version):
+        model, metadata = self.registry.load(version)
+        pipeline = self.registry.load_artifact(version, PIPELINE_FILE)
+        if pipeline is None and self.default_pipeline is not None:
+            pipeline = self.default_pipeline()
+        return LoadedModel(version, model, self.make_explainer(model), metadata, pipeline)
+
+    def _load_in_background(self, version):
+        try:
+            try:
+                bundle = self._load(version)
+            except Exception:
+                # Forget the pointer stamp so the next poll retries the load
+                self._stamp = None
+                raise
+            try:
+                if self.warm is not None:
+                    self.warm(bundle)
+            finally:
+                # A failed warm-up only leaves those caches to be built by the sessions
+                self.active = bundle
+        finally:
+            with self._lock:
+                self._loading = False
+
+    def poll(self):
+        """Returns the active bundle, starting a background swap if the pointer moved."""
+        now = time.monotonic()
+        if now - self._last_poll < self.poll_interval:
+            return self.active
+
+        with self._lock:
+            self._last_poll = now
+            self.registry_stamp = self.registry.versions_stamp()
+            stamp = self.registry.pointer_stamp()
+            if stamp == self._stamp or self._loading:
+                return self.active
+            version = self.registry.current_version()
+            self._stamp = stamp
+            if version is None or version == self.active.version:
+                return self.active
+            self._loading = True
+
+        threading.Thread(target=self._load_in_background, args=(version,), daemon=True).start()
+        return self.active
@@ -0,0 +1,228 @@
+# =============================================================================
+# File: src/pipeline_runner.py
+# Role: Small DAG runner for the training scripts (load -> split -> features ->
+#       train -> evaluate -> export) with content-addressed stage caching.
+#
+# - A Stage is a function plus its declared inputs: upstream stages (passed as
+#   keyword arguments named after them), parameters and data files.
+# - Each stage's cache key hashes its source code, the source files of the
+#   project modules it uses (found from the names its code references, and what
+#   those modules import in turn), parameters, file contents, library versions
+#   and the hashes of its upstream *outputs*. A stage whose code changed but
+#   whose output came out identical does not invalidate anything downstream.
+# - Stages whose inputs are ready run concurrently in a thread pool, so
+#   independent branches (e.g. one model fit per library) overlap. Model fits
+#   run in native code and release the GIL.
+#
+# Cache layout: output/pipeline_cache/<stage>/<key>.joblib  ->  (output, output hash)
+# =============================================================================
+
+import hashlib
+import inspect
+import json
+import os
+import sys
+import tempfile
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import joblib
+
+from disk_cache import library_versions
+from model_registry import file_hash
+
+CACHE_DIR = os.path.join('output', 'pipeline_cache')
+# Modules defined under this directory are hashed into the keys of the stages that use them
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _digest(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=repr).encode('utf-8')).hexdigest()
+
+
+def code_hash(func):
+    """Hash of a function's source (falls back to its bytecode when the source is unavailable)."""
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        source = func.__code__.co_code.hex()
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+
+def _project_file(value):
+    """Source file of a module, class or function defined under PROJECT_DIR, else None."""
+    if not isinstance(value, (types.ModuleType, type, types.FunctionType)):
+        return None
+    try:
+        path = os.path.abspath(inspect.getfile(value))
+    except (OSError, TypeError):
+        return None
+    return path if path.startswith(PROJECT_DIR + os.sep) else None
+
+
+def _global_names(code):
+    """Global names referenced by a code object and the functions/comprehensions nested in it."""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _global_names(const)
+    return names
+
+
+def code_dependencies(func):
+    """
+    Source files of the project modules `func` depends on: those defining the
+    modules, classes and functions it references, and the project modules these
+    import in turn. Functions of `func`'s own module are followed through their
+    own references instead, so editing one stage does not invalidate the others.
+    """
+    own_file = _project_file(func)
+    files, seen, pending = set(), set(), [func]
+    while pending:
+        function = pending.pop()
+        if function in seen:
+            continue
+        seen.add(function)
+        for name in _global_names(function.__code__):
+            value = function.__globals__.get(name)
+            path = _project_file(value)
+            if path is None:
+                continue
+            if path != own_file:
+                files.add(path)
+            elif isinstance(value, types.FunctionType):
+                pending.append(value)
+
+    modules = {os.path.abspath(module.__file__): module for module in list(sys.modules.values())
+               if getattr(module, '__file__', None)}
+    pending = list(files)
+    while pending:
+        module = modules.get(pending.pop())
+        for value in vars(module).values() if module is not None else ():
+            path = _project_file(value)
+            if path is not None and path != own_file and path not in files:
+                files.add(path)
+                pending.append(path)
+    return sorted(files)
+
+
+class Stage:
+    """
+    One step of a pipeline. `func` is called with one keyword argument per name in
+    `inputs` (that stage's output), then `params`, then `options`. Only `options`
+    stay out of the cache key (use them for things like thread counts).
+    `files` are hashed by content, as are the project modules found by
+    `code_dependencies(func)` and any extra `sources` (modules, classes or files the
+    function reaches without naming them). `still_valid(output)` can reject a cached
+    output that refers to something outside the cache (e.g. a registry version).
+    """
+
+    def __init__(self, name, func, inputs=(), params=None, files=(), options=None, cache=True, still_valid=None,
+                 sources=()):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.params = params or {}
+        self.files = list(files)
+        self.sources = list(sources)
+        self.options = options or {}
+        self.cache = cache
+        self.still_valid = still_valid
+
+    def module_files(self):
+        """Project source files hashed into the key."""
+        files = set(code_dependencies(self.func))
+        files.update(source if isinstance(source, str) else os.path.abspath(inspect.getfile(source))
+                     for source in self.sources)
+        return sorted(files)
+
+    def key(self, input_hashes, libraries=None):
+        return _digest({
+            'stage': self.name,
+            'code': code_hash(self.func),
+            'modules': {os.path.relpath(path, PROJECT_DIR): file_hash(path) for path in self.module_files()},
+            'params': self.params,
+            'files': {path: file_hash(path) for path in self.files},
+            'libraries': libraries if libraries is not None else library_versions(),
+            'inputs': {name: input_hashes[name] for name in self.inputs},
+        })
+
+
+class PipelineRunner:
+    """Runs a list of stages, reusing cached outputs whose inputs did not change."""
+
+    def __init__(self, stages, cache_dir=CACHE_DIR):
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache_dir = cache_dir
+        self.libraries = library_versions()
+        self.log = []
+        for stage in stages:
+            unknown = [name for name in stage.inputs if name not in self.stages]
+            if unknown:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {', '.join(unknown)}")
+
+    def _required(self, targets):
+        required, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in required:
+                required.add(name)
+                stack.extend(self.stages[name].inputs)
+        return required
+
+    def _cache_path(self, stage, key):
+        return os.path.join(self.cache_dir, stage.name, f"{key}.joblib")
+
+    def _run_stage(self, stage, results, force):
+        """Returns (output, output hash, status, seconds) for one stage."""
+        start = time.perf_counter()
+        key = stage.key({name: results[name][1] for name in stage.inputs}, self.libraries)
+        path = self._cache_path(stage, key)
+        if stage.cache and not force and os.path.exists(path):
+            output, output_hash = joblib.load(path)
+            if stage.still_valid is None or stage.still_valid(output):
+                return output, output_hash, 'cached', time.perf_counter() - start
+
+        kwargs = {name: results[name][0] for name in stage.inputs}
+        output = stage.func(**kwargs, **stage.params, **stage.options)
+        output_hash = joblib.hash(output)
+        if stage.cache:
+            # Written under a temporary name and renamed, so a crash never leaves a partial entry
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+            with os.fdopen(fd, 'wb') as f:
+                joblib.dump((output, output_hash), f)
+            os.replace(tmp_path, path)
+        return output, output_hash, 'ran', time.perf_counter() - start
+
+    def run(self, targets=None, workers=4, force=(), verbose=True):
+        """
+        Runs `targets` (default: every stage) and whatever they depend on.
+        Stages named in `force` re-execute even when cached. Returns {stage: output}.
+        """
+        required = self._required(targets or list(self.stages))
+        order = [name for name in self.stages if name in required]
+        results, self.log = {}, []
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            running = {}
+            while len(results) < len(order):
+                for name in order:
+                    stage = self.stages[name]
+                    if name in results or name in running.values():
+                        continue
+                    if all(dependency in results for dependency in stage.inputs):
+                        running[pool.submit(self._run_stage, stage, results, name in force)] = name
+                if not running:
+                    raise ValueError(f"Dependency cycle among stages: {', '.join(set(order) - set(results))}")
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    output, output_hash, status, seconds = future.result()
+                    results[name] = (output, output_hash)
+                    self.log.append({'stage': name, 'status': status, 'seconds': seconds})
+                    if verbose:
+                        print(f"  {'♻️ ' if status == 'cached' else '▶️ '} {name}: {status} ({seconds:.2f}s)")
+
+        return {name: output for name, (output, _) in results.items()}
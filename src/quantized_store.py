@@ -0,0 +1,304 @@
+# =============================================================================
+# File: src/quantized_store.py
+# Role: Compact, memory-mappable storage of per-customer churn scores and SHAP
+#       values, with validated error bounds. Drop-in for ExplanationStore in the
+#       segment and diagnosis views.
+#
+# Encodings of the SHAP matrix (explainer.shap_values returns float64, 8 bytes
+# per value):
+#   int8     1 byte/value: per-feature symmetric scale (max |SHAP| / 127).
+#            Error <= scale / 2 per feature.
+#   float16  2 bytes/value. Relative error <= 2**-11.
+#   topk     the k largest |SHAP| of each customer as (uint8 feature index,
+#            float16 value) pairs: 3k bytes/customer. The other contributions
+#            read back as 0, so every dropped |SHAP| must be within a declared
+#            tolerance (TOPK_TOLERANCE unless given): raise k if it is not.
+# Probabilities are stored as uint16 fixed point (error <= 1 / 131070).
+#
+# Every build decodes the result and checks it against the exact values: an
+# encoding that breaks its bound raises QuantizationError instead of being served.
+# All arrays are plain numpy arrays, so a store saved with joblib (uncompressed)
+# is read back memory-mapped with joblib.load(path, mmap_mode='r').
+# =============================================================================
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+ENCODINGS = ('int8', 'float16', 'topk')
+PROBABILITY_SCALE = np.iinfo(np.uint16).max
+INT8_LEVELS = 127
+FLOAT16_RELATIVE_ERROR = 2.0 ** -11
+# Absolute error of float16 subnormals (values below 2**-14)
+FLOAT16_ABSOLUTE_ERROR = 2.0 ** -25
+FLOAT16_MAX = float(np.finfo(np.float16).max)
+FLOAT32_EPS = float(np.finfo(np.float32).eps)
+DEFAULT_TOP_K = 6
+# Largest |SHAP| (log-odds) the topk encoding may drop; the served model's 6th-largest
+# contribution stays under 0.29
+TOPK_TOLERANCE = 0.3
+CHUNK_SIZE = 65_536
+
+
+class QuantizationError(ValueError):
+    """Decoded values are further from the exact ones than the encoding's error bound."""
+
+
+def _chunks(n_rows, chunk_size=CHUNK_SIZE):
+    for start in range(0, n_rows, chunk_size):
+        yield slice(start, min(start + chunk_size, n_rows))
+
+
+class QuantizedExplanationStore:
+    """
+    Same queries as ExplanationStore (`explain_segment`, `probability_distribution`,
+    `mean_probability`, `probabilities`, `shap_rows`) over the encoded arrays.
+    Segment reductions are done chunk by chunk, so memory-mapped stores never load
+    more than one chunk of decoded values.
+    """
+
+    def __init__(self, encoding, feature_names, base_value, probability_codes, shap_codes,
+                 scales=None, top_indices=None, error_bounds=None, max_errors=None, topk_tolerance=None):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown encoding '{encoding}' (expected one of {', '.join(ENCODINGS)})")
+        self.encoding = encoding
+        self.feature_names = list(feature_names)
+        self.base_value = base_value
+        self.probability_codes = probability_codes
+        # int8/float16: (n_rows, n_features); topk: (n_rows, k) float16 values
+        self.shap_codes = shap_codes
+        self.scales = scales
+        self.top_indices = top_indices
+        self.error_bounds = error_bounds
+        self.max_errors = max_errors
+        self.topk_tolerance = topk_tolerance
+        self._probabilities = None
+
+    # --- Encoding ---
+    @classmethod
+    def from_exact(cls, shap_matrix, probabilities, feature_names, base_value, encoding='int8',
+                   top_k=DEFAULT_TOP_K, topk_tolerance=TOPK_TOLERANCE):
+        """
+        Encodes an exact SHAP matrix and probability vector (in-memory or memory-mapped
+        arrays) chunk by chunk, then validates the decoded values against them.
+        """
+        n_rows, n_features = shap_matrix.shape
+        max_abs = np.zeros(n_features)
+        for rows in _chunks(n_rows):
+            max_abs = np.maximum(max_abs, np.abs(shap_matrix[rows]).max(axis=0, initial=0.0))
+
+        scales, top_indices = None, None
+        if encoding == 'int8':
+            scales = np.where(max_abs > 0, max_abs / INT8_LEVELS, 1.0).astype(np.float32)
+            shap_codes = np.empty((n_rows, n_features), dtype=np.int8)
+            bounds = scales / 2 + max_abs * FLOAT32_EPS
+        elif encoding == 'float16':
+            if max_abs.max(initial=0.0) > FLOAT16_MAX:
+                raise QuantizationError(f"SHAP values up to {max_abs.max():.3g} overflow float16")
+            shap_codes = np.empty((n_rows, n_features), dtype=np.float16)
+            bounds = max_abs * FLOAT16_RELATIVE_ERROR + FLOAT16_ABSOLUTE_ERROR
+        elif encoding == 'topk':
+            if n_features > np.iinfo(np.uint8).max + 1:
+                raise ValueError(f"topk stores feature indices as uint8: at most 256 features, got {n_features}")
+            if not 0 < top_k < n_features:
+                raise ValueError(f"top_k must be between 1 and {n_features - 1}")
+            shap_codes = np.empty((n_rows, top_k), dtype=np.float16)
+            top_indices = np.empty((n_rows, top_k), dtype=np.uint8)
+            # Kept values are float16-rounded; dropped ones read back as 0
+            bounds = np.maximum(max_abs * FLOAT16_RELATIVE_ERROR + FLOAT16_ABSOLUTE_ERROR, topk_tolerance)
+        else:
+            raise ValueError(f"Unknown encoding '{encoding}' (expected one of {', '.join(ENCODINGS)})")
+
+        probability_codes = np.empty(n_rows, dtype=np.uint16)
+        for rows in _chunks(n_rows):
+            chunk = np.asarray(shap_matrix[rows], dtype=np.float64)
+            probability_codes[rows] = np.rint(np.clip(probabilities[rows], 0.0, 1.0) * PROBABILITY_SCALE)
+            if encoding == 'int8':
+                shap_codes[rows] = np.clip(np.rint(chunk / scales), -INT8_LEVELS, INT8_LEVELS)
+            elif encoding == 'float16':
+                shap_codes[rows] = chunk
+            else:
+                order = np.argpartition(-np.abs(chunk), top_k - 1, axis=1)
+                kept = order[:, :top_k]
+                top_indices[rows] = kept
+                shap_codes[rows] = np.take_along_axis(chunk, kept, axis=1)
+
+        store = cls(encoding, feature_names, base_value, probability_codes, shap_codes, scales=scales,
+                    top_indices=top_indices, error_bounds=bounds,
+                    topk_tolerance=topk_tolerance if encoding == 'topk' else None)
+        store.validate(shap_matrix, probabilities)
+        return store
+
+    @classmethod
+    def build(cls, model, explainer, features, encoding='int8', top_k=DEFAULT_TOP_K, chunk_size=50_000,
+              scratch_dir=None, topk_tolerance=TOPK_TOLERANCE):
+        """
+        Scores and explains every row of `features` (FeaturePipeline output) chunk by
+        chunk. The exact values go to memory-mapped scratch files on disk, not RAM,
+        and are deleted once encoded and validated.
+        """
+        n_rows, n_features = features.shape
+        with tempfile.TemporaryDirectory(dir=scratch_dir, prefix='explanations-') as scratch:
+            shap_matrix = np.lib.format.open_memmap(os.path.join(scratch, 'shap.npy'), mode='w+',
+                                                    dtype=np.float64, shape=(n_rows, n_features))
+            probabilities = np.lib.format.open_memmap(os.path.join(scratch, 'probabilities.npy'), mode='w+',
+                                                      dtype=np.float64, shape=(n_rows,))
+            for start in range(0, n_rows, chunk_size):
+                chunk = features.iloc[start:start + chunk_size]
+                shap_matrix[start:start + len(chunk)] = explainer.shap_values(chunk)
+                probabilities[start:start + len(chunk)] = model.predict_proba(chunk)[:, 1]
+
+            store = cls.from_exact(shap_matrix, probabilities, features.columns, float(explainer.expected_value),
+                                   encoding, top_k, topk_tolerance)
+            del shap_matrix, probabilities
+        return store
+
+    def updated(self, positions, shap_rows, probabilities):
+        """
+        Store re-encoded (same encoding and k) with the rows at `positions` replaced.
+        The other rows are re-encoded from their decoded values: their bound is the
+        current one plus the error observed in re-encoding them.
+        """
+        n_rows = len(self.probability_codes)
+        shap_matrix = np.empty((n_rows, len(self.feature_names)), dtype=np.float64)
+        for rows in _chunks(n_rows):
+            shap_matrix[rows] = self._decode(rows)
+        all_probabilities = self._decode_probabilities(slice(None)).astype(np.float64)
+        shap_matrix[positions] = shap_rows
+        all_probabilities[positions] = probabilities
+        top_k = self.shap_codes.shape[1] if self.encoding == 'topk' else DEFAULT_TOP_K
+        store = QuantizedExplanationStore.from_exact(shap_matrix, all_probabilities, self.feature_names,
+                                                     self.base_value, self.encoding, top_k,
+                                                     self.topk_tolerance or TOPK_TOLERANCE)
+        store.error_bounds = np.maximum(store.error_bounds, self.error_bounds + store.max_errors)
+        store.max_errors = self.max_errors + store.max_errors
+        return store
+
+    def validate(self, shap_matrix, probabilities):
+        """
+        Decodes every row and compares it with the exact values. Stores the observed
+        per-feature maximum errors and raises QuantizationError if any exceeds its bound.
+        """
+        max_errors = np.zeros(len(self.feature_names))
+        probability_error = 0.0
+        for rows in _chunks(len(self.probability_codes)):
+            error = np.abs(self._decode(rows).astype(np.float64) - shap_matrix[rows])
+            max_errors = np.maximum(max_errors, error.max(axis=0, initial=0.0))
+            probability_error = max(probability_error, float(np.abs(
+                self._decode_probabilities(rows).astype(np.float64) - probabilities[rows]).max(initial=0.0)))
+
+        over = np.flatnonzero(max_errors > self.error_bounds)
+        if len(over):
+            details = ', '.join(f"{self.feature_names[i]} ({max_errors[i]:.4g} > {self.error_bounds[i]:.4g})"
+                                for i in over)
+            raise QuantizationError(f"{self.encoding} SHAP values exceed their error bound: {details}")
+        if probability_error > self.probability_error_bound:
+            raise QuantizationError(f"Probabilities off by {probability_error:.3g} "
+                                    f"(bound {self.probability_error_bound:.3g})")
+        self.max_errors = max_errors
+        return max_errors
+
+    # --- Decoding ---
+    @property
+    def probability_error_bound(self):
+        return 0.5 / PROBABILITY_SCALE + FLOAT32_EPS
+
+    def _decode(self, rows):
+        """float32 SHAP values of a row slice or index array."""
+        codes = self.shap_codes[rows]
+        if self.encoding == 'int8':
+            return codes.astype(np.float32) * self.scales
+        if self.encoding == 'float16':
+            return codes.astype(np.float32)
+        values = np.zeros((len(codes), len(self.feature_names)), dtype=np.float32)
+        np.put_along_axis(values, self.top_indices[rows].astype(np.intp), codes.astype(np.float32), axis=1)
+        return values
+
+    def _decode_probabilities(self, rows):
+        return self.probability_codes[rows].astype(np.float32) / np.float32(PROBABILITY_SCALE)
+
+    @property
+    def probabilities(self):
+        """Decoded churn probabilities of every customer (float32, in RAM; decoded on first access)."""
+        if self._probabilities is None:
+            self._probabilities = self._decode_probabilities(slice(None))
+        return self._probabilities
+
+    def shap_rows(self, positions):
+        """(len(positions), n_features) SHAP values of the customers at `positions`."""
+        return self._decode(np.asarray(positions))
+
+    def _masked_chunks(self, mask):
+        """(row slice, chunk mask) pairs of the chunks containing at least one selected row."""
+        mask = np.asarray(mask, dtype=bool)
+        for rows in _chunks(len(self.probability_codes)):
+            chunk_mask = mask[rows]
+            if chunk_mask.any():
+                yield rows, chunk_mask
+
+    # --- Queries (same results as ExplanationStore, within the error bounds) ---
+    def explain_segment(self, mask):
+        """
+        Returns a per-feature dataframe (mean |SHAP| and signed mean SHAP) for the
+        rows selected by the boolean `mask`, sorted by importance.
+        """
+        n_features = len(self.feature_names)
+        abs_sum, signed_sum, count = np.zeros(n_features), np.zeros(n_features), 0
+        for rows, chunk_mask in self._masked_chunks(mask):
+            if self.encoding == 'int8':
+                # Sums of the integer codes, scaled once per feature (codes never hit -128)
+                segment = self.shap_codes[rows][chunk_mask]
+                abs_sum += np.abs(segment).sum(axis=0, dtype=np.int64) * self.scales.astype(np.float64)
+                signed_sum += segment.sum(axis=0, dtype=np.int64) * self.scales.astype(np.float64)
+            else:
+                segment = self._decode(rows)[chunk_mask]
+                abs_sum += np.abs(segment).sum(axis=0, dtype=np.float64)
+                signed_sum += segment.sum(axis=0, dtype=np.float64)
+            count += len(segment)
+
+        return pd.DataFrame({
+            'feature': self.feature_names,
+            'mean_abs_shap': abs_sum / count if count else abs_sum,
+            'mean_shap': signed_sum / count if count else signed_sum,
+        }).sort_values('mean_abs_shap', ascending=False).reset_index(drop=True)
+
+    def probability_distribution(self, mask, bins=20):
+        """Histogram of predicted churn probabilities for the rows selected by `mask`."""
+        counts = np.zeros(bins, dtype=np.int64)
+        for rows, chunk_mask in self._masked_chunks(mask):
+            counts += np.histogram(self._decode_probabilities(rows)[chunk_mask], bins=bins, range=(0.0, 1.0))[0]
+        edges = np.linspace(0.0, 1.0, bins + 1)
+        return pd.DataFrame({
+            'Probability': (edges[:-1] + edges[1:]) / 2,
+            'Customers': counts,
+        })
+
+    def mean_probability(self, mask):
+        """Average predicted churn probability of a segment."""
+        total, count = 0, 0
+        for rows, chunk_mask in self._masked_chunks(mask):
+            codes = self.probability_codes[rows][chunk_mask]
+            total += int(codes.sum(dtype=np.int64))
+            count += len(codes)
+        return total / count / PROBABILITY_SCALE if count else 0.0
+
+    # --- Footprint ---
+    @property
+    def nbytes(self):
+        arrays = [self.probability_codes, self.shap_codes, self.scales, self.top_indices]
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    @property
+    def exact_nbytes(self):
+        """Size of the same scores and SHAP values as float64 (what the explainer returns)."""
+        return len(self.probability_codes) * (len(self.feature_names) + 1) * 8
+
+    def error_report(self):
+        """Per-feature observed maximum error and bound, for the views' footnotes."""
+        return pd.DataFrame({
+            'feature': self.feature_names,
+            'max_error': self.max_errors,
+            'error_bound': self.error_bounds,
+        })
@@ -0,0 +1,226 @@
+# =============================================================================
+# File: src/query_backend.py
+# Role: Query interface behind the Global Analytics page, with an in-memory
+#       pandas backend and an optional embedded DuckDB backend over Parquet.
+# =============================================================================
+
+import os
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+from bitmap_index import TENURE_BINS, TENURE_LABELS, BitmapIndex, tenure_band
+
+
+class QueryBackend(ABC):
+    """
+    Aggregations used by the analytics page. Every method takes a
+    {column: value} `selection` built from the sidebar filters.
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    def kpis(self, selection):
+        """total_customers, churn_rate, average_tenure, avg_monthly_charges, total_revenue."""
+
+    @abstractmethod
+    def churn_rate_by(self, column, selection):
+        """Churn rate (%) per value of `column` -> DataFrame[column, 'Churn Rate']."""
+
+    @abstractmethod
+    def churn_rate_by_tenure_group(self, selection):
+        """Churn rate (%) per tenure group -> DataFrame['Tenure Group', 'Churn Rate']."""
+
+    @abstractmethod
+    def value_counts(self, column, selection):
+        """Number of customers per value of `column` -> DataFrame[column, 'Count']."""
+
+    @abstractmethod
+    def adoption_rates(self, columns, selection):
+        """Share (%) of customers with 'Yes' in each column -> DataFrame['Service', 'Adoption']."""
+
+    @abstractmethod
+    def rows(self, columns, selection, limit=None):
+        """Raw rows for point-level charts, randomly sampled down to `limit` if given."""
+
+
+# --- 1. In-memory pandas backend ---
+class PandasBackend(QueryBackend):
+    """Answers queries from the loaded dataframe, the bitmap index and the KPI sketches."""
+
+    name = 'pandas'
+
+    def __init__(self, df, filter_index=None, sketch_store=None):
+        self.df = df
+        self.filter_index = filter_index or BitmapIndex.from_dataframe(df)
+        self.sketch_store = sketch_store
+
+    def _filtered(self, selection, columns=None):
+        mask = self.filter_index.mask(selection)
+        return self.df.loc[mask, columns] if columns else self.df[mask]
+
+    def kpis(self, selection):
+        if self.sketch_store is not None and set(selection) <= set(self.sketch_store.partition_columns):
+            return self.sketch_store.kpis(selection)
+
+        df = self._filtered(selection, ['Churn', 'tenure', 'MonthlyCharges', 'TotalCharges'])
+        return {
+            'total_customers': len(df),
+            'churn_rate': (df['Churn'] == 'Yes').mean() * 100 if len(df) else 0.0,
+            'average_tenure': df['tenure'].mean(),
+            'avg_monthly_charges': df['MonthlyCharges'].mean(),
+            'total_revenue': df['TotalCharges'].sum(),
+        }
+
+    def churn_rate_by(self, column, selection):
+        df = self._filtered(selection, [column, 'Churn'])
+        result = (df['Churn'] == 'Yes').groupby(df[column]).mean().mul(100).reset_index()
+        result.columns = [column, 'Churn Rate']
+        return result
+
+    def churn_rate_by_tenure_group(self, selection):
+        df = self._filtered(selection, ['tenure', 'Churn'])
+        tenure_group = tenure_band(df['tenure'])
+        result = (df['Churn'] == 'Yes').groupby(tenure_group, observed=True).mean().mul(100).reset_index()
+        result.columns = ['Tenure Group', 'Churn Rate']
+        return result
+
+    def value_counts(self, column, selection):
+        result = self._filtered(selection, [column])[column].value_counts().reset_index()
+        result.columns = [column, 'Count']
+        return result
+
+    def adoption_rates(self, columns, selection):
+        df = self._filtered(selection, columns)
+        rates = (df == 'Yes').mean().mul(100) if len(df) else pd.Series(0.0, index=columns)
+        return pd.DataFrame({'Service': columns, 'Adoption': rates[columns].to_numpy()})
+
+    def rows(self, columns, selection, limit=None):
+        df = self._filtered(selection, columns)
+        if limit and len(df) > limit:
+            df = df.sample(limit, random_state=42)
+        return df
+
+
+# --- 2. Embedded DuckDB backend ---
+class DuckDBBackend(QueryBackend):
+    """
+    Answers the same queries with DuckDB directly over a Parquet file: vectorized,
+    multi-threaded execution that streams from disk, so the data need not fit in RAM.
+    """
+
+    name = 'duckdb'
+
+    def __init__(self, parquet_path, threads=None):
+        import duckdb
+
+        self.parquet_path = parquet_path
+        self.con = duckdb.connect()
+        if threads:
+            self.con.execute(f"SET threads = {int(threads)}")
+        self.con.execute(f"CREATE VIEW customers AS SELECT * FROM read_parquet('{parquet_path}')")
+
+    def _query(self, sql, selection):
+        where, where_params = self._where(selection)
+        # One cursor per query: the connection is shared by all Streamlit sessions
+        cursor = self.con.cursor()
+        try:
+            return cursor.execute(sql.format(where=where), where_params).df()
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _where(selection):
+        if not selection:
+            return '', []
+        clauses = [f'"{column}" = ?' for column in selection]
+        return 'WHERE ' + ' AND '.join(clauses), list(selection.values())
+
+    def kpis(self, selection):
+        row = self._query("""
+            SELECT COUNT(*) AS total_customers,
+                   COALESCE(AVG(CASE WHEN Churn = 'Yes' THEN 1.0 ELSE 0.0 END) * 100, 0) AS churn_rate,
+                   AVG(tenure) AS average_tenure,
+                   AVG(MonthlyCharges) AS avg_monthly_charges,
+                   COALESCE(SUM(TotalCharges), 0) AS total_revenue
+            FROM customers {where}
+        """, selection).iloc[0]
+        return {
+            'total_customers': int(row['total_customers']),
+            'churn_rate': float(row['churn_rate']),
+            'average_tenure': float(row['average_tenure']),
+            'avg_monthly_charges': float(row['avg_monthly_charges']),
+            'total_revenue': float(row['total_revenue']),
+        }
+
+    def churn_rate_by(self, column, selection):
+        return self._query(f"""
+            SELECT "{column}", AVG(CASE WHEN Churn = 'Yes' THEN 1.0 ELSE 0.0 END) * 100 AS "Churn Rate"
+            FROM customers {{where}}
+            GROUP BY "{column}" ORDER BY "{column}"
+        """, selection)
+
+    def churn_rate_by_tenure_group(self, selection):
+        # Same bands as bitmap_index.tenure_band: right-closed, the first one including its lower edge
+        cases = ' '.join(
+            f"WHEN tenure {'>=' if low == TENURE_BINS[0] else '>'} {low} AND tenure <= {high} THEN '{label}'"
+            for low, high, label in zip(TENURE_BINS[:-1], TENURE_BINS[1:], TENURE_LABELS)
+        )
+        where, _ = self._where(selection)
+        connector = 'AND' if where else 'WHERE'
+        return self._query(f"""
+            SELECT "Tenure Group", "Churn Rate" FROM (
+                SELECT CASE {cases} END AS "Tenure Group",
+                       AVG(CASE WHEN Churn = 'Yes' THEN 1.0 ELSE 0.0 END) * 100 AS "Churn Rate",
+                       MIN(tenure) AS first_tenure
+                FROM customers {{where}} {connector} tenure >= {TENURE_BINS[0]} AND tenure <= {TENURE_BINS[-1]}
+                GROUP BY 1
+            ) ORDER BY first_tenure
+        """, selection)
+
+    def value_counts(self, column, selection):
+        return self._query(f"""
+            SELECT "{column}", COUNT(*) AS "Count"
+            FROM customers {{where}}
+            GROUP BY "{column}" ORDER BY "Count" DESC
+        """, selection)
+
+    def adoption_rates(self, columns, selection):
+        rates = ', '.join(
+            f"""COALESCE(AVG(CASE WHEN "{column}" = 'Yes' THEN 1.0 ELSE 0.0 END) * 100, 0) AS "{column}\""""
+            for column in columns
+        )
+        row = self._query(f"SELECT {rates} FROM customers {{where}}", selection).iloc[0]
+        return pd.DataFrame({'Service': columns, 'Adoption': [float(row[column]) for column in columns]})
+
+    def rows(self, columns, selection, limit=None):
+        select = ', '.join(f'"{column}"' for column in columns)
+        sql = f"SELECT {select} FROM customers {{where}}"
+        if limit:
+            # Sample after filtering, not before
+            sql = f"SELECT * FROM ({sql}) USING SAMPLE reservoir({int(limit)} ROWS) REPEATABLE (42)"
+        return self._query(sql, selection)
+
+
+# --- 3. Backend selection ---
+def export_parquet(df, parquet_path, source_path=None):
+    """Writes the cleaned customer table as the Parquet copy used by DuckDB, if missing or older than its source."""
+    stale = (
+        not os.path.exists(parquet_path)
+        or (source_path is not None and os.path.getmtime(source_path) > os.path.getmtime(parquet_path))
+    )
+    if stale:
+        df.to_parquet(parquet_path + '.tmp', index=False)
+        os.replace(parquet_path + '.tmp', parquet_path)
+    return parquet_path
+
+
+def create_backend(name, df, filter_index=None, sketch_store=None, source_path=None):
+    """Builds the backend named by `name` ('pandas' or 'duckdb')."""
+    if name == 'duckdb':
+        parquet_path = os.path.splitext(source_path)[0] + '.parquet'
+        return DuckDBBackend(export_parquet(df, parquet_path, source_path))
+    if name == 'pandas':
+        return PandasBackend(df, filter_index, sketch_store)
+    raise ValueError(f"Unknown query backend: {name!r}")
@@ -0,0 +1,71 @@
+# =============================================================================
+# File: src/risk_ranking.py
+# Role: Top-K ranking of customers by expected revenue at risk, served from a
+#       precomputed score array with partial selection instead of a full sort.
+# =============================================================================
+
+import numpy as np
+import pandas as pd
+
+# Expected revenue at risk = P(churn) x (MonthlyCharges x HORIZON_MONTHS + LIFETIME_WEIGHT x TotalCharges)
+# The TotalCharges term favours long-standing, high-spend accounts at equal monthly revenue.
+HORIZON_MONTHS = 12
+LIFETIME_WEIGHT = 0.1
+
+
+def revenue_at_risk(probabilities, monthly_charges, total_charges,
+                    horizon_months=HORIZON_MONTHS, lifetime_weight=LIFETIME_WEIGHT):
+    """Vectorized expected revenue at risk per customer."""
+    value = monthly_charges * horizon_months + lifetime_weight * total_charges
+    return (probabilities * value).astype(np.float32)
+
+
+class RiskRanking:
+    """Revenue-at-risk scores for every customer, aligned with the rows of the loaded dataframe."""
+
+    def __init__(self, scores, probabilities):
+        self.scores = scores
+        self.probabilities = probabilities
+
+    @classmethod
+    def build(cls, df, probabilities):
+        scores = revenue_at_risk(
+            probabilities,
+            df['MonthlyCharges'].to_numpy(dtype=np.float32),
+            df['TotalCharges'].to_numpy(dtype=np.float32)
+        )
+        return cls(scores, probabilities)
+
+    def update(self, df, positions, probabilities):
+        """Rescores the customers at `positions` in place (after their probabilities or charges changed)."""
+        self.probabilities[positions] = probabilities
+        self.scores[positions] = revenue_at_risk(
+            self.probabilities[positions],
+            df['MonthlyCharges'].to_numpy(dtype=np.float32)[positions],
+            df['TotalCharges'].to_numpy(dtype=np.float32)[positions]
+        )
+
+    def top_k(self, mask, k, offset=0):
+        """
+        Row positions of the customers ranked offset..offset+k by revenue at risk
+        within `mask`. Uses argpartition (O(n)) and only sorts the selected head.
+        """
+        candidates = np.flatnonzero(mask)
+        needed = min(offset + k, len(candidates))
+        if needed <= offset:
+            return np.empty(0, dtype=np.int64)
+
+        candidate_scores = self.scores[candidates]
+        if needed < len(candidates):
+            head = np.argpartition(-candidate_scores, needed - 1)[:needed]
+        else:
+            head = np.arange(len(candidates))
+        head = head[np.argsort(-candidate_scores[head], kind='stable')]
+        return candidates[head[offset:needed]]
+
+    def table(self, df, rows):
+        """Display table for the given row positions."""
+        table = df.iloc[rows][['customerID', 'Contract', 'tenure', 'MonthlyCharges', 'TotalCharges']].copy()
+        table.insert(1, 'Churn Risk', self.probabilities[rows] * 100)
+        table.insert(2, 'Revenue at Risk', self.scores[rows])
+        return table.reset_index(drop=True)
@@ -0,0 +1,66 @@
+import math
+
+import streamlit as st
+
+from bitmap_index import filters_to_selection
+from risk_ranking import HORIZON_MONTHS, LIFETIME_WEIGHT
+import tracing
+
+PAGE_SIZE = 25
+
+def page_risk_ranking(df_data, risk_ranking, filter_index, filters):
+    """
+    Displays the customers with the highest expected revenue at risk for the current filters.
+    """
+    # Professional header
+    st.markdown("""
+    <div class="main-header">
+        <h1>🎯 At-Risk Customers</h1>
+        <p>Customers ranked by expected revenue at risk, to decide who to contact first.</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    selection = filters_to_selection(filters)
+    segment_mask = filter_index.mask(selection)
+    segment_size = filter_index.count(selection)
+
+    if segment_size == 0:
+        st.info("No customers match the current filters.")
+        return
+
+    n_pages = math.ceil(segment_size / PAGE_SIZE)
+    col1, col2 = st.columns([3, 1], gap="medium")
+    with col1:
+        st.markdown(f"""
+        <p style="color: #718096;">
+            Revenue at risk = churn probability × ({HORIZON_MONTHS} months of charges + {LIFETIME_WEIGHT:.0%} of total charges).
+            {segment_size:,} customers match the current filters. Click a row to open the customer diagnosis.
+        </p>
+        """, unsafe_allow_html=True)
+    with col2:
+        page_number = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1)
+
+    with tracing.span('risk_top_k'):
+        rows = risk_ranking.top_k(segment_mask, PAGE_SIZE, offset=(page_number - 1) * PAGE_SIZE)
+        table = risk_ranking.table(df_data, rows)
+
+    event = st.dataframe(
+        table,
+        use_container_width=True,
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=f"risk_table_{page_number}",
+        column_config={
+            'Churn Risk': st.column_config.ProgressColumn(format="%.0f%%", min_value=0, max_value=100),
+            'Revenue at Risk': st.column_config.NumberColumn(format="$%.0f"),
+            'MonthlyCharges': st.column_config.NumberColumn("Monthly Charges", format="$%.2f"),
+            'TotalCharges': st.column_config.NumberColumn("Total Charges", format="$%.2f"),
+        }
+    )
+
+    # Clicking a row opens it in the Customer Diagnosis page
+    if event.selection.rows:
+        st.session_state.diagnosis_customer_id = table['customerID'].iloc[event.selection.rows[0]]
+        st.session_state.page = 'Customer Diagnosis'
+        st.rerun()
@@ -0,0 +1,89 @@
+# =============================================================================
+# File: src/segment_explanation.py
+# Role: Segment-level churn explanations computed from a stored SHAP matrix.
+# =============================================================================
+
+import numpy as np
+import pandas as pd
+
+NON_FEATURE_COLUMNS = ['customerID', 'Churn']
+
+
+def prediction_features(df):
+    """Returns the model input columns of a customer dataframe."""
+    return df.drop(columns=NON_FEATURE_COLUMNS, errors='ignore')
+
+
+class ExplanationStore:
+    """
+    SHAP values and churn probabilities for every customer, aligned with the rows
+    of the loaded dataframe. Segments are explained by reducing over row masks,
+    so the explainer never runs at query time.
+    """
+
+    def __init__(self, shap_matrix, probabilities, feature_names, base_value):
+        self.shap_matrix = shap_matrix
+        self.probabilities = probabilities
+        self.feature_names = list(feature_names)
+        self.base_value = base_value
+
+    @classmethod
+    def build(cls, model, explainer, features, chunk_size=50_000):
+        """
+        Scores and explains every row of `features` (the model inputs produced by the
+        version's FeaturePipeline), chunk by chunk, into float32 arrays.
+        """
+        n_rows, n_features = features.shape
+        shap_matrix = np.empty((n_rows, n_features), dtype=np.float32)
+        probabilities = np.empty(n_rows, dtype=np.float32)
+
+        for start in range(0, n_rows, chunk_size):
+            chunk = features.iloc[start:start + chunk_size]
+            shap_matrix[start:start + len(chunk)] = explainer.shap_values(chunk)
+            probabilities[start:start + len(chunk)] = model.predict_proba(chunk)[:, 1]
+
+        return cls(shap_matrix, probabilities, features.columns, float(explainer.expected_value))
+
+    def shap_rows(self, positions):
+        """(len(positions), n_features) SHAP values of the customers at `positions`."""
+        return self.shap_matrix[np.asarray(positions)]
+
+    def updated(self, positions, shap_rows, probabilities):
+        """Copy of the store with the rows at `positions` replaced (e.g. after those customers changed)."""
+        shap_matrix = np.array(self.shap_matrix, dtype=np.float32)
+        shap_matrix[positions] = shap_rows
+        all_probabilities = np.array(self.probabilities, dtype=np.float32)
+        all_probabilities[positions] = probabilities
+        return ExplanationStore(shap_matrix, all_probabilities, self.feature_names, self.base_value)
+
+    def explain_segment(self, mask):
+        """
+        Returns a per-feature dataframe (mean |SHAP| and signed mean SHAP) for the
+        rows selected by the boolean `mask`, sorted by importance.
+        """
+        segment = self.shap_matrix[mask]
+        if len(segment) == 0:
+            mean_abs = np.zeros(len(self.feature_names))
+            mean_signed = np.zeros(len(self.feature_names))
+        else:
+            mean_abs = np.abs(segment).mean(axis=0, dtype=np.float64)
+            mean_signed = segment.mean(axis=0, dtype=np.float64)
+
+        return pd.DataFrame({
+            'feature': self.feature_names,
+            'mean_abs_shap': mean_abs,
+            'mean_shap': mean_signed,
+        }).sort_values('mean_abs_shap', ascending=False).reset_index(drop=True)
+
+    def probability_distribution(self, mask, bins=20):
+        """Histogram of predicted churn probabilities for the rows selected by `mask`."""
+        counts, edges = np.histogram(self.probabilities[mask], bins=bins, range=(0.0, 1.0))
+        return pd.DataFrame({
+            'Probability': (edges[:-1] + edges[1:]) / 2,
+            'Customers': counts,
+        })
+
+    def mean_probability(self, mask):
+        """Average predicted churn probability of a segment."""
+        segment = self.probabilities[mask]
+        return float(segment.mean()) if len(segment) else 0.0
@@ -0,0 +1,75 @@
+# =============================================================================
+# File: src/shap_waterfall.py
+# Role: Native Plotly waterfall of one customer's SHAP values (top-N features plus
+#       an "other" bucket), a light replacement for the embedded SHAP JS force plot.
+# =============================================================================
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+TOP_N = 8
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def waterfall_data(shap_row, feature_names, feature_values, top_n=TOP_N):
+    """
+    The `top_n` largest contributions by absolute value, in descending order,
+    followed by the summed remainder as "N other features".
+    """
+    contributions = pd.DataFrame({
+        'feature': feature_names,
+        'value': feature_values,
+        'shap_value': np.asarray(shap_row, dtype=np.float64),
+    })
+    order = np.argsort(-np.abs(contributions['shap_value'].to_numpy()), kind='stable')
+    top = contributions.iloc[order[:top_n]]
+    labels = [f"{feature} = {value}" for feature, value in zip(top['feature'], top['value'])]
+    values = top['shap_value'].tolist()
+
+    rest = contributions.iloc[order[top_n:]]
+    if len(rest):
+        labels.append(f"{len(rest)} other features")
+        values.append(float(rest['shap_value'].sum()))
+    return pd.DataFrame({'label': labels, 'shap_value': values})
+
+
+def build_waterfall_figure(shap_row, feature_names, feature_values, base_value, top_n=TOP_N):
+    """
+    Horizontal waterfall from the base value to the customer's prediction. Values are
+    in the model's raw (log-odds) space; the base and final bars are also labelled
+    as probabilities.
+    """
+    data = waterfall_data(shap_row, feature_names, feature_values, top_n)
+    base_value = float(np.ravel(base_value)[0])
+    final_value = base_value + float(np.sum(shap_row))
+
+    fig = go.Figure(go.Waterfall(
+        orientation='h',
+        measure=['absolute'] + ['relative'] * len(data) + ['total'],
+        y=[f"Base ({_sigmoid(base_value):.0%})"] + data['label'].tolist() + [f"Prediction ({_sigmoid(final_value):.0%})"],
+        x=[base_value] + data['shap_value'].tolist() + [0],
+        text=[f"{base_value:.2f}"] + [f"{value:+.2f}" for value in data['shap_value']] + [f"{final_value:.2f}"],
+        textposition='outside',
+        increasing=dict(marker=dict(color='#ff4757')),
+        decreasing=dict(marker=dict(color='#1e90ff')),
+        totals=dict(marker=dict(color='#008080')),
+        connector=dict(line=dict(color='#cbd5e0', width=1))
+    ))
+    fig.update_layout(
+        title="<b>Factor Contributions to Churn Risk</b>",
+        font=dict(color='#2d3748', size=14),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        title_font_size=20,
+        title_font_color='#2d3748',
+        height=90 + 36 * (len(data) + 2),
+        margin=dict(l=10, r=10, t=60, b=40),
+        xaxis_title="<b>Contribution (log-odds)</b>",
+        yaxis=dict(autorange='reversed', tickfont=dict(size=13, color='#2d3748')),
+        showlegend=False
+    )
+    return fig
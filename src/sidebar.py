@@ -1,4 +1,7 @@
+import time
+
 import streamlit as st
+import pandas as pd
 
 def render_sidebar(df_data):
     st.sidebar.markdown("""
@@ -47,6 +50,14 @@ def render_sidebar(df_data):
         st.session_state.page = 'Customer Diagnosis'
         st.rerun()
 
+    if st.sidebar.button("🎯  At-Risk Customers", use_container_width=True):
+        st.session_state.page = 'At-Risk Customers'
+        st.rerun()
+
+    if st.sidebar.button("🛰️  Data Drift", use_container_width=True):
+        st.session_state.page = 'Data Drift'
+        st.rerun()
+
     st.sidebar.markdown("<div style='margin: 2rem 0; border-top: 1px solid #e2e8f0;'></div>", unsafe_allow_html=True)
 
     if st.session_state.page == 'Customer Diagnosis':
@@ -58,31 +69,22 @@ def render_sidebar(df_data):
         """, unsafe_allow_html=True)
         
         customer_ids_list = df_data['customerID'].tolist()
+        # Preselect the customer opened from another page (e.g. the at-risk ranking)
+        preselected_id = st.session_state.get('diagnosis_customer_id')
         selected_customer_id = st.sidebar.selectbox(
             "🔍 Select Customer ID:",
             customer_ids_list,
+            index=customer_ids_list.index(preselected_id) if preselected_id in customer_ids_list else 0,
             help="Choose a customer ID to analyze their churn probability and risk factors"
         )
         return selected_customer_id
     
-    elif st.session_state.page == 'Global Analytics':
-        st.sidebar.markdown("""
-        <div style="background: linear-gradient(135deg, #f0f9ff 0%, #e0f2f1 100%); 
-                    padding: 1rem; border-radius: 12px; margin-bottom: 1rem;">
-            <h4 style="color: #008080; margin: 0 0 0.5rem 0; font-size: 1rem;">🎯 Filters</h4>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        contract_options = ['All'] + df_data['Contract'].unique().tolist()
-        selected_contract = st.sidebar.selectbox("📝 Contract Type", contract_options)
+    elif st.session_state.page == 'At-Risk Customers':
+        return render_segment_filters(df_data)
 
-        internet_options = ['All'] + df_data['InternetService'].unique().tolist()
-        selected_internet = st.sidebar.selectbox("🌐 Internet Service", internet_options)
-        
-        payment_options = ['All'] + df_data['PaymentMethod'].unique().tolist()
-        selected_payment = st.sidebar.selectbox("💳 Payment Method", payment_options)
-        
-        return selected_contract, selected_internet, selected_payment
+    elif st.session_state.page == 'Global Analytics':
+        # Rendered by the analytics page inside its filtered-overview fragment
+        return None
 
     st.sidebar.markdown("<div style='margin: 2rem 0; border-top: 1px solid #e2e8f0;'></div>", unsafe_allow_html=True)
     
@@ -97,3 +99,89 @@ def render_sidebar(df_data):
     """, unsafe_allow_html=True)
     
     return None
+
+
+def render_segment_filters(df_data):
+    """
+    Contract, internet service and payment method filters in the sidebar; returns the
+    selected (contract, internet, payment) tuple. Called from inside a fragment, a change
+    reruns only that fragment.
+    """
+    st.sidebar.markdown("""
+    <div style="background: linear-gradient(135deg, #f0f9ff 0%, #e0f2f1 100%); 
+                padding: 1rem; border-radius: 12px; margin-bottom: 1rem;">
+        <h4 style="color: #008080; margin: 0 0 0.5rem 0; font-size: 1rem;">🎯 Filters</h4>
+    </div>
+    """, unsafe_allow_html=True)
+
+    contract_options = ['All'] + df_data['Contract'].unique().tolist()
+    selected_contract = st.sidebar.selectbox("📝 Contract Type", contract_options)
+    
+    internet_options = ['All'] + df_data['InternetService'].unique().tolist()
+    selected_internet = st.sidebar.selectbox("🌐 Internet Service", internet_options)
+    
+    payment_options = ['All'] + df_data['PaymentMethod'].unique().tolist()
+    selected_payment = st.sidebar.selectbox("💳 Payment Method", payment_options)
+    
+    return selected_contract, selected_internet, selected_payment
+
+
+def render_scoring_model_choice(student_version):
+    """Lets the user score interactively with the distilled student; returns True when selected."""
+    choice = st.sidebar.radio(
+        "⚡ Scoring Model",
+        ["Full model", f"Fast student ({student_version})"],
+        key='scoring_model',
+        help="The student is a compact model distilled from the full one: faster what-if and diagnosis scoring, slightly less precise."
+    )
+    return choice != "Full model"
+
+
+@st.fragment(run_every=2)
+def render_live_status(ingestor):
+    """
+    Event stream status, polled every 2 seconds. With auto-refresh on, the app reruns
+    when a new batch of customer changes has been applied, so the pages show the new scores.
+    """
+    stats = ingestor.stats()
+    auto_refresh = st.toggle("🔴 Live updates", value=True, key='live_refresh',
+                             help="Rerun the dashboard when customer changes arrive from the event log")
+    updated = f"{time.time() - stats['last_applied']:.0f}s ago" if stats['last_applied'] else "no events yet"
+    st.caption(f"{stats['events']:,} events · {stats['customers']:,} customers rescored · "
+               f"{stats['events_per_s']:,.0f} events/s · updated {updated}")
+    if stats['error']:
+        st.warning(f"Event log: {stats['error']}", icon="⚠️")
+
+    version = ingestor.table.version
+    seen = st.session_state.setdefault('live_version_seen', version)
+    if auto_refresh and version != seen:
+        st.session_state.live_version_seen = version
+        st.rerun()
+
+
+def render_admin_panel(span_stats, cache_stats, figure_cache_stats, disk_cache_stats=None, job_rows=None):
+    """Hidden sidebar panel with p50/p95 timings per span and cache hit/miss counts."""
+    with st.sidebar.expander("🛠️ Performance (admin)"):
+        st.markdown("**Span timings**")
+        if span_stats:
+            st.dataframe(pd.DataFrame(span_stats).round(2), use_container_width=True, hide_index=True)
+        else:
+            st.caption("No spans recorded yet.")
+
+        st.markdown("**Cache hits / misses**")
+        cache_rows = [
+            {'Cache': name, 'Hits': counts['hits'], 'Misses': counts['misses']}
+            for name, counts in sorted(cache_stats.items())
+        ]
+        cache_rows.append({
+            'Cache': 'figure_cache',
+            'Hits': figure_cache_stats['hits'] + figure_cache_stats['disk_hits'],
+            'Misses': figure_cache_stats['misses']
+        })
+        if disk_cache_stats is not None:
+            cache_rows.append({'Cache': 'disk_cache', 'Hits': disk_cache_stats['hits'], 'Misses': disk_cache_stats['misses']})
+        st.dataframe(pd.DataFrame(cache_rows), use_container_width=True, hide_index=True)
+
+        if job_rows:
+            st.markdown("**Background jobs**")
+            st.dataframe(pd.DataFrame(job_rows).round(2), use_container_width=True, hide_index=True)
@@ -0,0 +1,132 @@
+# =============================================================================
+# File: src/similarity_index.py
+# Role: Nearest-neighbor index of customers for the "similar customers" view.
+#
+# Benchmark: python src/similarity_index.py --sizes 100000 1000000 10000000
+# =============================================================================
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+from segment_explanation import prediction_features
+
+NUMERIC_FEATURES = ['tenure', 'MonthlyCharges', 'TotalCharges']
+
+
+class CustomerEncoder:
+    """One-hot categoricals plus standardized numeric features, as float32."""
+
+    def fit(self, df):
+        features = prediction_features(df)
+        self.categorical = [column for column in features.columns if column not in NUMERIC_FEATURES]
+        self.vocabularies = {
+            column: sorted(features[column].dropna().unique().tolist()) for column in self.categorical
+        }
+        self.means = features[NUMERIC_FEATURES].mean().to_numpy(dtype=np.float32)
+        self.stds = features[NUMERIC_FEATURES].std().replace(0, 1).to_numpy(dtype=np.float32)
+        return self
+
+    def transform(self, df):
+        blocks = []
+        for column in self.categorical:
+            vocabulary = self.vocabularies[column]
+            codes = pd.Categorical(df[column], categories=vocabulary).codes
+            one_hot = np.zeros((len(df), len(vocabulary)), dtype=np.float32)
+            known = codes >= 0
+            one_hot[np.flatnonzero(known), codes[known]] = 1.0
+            blocks.append(one_hot)
+        numeric = (df[NUMERIC_FEATURES].to_numpy(dtype=np.float32) - self.means) / self.stds
+        blocks.append(np.nan_to_num(numeric))
+        return np.hstack(blocks)
+
+
+class SimilarityIndex:
+    """
+    Ball tree over encoded customer features (or SHAP vectors). Built once per
+    data/model load; a k-nearest query is O(log n) on average.
+    """
+
+    def __init__(self, tree, vectors, encoder=None):
+        self.tree = tree
+        self.vectors = vectors
+        self.encoder = encoder
+
+    @classmethod
+    def from_features(cls, df, leaf_size=40):
+        encoder = CustomerEncoder().fit(df)
+        vectors = encoder.transform(df)
+        return cls(BallTree(vectors, leaf_size=leaf_size), vectors, encoder)
+
+    @classmethod
+    def from_shap(cls, shap_matrix, leaf_size=40):
+        """Neighbors in explanation space: customers whose churn drivers look alike."""
+        vectors = np.ascontiguousarray(shap_matrix, dtype=np.float32)
+        return cls(BallTree(vectors, leaf_size=leaf_size), vectors)
+
+    def neighbors(self, position, k=10):
+        """Row positions and distances of the k customers most similar to row `position` (itself excluded)."""
+        distances, positions = self.tree.query(self.vectors[position:position + 1], k=k + 1)
+        keep = positions[0] != position
+        return positions[0][keep][:k], distances[0][keep][:k]
+
+    def similar_customers(self, df, position, k=10):
+        """Display table of the k most similar customers and their outcomes."""
+        positions, distances = self.neighbors(position, k)
+        table = df.iloc[positions][['customerID', 'Churn', 'Contract', 'InternetService', 'tenure', 'MonthlyCharges']].copy()
+        table.insert(1, 'Distance', distances)
+        return table.reset_index(drop=True)
+
+    def nbytes(self):
+        """Approximate memory used by the vectors and the tree arrays."""
+        return self.vectors.nbytes + sum(array.nbytes for array in self.tree.get_arrays())
+
+
+# --- Benchmark ---
+def _synthetic(base, n_rows, seed=42):
+    """Resamples the base table and jitters numeric columns so rows are not exact duplicates."""
+    rng = np.random.default_rng(seed)
+    df = base.iloc[rng.integers(0, len(base), n_rows)].reset_index(drop=True)
+    for column in NUMERIC_FEATURES:
+        df[column] = df[column] * rng.normal(1.0, 0.05, n_rows)
+    return df
+
+
+def benchmark(sizes, n_queries=200, k=10):
+    base = pd.read_csv('data/WA_Fn-UseC_-Telco-Customer-Churn.csv')
+    base['TotalCharges'] = pd.to_numeric(base['TotalCharges'], errors='coerce').fillna(0)
+    rng = np.random.default_rng(0)
+
+    results = []
+    for n_rows in sizes:
+        df = _synthetic(base, n_rows)
+        start = time.perf_counter()
+        index = SimilarityIndex.from_features(df)
+        build_s = time.perf_counter() - start
+
+        latencies = []
+        for position in rng.integers(0, n_rows, n_queries):
+            start = time.perf_counter()
+            index.neighbors(position, k)
+            latencies.append(time.perf_counter() - start)
+        latencies = np.asarray(latencies) * 1000
+        results.append([n_rows, build_s, index.nbytes() / 2 ** 20,
+                        np.percentile(latencies, 50), np.percentile(latencies, 95)])
+        del df, index
+    return results
+
+
+if __name__ == '__main__':
+    from tabulate import tabulate
+
+    parser = argparse.ArgumentParser(description="Benchmark the similar-customers index.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    headers = ["Customers", "Build (s)", "Memory (MB)", "Query p50 (ms)", "Query p95 (ms)"]
+    print(tabulate(benchmark(args.sizes, args.queries, args.k), headers=headers, floatfmt=".2f", tablefmt="grid", intfmt=","))
@@ -0,0 +1,227 @@
+# =============================================================================
+# File: src/sketches.py
+# Role: Mergeable per-partition summaries (counts, sums, KLL quantiles,
+#       HyperLogLog) used to answer the dashboard KPIs without full scans.
+# =============================================================================
+
+import numpy as np
+import pandas as pd
+
+from bitmap_index import SIDEBAR_FILTER_COLUMNS
+
+
+# --- 1. KLL quantile sketch ---
+class KLLSketch:
+    """
+    KLL quantile sketch. Items on level h carry weight 2**h; a full level is
+    sorted and every other item is promoted, so memory stays O(k log(n / k)).
+    Two sketches are merged by concatenating their levels and compacting again.
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+                items = np.sort(items)
+                # An odd item out stays on its level so no weight is lost
+                kept, items = items[:len(items) % 2], items[len(items) % 2:]
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[level] = kept
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        """Adds an array of values (NaNs are ignored)."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Merges another sketch into this one."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """Approximate q-quantile(s); `q` may be a float or an array of floats."""
+        if self.n == 0:
+            return np.nan if np.isscalar(q) else np.full(len(q), np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items_h), 2 ** h) for h, items_h in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(q) * cumulative[-1], side='left')
+        return items[order][np.minimum(positions, len(items) - 1)]
+
+
+# --- 2. HyperLogLog distinct counter ---
+class HyperLogLog:
+    """HyperLogLog distinct counter over 64-bit hashes with 2**p registers."""
+
+    def __init__(self, p=12):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    @staticmethod
+    def hash_values(values):
+        """Vectorized 64-bit hashes for a sequence of keys (e.g. customer IDs)."""
+        return pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy(dtype=np.uint64)
+
+    def update(self, hashes):
+        """Adds an array of uint64 hashes."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if len(hashes) == 0:
+            return self
+        tail_bits = 64 - self.p
+        index = (hashes >> np.uint64(tail_bits)).astype(np.int64)
+        tail = hashes & np.uint64((1 << tail_bits) - 1)
+        # frexp gives the exact bit length because tail < 2**52 fits a float64 mantissa
+        bit_length = np.frexp(tail.astype(np.float64))[1]
+        rank = (tail_bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        """Merges another HyperLogLog with the same precision."""
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        """Estimated number of distinct keys."""
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m ** 2 / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * self.m and zeros:
+            return float(self.m * np.log(self.m / zeros))
+        return float(raw)
+
+
+# --- 3. Per-partition summary ---
+class PartitionSummary:
+    """Counts, sums, quantile sketches and a distinct counter for one data partition."""
+
+    QUANTILE_COLUMNS = ['tenure', 'MonthlyCharges']
+    SUM_COLUMNS = ['tenure', 'MonthlyCharges', 'TotalCharges']
+
+    def __init__(self, k=200):
+        self.count = 0
+        self.churned = 0
+        self.sums = {column: 0.0 for column in self.SUM_COLUMNS}
+        self.quantiles = {column: KLLSketch(k) for column in self.QUANTILE_COLUMNS}
+        self.customers = HyperLogLog()
+
+    def update(self, df):
+        """Folds a chunk of customer rows into the summary."""
+        self.count += len(df)
+        self.churned += int((df['Churn'] == 'Yes').sum())
+        for column in self.SUM_COLUMNS:
+            self.sums[column] += float(df[column].sum())
+        for column in self.QUANTILE_COLUMNS:
+            self.quantiles[column].update(df[column].to_numpy())
+        self.customers.update(HyperLogLog.hash_values(df['customerID']))
+        return self
+
+    def merge(self, other):
+        """Merges another partition summary into this one."""
+        self.count += other.count
+        self.churned += other.churned
+        for column in self.SUM_COLUMNS:
+            self.sums[column] += other.sums[column]
+        for column in self.QUANTILE_COLUMNS:
+            self.quantiles[column].merge(other.quantiles[column])
+        self.customers.merge(other.customers)
+        return self
+
+
+# --- 4. Sketch store ---
+class SketchStore:
+    """
+    Partition summaries keyed by the values of `partition_columns`. A filter
+    combination over those columns is answered by merging matching partitions;
+    new data is folded in incrementally with `update`.
+    """
+
+    def __init__(self, partition_columns=SIDEBAR_FILTER_COLUMNS, k=200):
+        self.partition_columns = list(partition_columns)
+        self.k = k
+        self.partitions = {}
+
+    @classmethod
+    def from_dataframe(cls, df, partition_columns=SIDEBAR_FILTER_COLUMNS, k=200):
+        return cls(partition_columns, k).update(df)
+
+    def update(self, df):
+        """Adds new customer rows, updating only the partitions they fall into."""
+        for key, group in df.groupby(self.partition_columns, sort=False, observed=True):
+            if key not in self.partitions:
+                self.partitions[key] = PartitionSummary(self.k)
+            self.partitions[key].update(group)
+        return self
+
+    def _matches(self, key, selection):
+        return all(
+            key[self.partition_columns.index(column)] == value
+            for column, value in selection.items()
+        )
+
+    def summary(self, selection):
+        """Merged summary of all partitions matching a {column: value} selection."""
+        unknown = set(selection) - set(self.partition_columns)
+        if unknown:
+            raise KeyError(f"Sketches are not partitioned by {sorted(unknown)}")
+        merged = PartitionSummary(self.k)
+        for key, partition in self.partitions.items():
+            if self._matches(key, selection):
+                merged.merge(partition)
+        return merged
+
+    def kpis(self, selection):
+        """Dashboard KPIs (counts, rates, averages, revenue) for a selection."""
+        summary = self.summary(selection)
+        count = summary.count
+        return {
+            'total_customers': count,
+            'distinct_customers': summary.customers.estimate(),
+            'churn_rate': summary.churned / count * 100 if count else 0.0,
+            'average_tenure': summary.sums['tenure'] / count if count else 0.0,
+            'avg_monthly_charges': summary.sums['MonthlyCharges'] / count if count else 0.0,
+            'total_revenue': summary.sums['TotalCharges'],
+            'median_tenure': float(summary.quantiles['tenure'].quantile(0.5)),
+            'median_monthly_charges': float(summary.quantiles['MonthlyCharges'].quantile(0.5)),
+        }
+
+    def percentile_bands(self, group_column, value_column, quantiles=(0.1, 0.5, 0.9), selection=None):
+        """Approximate percentiles of `value_column` for each value of `group_column`."""
+        selection = selection or {}
+        position = self.partition_columns.index(group_column)
+        groups = sorted({key[position] for key in self.partitions if self._matches(key, selection)})
+
+        rows = []
+        for group in groups:
+            sketch = self.summary({**selection, group_column: group}).quantiles[value_column]
+            values = sketch.quantile(np.asarray(quantiles))
+            rows.append([group] + [float(value) for value in values])
+        return pd.DataFrame(rows, columns=[group_column] + [f"p{int(q * 100)}" for q in quantiles])
@@ -0,0 +1,128 @@
+# =============================================================================
+# File: src/snapshot_store.py
+# Role: Date-partitioned Parquet store of periodic customer extracts, with
+#       partition pruning for churn trend queries.
+#
+# Usage: python src/snapshot_store.py <extract.csv> --date 2025-06-30 [--model src/models/registry/v0001/model.joblib]
+# =============================================================================
+
+import argparse
+import datetime
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from segment_explanation import prediction_features
+
+SNAPSHOT_ROOT = os.path.join('data', 'snapshots')
+PARTITION_PREFIX = 'snapshot_date='
+
+
+class SnapshotStore:
+    """
+    Customer extracts stored as <root>/snapshot_date=YYYY-MM-DD/part-0.parquet.
+    Queries list the partition directories first and only open the files whose
+    date falls inside the requested range.
+    """
+
+    def __init__(self, root=SNAPSHOT_ROOT):
+        self.root = root
+
+    def _partition_dir(self, snapshot_date):
+        return os.path.join(self.root, f"{PARTITION_PREFIX}{snapshot_date.isoformat()}")
+
+    def snapshot_dates(self):
+        """Sorted list of the available snapshot dates."""
+        if not os.path.isdir(self.root):
+            return []
+        dates = []
+        for name in os.listdir(self.root):
+            if name.startswith(PARTITION_PREFIX):
+                dates.append(datetime.date.fromisoformat(name[len(PARTITION_PREFIX):]))
+        return sorted(dates)
+
+    def ingest(self, df, snapshot_date, model=None, pipeline=None):
+        """
+        Writes one extract as the partition for `snapshot_date` (replacing it if present).
+        When a model is given, its churn probability is stored with the rows; the raw
+        extract is scored through `pipeline` (the model's FeaturePipeline) when provided.
+        """
+        df = df.copy()
+        # The pipeline reads the raw values, before TotalCharges is zero-filled for storage
+        features = pipeline.transform_frame(df) if model is not None and pipeline is not None else None
+        df['TotalCharges'] = pd.to_numeric(df['TotalCharges'], errors='coerce').fillna(0)
+        if model is not None:
+            features = features if features is not None else prediction_features(df)
+            df['ChurnProbability'] = model.predict_proba(features)[:, 1]
+
+        partition_dir = self._partition_dir(snapshot_date)
+        os.makedirs(partition_dir, exist_ok=True)
+        path = os.path.join(partition_dir, 'part-0.parquet')
+        # Write then rename so readers never see a half-written partition
+        df.to_parquet(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+        return path
+
+    def read(self, start=None, end=None, columns=None, selection=None):
+        """
+        Reads the partitions whose date is in [start, end]. `selection` is a
+        {column: value} filter pushed down to the Parquet reader.
+        """
+        filters = [(column, '==', value) for column, value in (selection or {}).items()] or None
+        frames = []
+        for snapshot_date in self.snapshot_dates():
+            if (start and snapshot_date < start) or (end and snapshot_date > end):
+                continue
+            path = os.path.join(self._partition_dir(snapshot_date), 'part-0.parquet')
+            # Older snapshots may lack newer columns (e.g. ChurnProbability)
+            available = pq.read_schema(path).names
+            read_columns = [column for column in columns if column in available] if columns else None
+            frame = pd.read_parquet(path, columns=read_columns, filters=filters)
+            frame['SnapshotDate'] = pd.Timestamp(snapshot_date)
+            frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame(columns=(columns or []) + ['SnapshotDate'])
+        return pd.concat(frames, ignore_index=True)
+
+    def churn_trend(self, start=None, end=None, segment_column=None, selection=None):
+        """Churn rate, average predicted risk and customer count per snapshot (and segment)."""
+        group_columns = ['SnapshotDate'] + ([segment_column] if segment_column else [])
+        columns = ['Churn', 'ChurnProbability'] + ([segment_column] if segment_column else [])
+
+        df = self.read(start, end, columns=columns, selection=selection)
+        df['Churned'] = (df['Churn'] == 'Yes').astype(float)
+        if 'ChurnProbability' not in df.columns:
+            df['ChurnProbability'] = float('nan')
+
+        trend = df.groupby(group_columns, observed=True).agg(
+            Customers=('Churned', 'size'),
+            ChurnRate=('Churned', 'mean'),
+            PredictedRisk=('ChurnProbability', 'mean'),
+        ).reset_index()
+        trend['ChurnRate'] *= 100
+        trend['PredictedRisk'] *= 100
+        return trend
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Ingest a customer extract as a dated snapshot.")
+    parser.add_argument('extract', help="CSV extract in the Telco schema")
+    parser.add_argument('--date', required=True, type=datetime.date.fromisoformat, help="Snapshot date (YYYY-MM-DD)")
+    parser.add_argument('--model', help="Optional model used to store predicted churn probabilities")
+    parser.add_argument('--pipeline', help="Feature pipeline of the model (default: the one saved next to it)")
+    parser.add_argument('--root', default=SNAPSHOT_ROOT)
+    args = parser.parse_args()
+
+    model = pipeline = None
+    if args.model:
+        import joblib
+        from feature_pipeline import PIPELINE_FILE
+        model = joblib.load(args.model)
+        pipeline_path = args.pipeline or os.path.join(os.path.dirname(args.model), PIPELINE_FILE)
+        if os.path.exists(pipeline_path):
+            pipeline = joblib.load(pipeline_path)
+
+    path = SnapshotStore(args.root).ingest(pd.read_csv(args.extract), args.date, model, pipeline)
+    print(f"Snapshot {args.date} written to {path}")
@@ -0,0 +1,104 @@
+# =============================================================================
+# File: src/student_models.py
+# Role: Compact student models distilled from the CatBoost teacher. Kept in their
+#       own module so registry artifacts unpickle from both distill.py and the app.
+# =============================================================================
+
+import numpy as np
+import pandas as pd
+from catboost import CatBoostClassifier
+
+# Key features of the lookup table, most important first: rare combinations
+# back off to shorter prefixes of this list.
+LOOKUP_KEY_COLUMNS = ['Contract', 'InternetService', 'tenure', 'PaymentMethod',
+                      'OnlineSecurity', 'TechSupport', 'MonthlyCharges']
+
+
+def catboost_student(iterations=50, depth=3, random_state=42):
+    """
+    A small CatBoost trained on soft labels: with the CrossEntropy loss the teacher's
+    probabilities are the targets, and the result is a regular classifier that
+    TreeExplainer understands.
+    """
+    return CatBoostClassifier(
+        iterations=iterations,
+        depth=depth,
+        learning_rate=0.3,
+        loss_function='CrossEntropy',
+        verbose=False,
+        random_state=random_state
+    )
+
+
+class LookupTableStudent:
+    """
+    Mean teacher probability per combination of key features (numeric keys are
+    quantile-binned). Scoring is a few searchsorted calls, with no trees to walk.
+    """
+
+    def __init__(self, key_columns=LOOKUP_KEY_COLUMNS, n_bins=5, min_count=20):
+        self.key_columns = list(key_columns)
+        self.n_bins = n_bins
+        self.min_count = min_count
+
+    def _column(self, X, column, dtype):
+        """One input column from a DataFrame or a FeaturePipeline matrix (training column order)."""
+        if isinstance(X, pd.DataFrame):
+            return X[column].to_numpy(dtype=dtype)
+        return np.asarray(X)[:, self.feature_names.index(column)].astype(dtype)
+
+    def _codes(self, X):
+        """Integer code per key column; unseen values get the extra last code."""
+        codes = []
+        for column in self.key_columns:
+            if column in self.edges:
+                codes.append(np.searchsorted(self.edges[column], self._column(X, column, np.float64), side='right'))
+            else:
+                categories = self.categories[column]
+                values = self._column(X, column, object)
+                code = np.minimum(np.searchsorted(categories, values), len(categories) - 1)
+                codes.append(np.where(categories[code] == values, code, len(categories)))
+        return codes
+
+    def _prefix_keys(self, codes):
+        """Mixed-radix key of the first 1..len(key_columns) columns."""
+        key = np.zeros(len(codes[0]), dtype=np.int64)
+        for code, radix in zip(codes, self.radixes):
+            key = key * radix + code
+            yield key
+
+    def fit(self, X, teacher_proba):
+        teacher_proba = np.asarray(teacher_proba, dtype=np.float64)
+        self.feature_names = list(X.columns)
+        self.edges, self.categories, self.radixes = {}, {}, []
+        for column in self.key_columns:
+            if pd.api.types.is_numeric_dtype(X[column]):
+                quantiles = np.linspace(0, 1, self.n_bins + 1)[1:-1]
+                self.edges[column] = np.unique(np.quantile(X[column].to_numpy(dtype=np.float64), quantiles))
+                self.radixes.append(len(self.edges[column]) + 1)
+            else:
+                self.categories[column] = np.asarray(sorted(X[column].dropna().unique().tolist()), dtype=object)
+                self.radixes.append(len(self.categories[column]) + 1)
+
+        self.global_mean = float(teacher_proba.mean())
+        self.tables = []
+        for key in self._prefix_keys(self._codes(X)):
+            keys, inverse, counts = np.unique(key, return_inverse=True, return_counts=True)
+            means = np.bincount(inverse, weights=teacher_proba) / counts
+            keep = counts >= self.min_count
+            self.tables.append((keys[keep], means[keep]))
+        return self
+
+    def predict_proba(self, X):
+        proba = np.full(len(X), self.global_mean)
+        # Longer prefixes override shorter ones wherever they have enough support
+        for key, (keys, means) in zip(self._prefix_keys(self._codes(X)), self.tables):
+            if len(keys) == 0:
+                continue
+            position = np.minimum(np.searchsorted(keys, key), len(keys) - 1)
+            found = keys[position] == key
+            proba[found] = means[position[found]]
+        return np.column_stack([1 - proba, proba])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] >= 0.5).astype(int)
@@ -0,0 +1,183 @@
+# =============================================================================
+# File: src/threshold_eval.py
+# Role: Vectorized threshold sweep: precision, recall, F1, lift, retention value
+#       and calibration at every cutoff from one sort of the probabilities.
+# =============================================================================
+
+import numpy as np
+import pandas as pd
+
+# Retention campaign economics used by the cost-weighted value
+CONTACT_COST = 10.0      # cost of contacting one customer
+SAVE_RATE = 0.3          # share of contacted churners who are retained
+VALUE_MONTHS = 12        # months of MonthlyCharges kept when a churner is retained
+
+
+def _as_2d(y_prob):
+    y_prob = np.asarray(y_prob, dtype=np.float64)
+    return y_prob[np.newaxis, :] if y_prob.ndim == 1 else y_prob
+
+
+def _cumulative(y_true, y_prob, customer_value):
+    """
+    Sorts each model's probabilities once (descending) and returns cumulative
+    counts at every cutoff position k (= the top-k customers are flagged).
+    """
+    y_prob = _as_2d(y_prob)
+    order = np.argsort(-y_prob, axis=1, kind='stable')
+    probs = np.take_along_axis(y_prob, order, axis=1)
+    labels = np.asarray(y_true, dtype=np.float64)[order]
+    values = np.broadcast_to(np.asarray(customer_value, dtype=np.float64), labels.shape[1:])[order]
+    return {
+        'threshold': probs,
+        'flagged': np.broadcast_to(np.arange(1, probs.shape[1] + 1, dtype=np.float64), probs.shape),
+        'tp': np.cumsum(labels, axis=1),
+        'saved_value': np.cumsum(labels * values, axis=1),
+        'prob_sum': np.cumsum(probs, axis=1),
+    }
+
+
+def _metrics(cum, positives, n, contact_cost, save_rate):
+    flagged, tp = cum['flagged'], cum['tp']
+    precision = tp / flagged
+    recall = tp / positives if positives else np.zeros_like(tp)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+    return {
+        'threshold': cum['threshold'],
+        'flagged': flagged,
+        'precision': precision,
+        'recall': recall,
+        'f1': f1,
+        'lift': precision / (positives / n) if positives else np.zeros_like(tp),
+        'retention_value': save_rate * cum['saved_value'] - contact_cost * flagged,
+        # Gap between predicted and observed churn among the flagged customers
+        'calibration_gap': np.abs(cum['prob_sum'] - tp) / flagged,
+    }
+
+
+def expected_calibration_error(y_true, y_prob, bins=10):
+    """Binned expected calibration error (one value per model)."""
+    y_prob = _as_2d(y_prob)
+    y_true = np.asarray(y_true, dtype=np.float64)
+    bin_ids = np.minimum((y_prob * bins).astype(int), bins - 1)
+    errors = []
+    for model_bins, model_probs in zip(bin_ids, y_prob):
+        prob_sums = np.bincount(model_bins, weights=model_probs, minlength=bins)
+        label_sums = np.bincount(model_bins, weights=y_true, minlength=bins)
+        errors.append(np.abs(prob_sums - label_sums).sum() / len(y_true))
+    return np.asarray(errors)
+
+
+def threshold_sweep(y_true, y_prob, model_names=None, customer_value=None,
+                    contact_cost=CONTACT_COST, save_rate=SAVE_RATE):
+    """
+    Metrics at every distinct threshold (flag customers with probability >= threshold).
+    `y_prob` is (n,) for one model or (n_models, n) for several; the cost of the
+    whole sweep is one O(n log n) sort per model plus cumulative sums.
+    `customer_value` (scalar or per-customer array) is what a retained churner is worth.
+    """
+    y_true = np.asarray(y_true)
+    y_prob = _as_2d(y_prob)
+    n = len(y_true)
+    positives = float(y_true.sum())
+    model_names = model_names or [f"model_{i}" for i in range(len(y_prob))]
+    if customer_value is None:
+        customer_value = 1.0
+
+    metrics = _metrics(_cumulative(y_true, y_prob, customer_value), positives, n, contact_cost, save_rate)
+
+    frames = []
+    for i, name in enumerate(model_names):
+        thresholds = metrics['threshold'][i]
+        # Only the last position of a run of tied probabilities is a real cutoff
+        last_of_ties = np.append(thresholds[1:] != thresholds[:-1], True)
+        frame = pd.DataFrame({key: values[i][last_of_ties] for key, values in metrics.items()})
+        frame.insert(0, 'model', name)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def choose_threshold(sweep, metric='f1'):
+    """Threshold maximizing `metric` for each model -> {model: threshold}."""
+    best = sweep.loc[sweep.groupby('model')[metric].idxmax()]
+    return dict(zip(best['model'], best['threshold'].astype(float)))
+
+
+def metrics_at(sweep, thresholds):
+    """
+    Metrics of each model at a threshold fixed beforehand ({model: threshold}, e.g.
+    from choose_threshold on validation data): its sweep row at the lowest cutoff
+    >= the threshold, i.e. with the customers of probability >= threshold flagged.
+    """
+    rows = []
+    for name, frame in sweep.groupby('model', sort=False):
+        flagged = frame[frame['threshold'] >= thresholds[name]]
+        if len(flagged):
+            row = flagged.loc[flagged['threshold'].idxmin()].to_dict()
+        else:  # no customer reaches the threshold
+            row = dict.fromkeys(frame.columns, 0.0)
+        rows.append({**row, 'model': name, 'threshold': float(thresholds[name])})
+    return pd.DataFrame(rows, columns=sweep.columns)
+
+
+def bootstrap_ci(y_true, y_prob, thresholds, n_boot=200, alpha=0.05, seed=42):
+    """
+    Bootstrap confidence intervals of precision, recall and F1 at the given thresholds
+    for one model. All resamples are evaluated at once: each resample is a row of
+    multinomial weights applied to the same sorted order.
+    """
+    y_true = np.asarray(y_true, dtype=np.float64)
+    y_prob = np.asarray(y_prob, dtype=np.float64)
+    n = len(y_true)
+    rng = np.random.default_rng(seed)
+
+    order = np.argsort(-y_prob, kind='stable')
+    sorted_probs = y_prob[order]
+    weights = rng.multinomial(n, np.full(n, 1.0 / n), size=n_boot)[:, order].astype(np.float64)
+    flagged = np.cumsum(weights, axis=1)
+    tp = np.cumsum(weights * y_true[order], axis=1)
+    positives = tp[:, -1]
+
+    # Number of customers with probability >= threshold, for each threshold
+    k = np.searchsorted(-sorted_probs, -np.asarray(thresholds, dtype=np.float64), side='right')
+    nobody = k == 0
+    k = np.maximum(k, 1) - 1
+    with np.errstate(invalid='ignore', divide='ignore'):
+        precision = tp[:, k] / flagged[:, k]
+        recall = tp[:, k] / positives[:, np.newaxis]
+        f1 = 2 * precision * recall / (precision + recall)
+    # A threshold above every probability flags nobody: precision is undefined, recall and F1 are 0
+    precision[:, nobody] = np.nan
+    recall[:, nobody] = 0.0
+    f1[:, nobody] = 0.0
+
+    rows = []
+    for j, threshold in enumerate(thresholds):
+        row = {'threshold': float(threshold)}
+        for name, values in (('precision', precision), ('recall', recall), ('f1', f1)):
+            if np.isnan(values[:, j]).all():
+                low = high = np.nan
+            else:
+                low, high = np.nanpercentile(values[:, j], [100 * alpha / 2, 100 * (1 - alpha / 2)])
+            row[f'{name}_low'], row[f'{name}_high'] = float(low), float(high)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def summarize(sweep, metric='f1'):
+    """One row per model: metrics at the default 0.5 cutoff and at the best `metric` threshold."""
+    rows = []
+    for name, frame in sweep.groupby('model', sort=False):
+        at_default = frame[frame['threshold'] >= 0.5].tail(1)
+        best = frame.loc[frame[metric].idxmax()]
+        rows.append([
+            name,
+            float(at_default['f1'].iloc[0]) if len(at_default) else 0.0,
+            float(best['threshold']), float(best['precision']), float(best['recall']),
+            float(best['f1']), float(best['lift']),
+        ])
+    return rows
+
+
+SUMMARY_HEADERS = ["Model", "F1 @0.5", "Best Threshold", "Precision", "Recall", "F1", "Lift"]
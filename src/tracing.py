@@ -0,0 +1,205 @@
+# =============================================================================
+# File: src/tracing.py
+# Role: Lightweight timing spans for the dashboard hot paths.
+#
+# Enable with CHURN_TRACE=1. Finished spans are appended to CHURN_TRACE_FILE
+# (JSONL, default output/traces.jsonl) and `flush()` writes a Prometheus text
+# exposition file to CHURN_TRACE_PROM (default output/metrics.prom).
+# When disabled, decorators return the function unchanged and `span()` hands
+# back a shared no-op context manager.
+# =============================================================================
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+
+ENABLED = os.environ.get('CHURN_TRACE', '0') == '1'
+TRACE_FILE = os.environ.get('CHURN_TRACE_FILE', os.path.join('output', 'traces.jsonl'))
+PROMETHEUS_FILE = os.environ.get('CHURN_TRACE_PROM', os.path.join('output', 'metrics.prom'))
+MAX_RECORDS = 10_000
+
+_local = threading.local()
+_lock = threading.Lock()
+_records = deque(maxlen=MAX_RECORDS)
+_cache_counts = defaultdict(lambda: {'hits': 0, 'misses': 0})
+_trace_file = None
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _write(record):
+    global _trace_file
+    with _lock:
+        _records.append(record)
+        if _trace_file is None:
+            os.makedirs(os.path.dirname(TRACE_FILE) or '.', exist_ok=True)
+            _trace_file = open(TRACE_FILE, 'a', encoding='utf-8', buffering=1)
+        _trace_file.write(json.dumps(record) + '\n')
+
+
+class Span:
+    """Times a block (wall and thread CPU time) and records it with its parent path."""
+
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        stack = _stack()
+        stack.append(self.name)
+        self.path = '/'.join(stack)
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu
+        _stack().pop()
+        record = {
+            'ts': time.time(),
+            'span': self.name,
+            'path': self.path,
+            'wall_s': wall,
+            'cpu_s': cpu,
+            'error': exc_type.__name__ if exc_type else None,
+        }
+        record.update(self.attributes)
+        _write(record)
+        return False
+
+
+def span(name, **attributes):
+    """Context manager timing a block; a shared no-op when tracing is disabled."""
+    if not ENABLED:
+        return _NOOP_SPAN
+    return Span(name, **attributes)
+
+
+def traced(name=None):
+    """Decorator recording a span per call (the function is returned as-is when disabled)."""
+    def decorator(func):
+        if not ENABLED:
+            return func
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def traced_cache(name):
+    """
+    Decorator placed above an st.cache_* decorator. Records a span per call and
+    counts a miss when the cached body calls `record_cache_miss(name)`, a hit otherwise.
+    """
+    def decorator(cached_func):
+        if not ENABLED:
+            return cached_func
+
+        @functools.wraps(cached_func)
+        def wrapper(*args, **kwargs):
+            pending = getattr(_local, 'cache_misses', set())
+            _local.cache_misses = pending
+            pending.discard(name)
+            with Span(name) as current:
+                result = cached_func(*args, **kwargs)
+                hit = name not in pending
+                current.attributes['cache'] = 'hit' if hit else 'miss'
+            with _lock:
+                _cache_counts[name]['hits' if hit else 'misses'] += 1
+            return result
+        return wrapper
+    return decorator
+
+
+def record_cache_miss(name):
+    """Called first thing inside a cached function body: it only runs on a miss."""
+    if not ENABLED:
+        return
+    pending = getattr(_local, 'cache_misses', None)
+    if pending is None:
+        pending = _local.cache_misses = set()
+    pending.add(name)
+
+
+# --- Aggregation & export ---
+def span_stats():
+    """Per-span count, p50/p95 wall time and mean CPU time over the recent records."""
+    with _lock:
+        records = list(_records)
+
+    by_name = defaultdict(lambda: ([], []))
+    for record in records:
+        walls, cpus = by_name[record['span']]
+        walls.append(record['wall_s'])
+        cpus.append(record['cpu_s'])
+
+    stats = []
+    for name, (walls, cpus) in sorted(by_name.items()):
+        walls = np.asarray(walls)
+        stats.append({
+            'span': name,
+            'count': len(walls),
+            'p50_ms': float(np.percentile(walls, 50) * 1000),
+            'p95_ms': float(np.percentile(walls, 95) * 1000),
+            'cpu_mean_ms': float(np.mean(cpus) * 1000),
+        })
+    return stats
+
+
+def cache_stats():
+    """Hit/miss counts of the instrumented st.cache_* functions."""
+    with _lock:
+        return {name: dict(counts) for name, counts in _cache_counts.items()}
+
+
+def flush():
+    """Writes the Prometheus text exposition file (no-op when disabled)."""
+    if not ENABLED:
+        return
+    lines = [
+        '# HELP churn_span_seconds Wall time of dashboard spans.',
+        '# TYPE churn_span_seconds summary',
+    ]
+    for stat in span_stats():
+        label = stat['span'].replace('"', "'")
+        lines.append(f'churn_span_seconds{{span="{label}",quantile="0.5"}} {stat["p50_ms"] / 1000:.6f}')
+        lines.append(f'churn_span_seconds{{span="{label}",quantile="0.95"}} {stat["p95_ms"] / 1000:.6f}')
+        lines.append(f'churn_span_seconds_count{{span="{label}"}} {stat["count"]}')
+    lines += [
+        '# HELP churn_cache_requests_total st.cache_* lookups by result.',
+        '# TYPE churn_cache_requests_total counter',
+    ]
+    for name, counts in sorted(cache_stats().items()):
+        lines.append(f'churn_cache_requests_total{{cache="{name}",result="hit"}} {counts["hits"]}')
+        lines.append(f'churn_cache_requests_total{{cache="{name}",result="miss"}} {counts["misses"]}')
+
+    os.makedirs(os.path.dirname(PROMETHEUS_FILE) or '.', exist_ok=True)
+    with open(PROMETHEUS_FILE + '.tmp', 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(PROMETHEUS_FILE + '.tmp', PROMETHEUS_FILE)
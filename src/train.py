@@ -1,72 +1,202 @@
+# =============================================================================
+# File: src/train.py
+# Role: Trains the CatBoost churn model and registers it, as cached pipeline stages:
+#
+#   load -> split -> features -> train ---------> evaluate -> export
+#                          |-> threshold -----------/          /
+#                          \-> drift_reference ---------------/
+#
+# Re-running with a different model parameter reuses the cached load, split and
+# feature stages and only refits, re-evaluates and re-exports (see pipeline_runner.py).
+#
+# Usage: python src/train.py [--iterations 300 --depth 6] [--no-register] [--force train]
+# =============================================================================
+
+import argparse
+import os
+import time
+
+import numpy as np
 import pandas as pd
-from sklearn.preprocessing import LabelEncoder
 from catboost import CatBoostClassifier
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import StratifiedKFold, train_test_split
 from sklearn.metrics import accuracy_score, f1_score
-import time
 from tabulate import tabulate
-import joblib
-import os
+
+from model_registry import ModelRegistry, file_hash
+from feature_pipeline import FeaturePipeline, PIPELINE_FILE
+from drift_monitor import DriftReference, REFERENCE_FILE
+from pipeline_runner import PipelineRunner, Stage
+from threshold_eval import (threshold_sweep, choose_threshold, metrics_at, bootstrap_ci,
+                            expected_calibration_error, VALUE_MONTHS)
+
+DATA_PATH = os.path.join("data", "WA_Fn-UseC_-Telco-Customer-Churn.csv")
+
+# Best parameters from tuning.py; override them on the command line
+MODEL_PARAMS = {'iterations': 100, 'depth': 4, 'learning_rate': 0.2, 'l2_leaf_reg': 1}
+# Folds of the training rows whose out-of-fold predictions choose the operating threshold
+THRESHOLD_FOLDS = 5
+
 
 # --- 1. Load Data ---
-print("Loading data...")
-df = pd.read_csv(r"data\WA_Fn-UseC_-Telco-Customer-Churn.csv")
+def load_data(path):
+    return pd.read_csv(path)
+
 
-# --- 2. Preprocessing ---
-print("Preprocessing data...")
-df["TotalCharges"] = pd.to_numeric(df["TotalCharges"], errors="coerce")
-df["TotalCharges"].fillna(df["TotalCharges"].median(), inplace=True)
-df.drop("customerID", axis=1, inplace=True)
+# --- 2. Data Splitting ---
+def split_data(load, test_size=0.2, random_state=42):
+    """Stratified train/test split of the raw rows, with the encoded target."""
+    y = (load["Churn"] == "Yes").astype(int).to_numpy()
+    df_train, df_test, y_train, y_test = train_test_split(
+        load, y, test_size=test_size, stratify=y, random_state=random_state
+    )
+    return {'df_train': df_train, 'df_test': df_test, 'y_train': y_train, 'y_test': y_test}
 
-X = df.drop("Churn", axis=1)
-y = df["Churn"]
 
-# Encode target variable
-le_y = LabelEncoder()
-y = le_y.fit_transform(y)
+# --- 3. Preprocessing ---
+def build_features(split):
+    """
+    The pipeline learns column order, category vocabularies and imputation values
+    from the training rows and is saved with the model, so the dashboard applies
+    the same steps.
+    """
+    pipeline = FeaturePipeline().fit(split['df_train'])
+    return {
+        'pipeline': pipeline,
+        'X_train': pipeline.transform_frame(split['df_train']),
+        'X_test': pipeline.transform_frame(split['df_test'], strict=False),
+    }
 
-# Identify categorical features for CatBoost
-categorical_features_indices = [i for i, col in enumerate(X.columns) if X[col].dtype == 'object']
 
-# --- 3. Data Splitting ---
-print("Splitting data into training and testing sets...")
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, stratify=y, random_state=42)
+def build_drift_reference(split, features):
+    """Training-data histograms for the drift monitor."""
+    return DriftReference.fit(split['df_train'], features['pipeline'])
+
 
 # --- 4. Model Training ---
-print("Training CatBoost model...")
-start_time = time.time()
-
-# Initialize CatBoostClassifier with best parameters from tuning
-# You can adjust these parameters based on your tuning results
-cat_model = CatBoostClassifier(
-    iterations=100,
-    depth=4,
-    learning_rate=0.2,
-    l2_leaf_reg=1,
-    cat_features=categorical_features_indices,
-    verbose=False,
-    random_state=42
-)
-
-cat_model.fit(X_train, y_train)
-training_time = time.time() - start_time
-print(f"Training completed in {training_time:.2f} seconds.")
-
-# --- 5. Model Evaluation ---
-print("Evaluating model performance...")
-preds = cat_model.predict(X_test)
-acc = accuracy_score(y_test, preds)
-f1 = f1_score(y_test, preds, pos_label=1)
-
-results = [["CatBoost", acc, f1, training_time]]
-headers = ["Model", "Accuracy", "F1 Score", "Training Time (s)"]
-print("\n--- Model Performance ---")
-print(tabulate(results, headers=headers, floatfmt=".4f", tablefmt="grid"))
-
-# --- 6. Save Model ---
-print("Saving the trained model...")
-output_dir = 'src/models'
-os.makedirs(output_dir, exist_ok=True)
-model_path = os.path.join(output_dir, 'catboost_churn_model.joblib')
-joblib.dump(cat_model, model_path)
-print(f"Model saved to {model_path}")
+def _make_model(features, random_state, model_params):
+    return CatBoostClassifier(
+        **model_params,
+        cat_features=features['pipeline'].cat_feature_indices,
+        verbose=False,
+        random_state=random_state
+    )
+
+
+def train_model(split, features, random_state=42, **model_params):
+    model = _make_model(features, random_state, model_params)
+    start_time = time.time()
+    model.fit(features['X_train'], split['y_train'])
+    return {'model': model, 'training_time': time.time() - start_time}
+
+
+# --- 5. Operating Threshold ---
+def choose_operating_threshold(split, features, n_folds=THRESHOLD_FOLDS, random_state=42, **model_params):
+    """
+    The threshold with the best F1 on out-of-fold predictions of the training rows
+    (same model parameters, one fit per fold): what the dashboard uses to flag
+    high-risk customers. The test set is only used to report it.
+    """
+    X_train, y_train = features['X_train'], split['y_train']
+    oof_proba = np.empty(len(y_train))
+    folds = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=random_state)
+    for train_idx, valid_idx in folds.split(X_train, y_train):
+        model = _make_model(features, random_state, model_params)
+        model.fit(X_train.iloc[train_idx], y_train[train_idx])
+        oof_proba[valid_idx] = model.predict_proba(X_train.iloc[valid_idx])[:, 1]
+    sweep = threshold_sweep(y_train, oof_proba, model_names=["CatBoost"])
+    return choose_threshold(sweep, 'f1')["CatBoost"]
+
+
+# --- 6. Model Evaluation ---
+def evaluate_model(split, features, train, threshold):
+    """
+    Test-set accuracy/F1 at 0.5 and every metric at the operating `threshold`
+    (chosen without the test set), from a sweep over every cutoff.
+    """
+    model, X_test, y_test = train['model'], features['X_test'], split['y_test']
+    preds = model.predict(X_test)
+    test_proba = model.predict_proba(X_test)[:, 1]
+    sweep = threshold_sweep(y_test, test_proba, model_names=["CatBoost"],
+                            customer_value=X_test["MonthlyCharges"].to_numpy() * VALUE_MONTHS)
+    return {
+        'accuracy': accuracy_score(y_test, preds),
+        'f1': f1_score(y_test, preds, pos_label=1),
+        'sweep': sweep,
+        'threshold': threshold,
+        'at_threshold': metrics_at(sweep, {"CatBoost": threshold}).iloc[0].to_dict(),
+        'ci': bootstrap_ci(y_test, test_proba, [0.5, threshold]).round(4),
+        'calibration_error': float(expected_calibration_error(y_test, test_proba)[0]),
+    }
+
+
+# --- 7. Register Model ---
+def export_model(features, drift_reference, train, evaluate, data_path):
+    """Registers a new version; the running dashboard picks it up without a restart."""
+    model = train['model']
+    return ModelRegistry().register(
+        model,
+        params=model.get_params(),
+        metrics={'accuracy': evaluate['accuracy'], 'f1': evaluate['f1'],
+                 'f1_at_threshold': float(evaluate['at_threshold']['f1']),
+                 'calibration_error': evaluate['calibration_error']},
+        data_hash=file_hash(data_path),
+        artifacts={PIPELINE_FILE: features['pipeline'], REFERENCE_FILE: drift_reference},
+        training_time_s=train['training_time'],
+        threshold=evaluate['threshold']
+    )
+
+
+def training_stages(model_params=MODEL_PARAMS, data_path=DATA_PATH, test_size=0.2, random_state=42):
+    """The stages above with their inputs; tuning.py reuses the first ones (and their cache)."""
+    return [
+        Stage('load', load_data, params={'path': data_path}, files=[data_path]),
+        Stage('split', split_data, inputs=['load'], params={'test_size': test_size, 'random_state': random_state}),
+        Stage('features', build_features, inputs=['split']),
+        Stage('drift_reference', build_drift_reference, inputs=['split', 'features']),
+        Stage('train', train_model, inputs=['split', 'features'], params={'random_state': random_state, **model_params}),
+        Stage('threshold', choose_operating_threshold, inputs=['split', 'features'],
+              params={'random_state': random_state, **model_params}),
+        Stage('evaluate', evaluate_model, inputs=['split', 'features', 'train', 'threshold']),
+        # A cached export is only reused while its registry version still exists
+        Stage('export', export_model, inputs=['features', 'drift_reference', 'train', 'evaluate'],
+              params={'data_path': data_path}, files=[data_path],
+              still_valid=lambda version: version in ModelRegistry().versions()),
+    ]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Train, evaluate and register the churn model.")
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--iterations', type=int, default=MODEL_PARAMS['iterations'])
+    parser.add_argument('--depth', type=int, default=MODEL_PARAMS['depth'])
+    parser.add_argument('--learning-rate', type=float, default=MODEL_PARAMS['learning_rate'])
+    parser.add_argument('--l2-leaf-reg', type=float, default=MODEL_PARAMS['l2_leaf_reg'])
+    parser.add_argument('--workers', type=int, default=4, help="Stages run concurrently when independent")
+    parser.add_argument('--force', nargs='*', default=[], help="Stages to re-run even when cached")
+    parser.add_argument('--no-register', action='store_true', help="Stop after evaluation")
+    args = parser.parse_args()
+
+    model_params = {'iterations': args.iterations, 'depth': args.depth,
+                    'learning_rate': args.learning_rate, 'l2_leaf_reg': args.l2_leaf_reg}
+    runner = PipelineRunner(training_stages(model_params, args.data))
+    print("Running training pipeline...")
+    outputs = runner.run(['evaluate'] if args.no_register else None, workers=args.workers, force=args.force)
+    train, evaluate = outputs['train'], outputs['evaluate']
+
+    results = [["CatBoost", evaluate['accuracy'], evaluate['f1'], train['training_time']]]
+    headers = ["Model", "Accuracy", "F1 Score", "Training Time (s)"]
+    print("\n--- Model Performance ---")
+    print(tabulate(results, headers=headers, floatfmt=".4f", tablefmt="grid"))
+
+    report_columns = ['threshold', 'flagged', 'precision', 'recall', 'f1', 'lift', 'retention_value']
+    print("\n--- Test Metrics at the Operating Threshold (chosen on out-of-fold training predictions) ---")
+    print(tabulate([[evaluate['at_threshold'][column] for column in report_columns]], headers=report_columns,
+                   floatfmt=".4f", tablefmt="grid"))
+    print("\n--- 95% Bootstrap Intervals ---")
+    print(tabulate(evaluate['ci'], headers="keys", showindex=False, floatfmt=".4f", tablefmt="grid"))
+    print(f"Expected calibration error: {evaluate['calibration_error']:.4f}")
+
+    if not args.no_register:
+        print(f"Model registered as {outputs['export']} in {ModelRegistry().root} "
+              f"(threshold {evaluate['threshold']:.3f})")
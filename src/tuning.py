@@ -1,57 +1,67 @@
-import pandas as pd
-from sklearn.model_selection import GridSearchCV
-from sklearn.preprocessing import LabelEncoder
+# Hyperparameter tuning for CatBoost, as pipeline stages on top of train.py's
+# load -> split -> features stages (shared cache: the data is not reloaded or
+# re-split when only the grid changes).
+#
+# Usage: python src/tuning.py [--workers 4] [--force grid_search]
+
+import argparse
+import time
+
 from catboost import CatBoostClassifier
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import GridSearchCV
 from sklearn.metrics import accuracy_score, f1_score
-import time
 from tabulate import tabulate
 
-# Load data
-df = pd.read_csv(r"data/WA_Fn-UseC_-Telco-Customer-Churn.csv")
-
-# Preprocessing
-df["TotalCharges"] = pd.to_numeric(df["TotalCharges"], errors="coerce")
-df["TotalCharges"].fillna(df["TotalCharges"].median(), inplace=True)
-df.drop("customerID", axis=1, inplace=True)
-
-X = df.drop("Churn", axis=1)
-y = df["Churn"]
+from pipeline_runner import PipelineRunner, Stage
+from threshold_eval import threshold_sweep, summarize, SUMMARY_HEADERS
+from train import DATA_PATH, training_stages
 
-le_y = LabelEncoder()
-y = le_y.fit_transform(y)
-
-categorical_features_indices = [i for i, col in enumerate(X.columns) if X[col].dtype == 'object']
-
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, stratify=y, random_state=42)
-
-# Hyperparameter tuning for CatBoost
-print("--- Starting Hyperparameter Tuning for CatBoost ---")
-start_time = time.time()
-
-param_grid = {
+PARAM_GRID = {
     'iterations': [100, 300],
     'depth': [4, 6],
     'learning_rate': [0.05, 0.3],
     'l2_leaf_reg': [1, 3]
 }
 
-cat_model = CatBoostClassifier(cat_features=categorical_features_indices, verbose=False, random_state=42)
 
-grid_search = GridSearchCV(estimator=cat_model, param_grid=param_grid, cv=3, scoring='accuracy', n_jobs=-1)
-grid_search.fit(X_train, y_train)
+def grid_search(split, features, param_grid, cv=3, random_state=42):
+    start_time = time.time()
+    cat_model = CatBoostClassifier(verbose=False, random_state=random_state)
+    search = GridSearchCV(estimator=cat_model, param_grid=param_grid, cv=cv, scoring='accuracy', n_jobs=-1)
+    # cat_features goes to fit(): sklearn cannot clone a CatBoostClassifier constructed with it
+    search.fit(features['X_train'], split['y_train'], cat_features=features['pipeline'].cat_feature_indices)
+    return {'best_params': search.best_params_, 'best_model': search.best_estimator_,
+            'tuning_time': time.time() - start_time}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Grid search over CatBoost parameters.")
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--force', nargs='*', default=[], help="Stages to re-run even when cached")
+    args = parser.parse_args()
+
+    stages = [stage for stage in training_stages(data_path=args.data) if stage.name in ('load', 'split', 'features')]
+    stages.append(Stage('grid_search', grid_search, inputs=['split', 'features'], params={'param_grid': PARAM_GRID}))
+
+    print("--- Starting Hyperparameter Tuning for CatBoost ---")
+    outputs = PipelineRunner(stages).run(workers=args.workers, force=args.force)
+    search, features, split = outputs['grid_search'], outputs['features'], outputs['split']
+    print(f"Tuning completed in {search['tuning_time']:.2f} seconds.")
+    print("Best parameters found: ", search['best_params'])
 
-end_time = time.time()
-print(f"Tuning completed in {end_time - start_time:.2f} seconds.")
-print("Best parameters found: ", grid_search.best_params_)
+    # Evaluate the tuned model
+    best_model = search['best_model']
+    preds = best_model.predict(features['X_test'])
+    acc = accuracy_score(split['y_test'], preds)
+    f1 = f1_score(split['y_test'], preds, pos_label=1)
 
-# Evaluate the tuned model
-best_model = grid_search.best_estimator_
-preds = best_model.predict(X_test)
-acc = accuracy_score(y_test, preds)
-f1 = f1_score(y_test, preds, pos_label=1)
+    results = [["Tuned CatBoost", acc, f1, search['tuning_time']]]
+    headers = ["Model", "Accuracy", "F1 Score", "Tuning Time (s)"]
+    print("\n--- Tuned Model Performance ---")
+    print(tabulate(results, headers=headers, floatfmt=".4f", tablefmt="grid"))
 
-results = [["Tuned CatBoost", acc, f1, end_time - start_time]]
-headers = ["Model", "Accuracy", "F1 Score", "Tuning Time (s)"]
-print("\n--- Tuned Model Performance ---")
-print(tabulate(results, headers=headers, floatfmt=".4f", tablefmt="grid"))
+    sweep = threshold_sweep(split['y_test'], best_model.predict_proba(features['X_test'])[:, 1],
+                            model_names=["Tuned CatBoost"])
+    print("\n--- Threshold Sweep ---")
+    print(tabulate(summarize(sweep), headers=SUMMARY_HEADERS, floatfmt=".4f", tablefmt="grid"))
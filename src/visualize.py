@@ -1,83 +1,234 @@
+# =============================================================================
+# File: src/visualize.py
+# Role: Headless rendering of the static report charts.
+#
+# - Charts are drawn from small precomputed aggregates (counts, histogram bins,
+#   box statistics), so the cost of plotting does not grow with the row count.
+# - Each chart is rendered on the Agg backend in a process pool and its figure is
+#   closed right after saving.
+# - A manifest records the hash of each chart's aggregate and spec; unchanged
+#   charts are skipped on the next run.
+#
+# Usage: python src/visualize.py [--data data/file.csv|.parquet] [--workers 4] [--force]
+# =============================================================================
 
-import pandas as pd
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
 import seaborn as sns
-import os
 
 # --- Configuration ---
 DATA_PATH = 'data/WA_Fn-UseC_-Telco-Customer-Churn.csv'
 OUTPUT_DIR = 'output/visualizations'
+MANIFEST_FILE = 'manifest.json'
+FIGURE_SIZE = (12, 7)
+
+# One entry per chart: what to aggregate and how to draw it
+CHART_SPECS = {
+    'churn_distribution': {
+        'kind': 'count', 'x': 'Churn', 'hue': None, 'palette': 'viridis',
+        'title': "Distribution of Churn", 'xlabel': "Churn", 'ylabel': "Number of Customers",
+    },
+    'churn_by_gender': {
+        'kind': 'count', 'x': 'gender', 'hue': 'Churn', 'palette': 'pastel',
+        'title': "Churn by Gender", 'xlabel': "Gender", 'ylabel': "Number of Customers",
+    },
+    'churn_by_contract': {
+        'kind': 'count', 'x': 'Contract', 'hue': 'Churn', 'palette': 'plasma',
+        'title': "Churn by Contract Type", 'xlabel': "Contract Type", 'ylabel': "Number of Customers",
+    },
+    'churn_by_tenure': {
+        'kind': 'hist', 'x': 'tenure', 'hue': 'Churn', 'palette': 'coolwarm', 'bins': 30,
+        'title': "Distribution of Tenure by Churn Status", 'xlabel': "Tenure (months)",
+        'ylabel': "Number of Customers",
+    },
+    'churn_by_monthly_charges': {
+        'kind': 'box', 'x': 'Churn', 'y': 'MonthlyCharges', 'palette': 'autumn',
+        'title': "Distribution of Monthly Charges by Churn Status", 'xlabel': "Churn",
+        'ylabel': "Monthly Charges ($)",
+    },
+}
 
-# --- Create output directory if it does not exist ---
-os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # --- 1. Load data ---
-try:
-    df = pd.read_csv(DATA_PATH)
-    print("✅ Data loaded successfully.")
-except FileNotFoundError:
-    print(f"❌ Error: File not found at '{DATA_PATH}'.")
-    exit()
-
-# --- Convert 'TotalCharges' to numeric (handling errors) ---
-df['TotalCharges'] = pd.to_numeric(df['TotalCharges'], errors='coerce')
-# Replace NaNs with the median to avoid data loss
-df['TotalCharges'].fillna(df['TotalCharges'].median(), inplace=True)
-
-# --- 2. Configure plot style ---
-sns.set_style("whitegrid")
-plt.rcParams['figure.figsize'] = (12, 7)
-plt.rcParams['font.size'] = 12
-
-# --- 3. Visualizations ---
-
-# A. Distribution of the target variable 'Churn'
-plt.figure()
-sns.countplot(x='Churn', data=df, palette='viridis')
-plt.title("Distribution of Churn")
-plt.xlabel("Churn")
-plt.ylabel("Number of Customers")
-plt.savefig(os.path.join(OUTPUT_DIR, 'churn_distribution.png'))
-print("📊 Churn distribution graph saved.")
-
-# B. Relationship between gender and churn
-plt.figure()
-sns.countplot(x='gender', hue='Churn', data=df, palette='pastel')
-plt.title("Churn by Gender")
-plt.xlabel("Gender")
-plt.ylabel("Number of Customers")
-plt.savefig(os.path.join(OUTPUT_DIR, 'churn_by_gender.png'))
-print("📊 Churn by gender graph saved.")
-
-# C. Relationship between contract type and churn
-plt.figure()
-sns.countplot(x='Contract', hue='Churn', data=df, palette='plasma')
-plt.title("Churn by Contract Type")
-plt.xlabel("Contract Type")
-plt.ylabel("Number of Customers")
-plt.savefig(os.path.join(OUTPUT_DIR, 'churn_by_contract.png'))
-print("📊 Churn by contract graph saved.")
-
-# D. Distribution of tenure in relation to churn
-plt.figure()
-sns.histplot(data=df, x='tenure', hue='Churn', multiple='stack', kde=True, palette='coolwarm')
-plt.title("Distribution of Tenure by Churn Status")
-plt.xlabel("Tenure (months)")
-plt.ylabel("Number of Customers")
-plt.savefig(os.path.join(OUTPUT_DIR, 'churn_by_tenure.png'))
-print("📊 Churn by tenure graph saved.")
-
-# E. Distribution of monthly charges in relation to churn
-plt.figure()
-sns.boxplot(x='Churn', y='MonthlyCharges', data=df, palette='autumn')
-plt.title("Distribution of Monthly Charges by Churn Status")
-plt.xlabel("Churn")
-plt.ylabel("Monthly Charges ($)")
-plt.savefig(os.path.join(OUTPUT_DIR, 'churn_by_monthly_charges.png'))
-print("📊 Churn by monthly charges graph saved.")
-
-# --- Display plots ---
-print("\n🚀 Displaying plots. Close the windows to end the script.")
-plt.show()
-
-print("\n✅ Visualization script finished.")
+def load_data(path=DATA_PATH):
+    """Reads only the columns the charts use (CSV or Parquet)."""
+    columns = sorted({spec[key] for spec in CHART_SPECS.values() for key in ('x', 'hue', 'y') if spec.get(key)})
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        df = pd.read_csv(path, usecols=columns)
+    # Convert 'TotalCharges'-style text columns to numeric where a chart needs numbers
+    for spec in CHART_SPECS.values():
+        if spec['kind'] in ('hist', 'box'):
+            column = spec['x'] if spec['kind'] == 'hist' else spec['y']
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+    return df
+
+
+# --- 2. Aggregate first ---
+def aggregate_counts(df, spec):
+    keys = [spec['x']] + ([spec['hue']] if spec['hue'] else [])
+    return df.groupby(keys, observed=True).size().rename('count').reset_index()
+
+
+def aggregate_histogram(df, spec):
+    """Bin counts per hue over shared edges: one row per (hue, bin)."""
+    values = df[spec['x']].to_numpy(dtype=np.float64)
+    finite = np.isfinite(values)
+    edges = np.histogram_bin_edges(values[finite], bins=spec['bins'])
+    frames = []
+    for hue_value, group in df[finite].groupby(spec['hue'], observed=True):
+        counts, _ = np.histogram(group[spec['x']].to_numpy(dtype=np.float64), bins=edges)
+        frames.append(pd.DataFrame({
+            spec['hue']: hue_value,
+            'bin_left': edges[:-1],
+            'bin_center': (edges[:-1] + edges[1:]) / 2,
+            'count': counts,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def aggregate_box(df, spec):
+    """Tukey box statistics per group (quartiles, median, 1.5 IQR whiskers)."""
+    data = df[[spec['x'], spec['y']]].dropna()
+    grouped = data.groupby(spec['x'], observed=True)[spec['y']]
+    stats = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ['q1', 'med', 'q3']
+    iqr = stats['q3'] - stats['q1']
+    fences = pd.DataFrame({'low': stats['q1'] - 1.5 * iqr, 'high': stats['q3'] + 1.5 * iqr})
+    bounded = data.join(fences, on=spec['x'])
+    inside = bounded[(bounded[spec['y']] >= bounded['low']) & (bounded[spec['y']] <= bounded['high'])]
+    stats['whislo'] = inside.groupby(spec['x'], observed=True)[spec['y']].min()
+    stats['whishi'] = inside.groupby(spec['x'], observed=True)[spec['y']].max()
+    return stats.reset_index()
+
+
+AGGREGATORS = {'count': aggregate_counts, 'hist': aggregate_histogram, 'box': aggregate_box}
+
+
+# --- 3. Rendering (runs in worker processes) ---
+def draw_count(ax, aggregate, spec):
+    sns.barplot(data=aggregate, x=spec['x'], y='count', hue=spec['hue'] or spec['x'],
+                palette=spec['palette'], legend=bool(spec['hue']), ax=ax)
+
+
+def draw_hist(ax, aggregate, spec):
+    # Each bin is one weighted point at its center, so seaborn re-bins nothing but the bins
+    lefts = np.sort(aggregate['bin_left'].unique())
+    width = 2 * (aggregate['bin_center'].min() - lefts[0])
+    sns.histplot(data=aggregate, x='bin_center', weights='count', hue=spec['hue'],
+                 binwidth=width, binrange=(lefts[0], lefts[-1] + width),
+                 multiple='stack', kde=True, palette=spec['palette'], ax=ax)
+
+
+def draw_box(ax, aggregate, spec):
+    boxes = [
+        {'label': str(row[spec['x']]), 'med': row['med'], 'q1': row['q1'], 'q3': row['q3'],
+         'whislo': row['whislo'], 'whishi': row['whishi'], 'fliers': []}
+        for _, row in aggregate.iterrows()
+    ]
+    artists = ax.bxp(boxes, showfliers=False, patch_artist=True, widths=0.6,
+                     medianprops=dict(color='#2d3748', linewidth=2))
+    for patch, color in zip(artists['boxes'], sns.color_palette(spec['palette'], len(boxes))):
+        patch.set_facecolor(color)
+
+
+DRAWERS = {'count': draw_count, 'hist': draw_hist, 'box': draw_box}
+
+
+def render_chart(name, spec, aggregate, path):
+    """Draws one chart from its aggregate, saves it and always closes the figure."""
+    sns.set_style("whitegrid")
+    plt.rcParams['font.size'] = 12
+    fig, ax = plt.subplots(figsize=FIGURE_SIZE)
+    try:
+        DRAWERS[spec['kind']](ax, aggregate, spec)
+        ax.set_title(spec['title'])
+        ax.set_xlabel(spec['xlabel'])
+        ax.set_ylabel(spec['ylabel'])
+        fig.savefig(path)
+    finally:
+        plt.close(fig)
+    return name
+
+
+# --- 4. Incremental pipeline ---
+def chart_hashes(spec, aggregate):
+    """(data hash, spec hash) of a chart; the aggregate stands in for the raw rows."""
+    data_hash = hashlib.sha1(pd.util.hash_pandas_object(aggregate, index=False).to_numpy().tobytes()).hexdigest()
+    spec_hash = hashlib.sha1(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()
+    return data_hash, spec_hash
+
+
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def render_report(df, output_dir=OUTPUT_DIR, workers=None, force=False):
+    """Renders the charts whose aggregate or spec changed; returns (rendered, skipped) names."""
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+
+    jobs = {}
+    for name, spec in CHART_SPECS.items():
+        aggregate = AGGREGATORS[spec['kind']](df, spec)
+        data_hash, spec_hash = chart_hashes(spec, aggregate)
+        path = os.path.join(output_dir, f'{name}.png')
+        entry = manifest.get(name, {})
+        if not force and os.path.exists(path) and entry.get('data_hash') == data_hash and entry.get('spec_hash') == spec_hash:
+            continue
+        jobs[name] = (spec, aggregate, path, {'data_hash': data_hash, 'spec_hash': spec_hash, 'file': f'{name}.png'})
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {name: pool.submit(render_chart, name, spec, aggregate, path)
+                       for name, (spec, aggregate, path, _) in jobs.items()}
+            for name, future in futures.items():
+                future.result()
+                manifest[name] = jobs[name][3]
+                print(f"📊 {CHART_SPECS[name]['title']} graph saved.")
+    finally:
+        # Charts finished before a failure are still recorded as up to date
+        save_manifest(output_dir, manifest)
+    return list(jobs), [name for name in CHART_SPECS if name not in jobs]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Render the static report charts.")
+    parser.add_argument('--data', default=DATA_PATH, help="CSV or Parquet input")
+    parser.add_argument('--output', default=OUTPUT_DIR)
+    parser.add_argument('--workers', type=int, default=None, help="Render processes (default: one per core)")
+    parser.add_argument('--force', action='store_true', help="Re-render every chart")
+    args = parser.parse_args()
+
+    try:
+        df = load_data(args.data)
+        print("✅ Data loaded successfully.")
+    except FileNotFoundError:
+        print(f"❌ Error: File not found at '{args.data}'.")
+        raise SystemExit(1)
+
+    rendered, skipped = render_report(df, args.output, args.workers, args.force)
+    if skipped:
+        print(f"⏭️  Unchanged, skipped: {', '.join(skipped)}")
+    print("\n✅ Visualization script finished.")
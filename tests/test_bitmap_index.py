@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bitmap_index import BitmapIndex, add_derived_columns
+from query_backend import DuckDBBackend, PandasBackend
+
+DF = pd.DataFrame({
+    'Contract': ['Month-to-month', 'One year', 'Two year', 'Month-to-month', 'One year'],
+    'InternetService': ['DSL', 'Fiber optic', 'No', 'DSL', 'DSL'],
+    'PaymentMethod': ['Electronic check', 'Mailed check', 'Electronic check', 'Mailed check', 'Mailed check'],
+    'SeniorCitizen': [0, 1, 0, 0, 1],
+    'gender': ['Male', 'Female', 'Female', 'Male', 'Male'],
+    'tenure': [1, 30, 60, 5, 14],
+})
+
+
+def test_updated_matches_rebuilt_index():
+    index = BitmapIndex.from_dataframe(DF)
+    changed = DF.copy()
+    changed.loc[[0, 3], 'Contract'] = ['Two year', 'One year']
+    changed.loc[3, 'PaymentMethod'] = 'Credit card (automatic)'
+    changed.loc[0, 'tenure'] = 40
+
+    updated = index.updated(changed, np.array([0, 3]), ['Contract', 'PaymentMethod', 'tenure'])
+    rebuilt = BitmapIndex.from_dataframe(changed)
+    for selection in [{'Contract': 'Two year'}, {'Contract': 'Month-to-month'},
+                      {'Contract': 'One year', 'PaymentMethod': 'Credit card (automatic)'},
+                      {'PaymentMethod': 'Mailed check'}, {'TenureBand': '36-48'}, {'TenureBand': '0-12'}]:
+        assert updated.mask(selection).tolist() == rebuilt.mask(selection).tolist()
+    # The original index still describes the original rows
+    assert index.count({'Contract': 'Two year'}) == 1
+    assert updated.bitmaps['gender'] is index.bitmaps['gender']
+
+
+@pytest.mark.parametrize('backend', ['pandas', 'duckdb'])
+def test_tenure_groups_match_the_tenure_band_filter(backend, tmp_path):
+    df = DF.assign(tenure=[0, 12, 13, 72, 48], Churn=['Yes', 'No', 'Yes', 'No', 'Yes'])
+    if backend == 'duckdb':
+        pytest.importorskip('duckdb')
+        df.to_parquet(tmp_path / 'customers.parquet', index=False)
+        query_backend = DuckDBBackend(str(tmp_path / 'customers.parquet'))
+    else:
+        query_backend = PandasBackend(df)
+
+    groups = query_backend.churn_rate_by_tenure_group({})
+    bands = add_derived_columns(df)
+    expected = (bands['Churn'] == 'Yes').groupby(bands['TenureBand']).mean().mul(100)
+    # Tenure 0 falls in the first band, as in the TenureBand filter
+    assert groups['Tenure Group'].tolist() == ['0-12', '12-24', '36-48', '48+']
+    assert groups['Churn Rate'].tolist() == expected[groups['Tenure Group']].tolist()
@@ -0,0 +1,110 @@
+import json
+import sqlite3
+import time
+
+import pytest
+
+from event_stream import SQLITE_TABLE, EventIngestor, _create_table, append_events, open_source
+
+EVENTS = [
+    {'customerID': '7590-VHVEG', 'changes': {'Contract': 'One year'}, 'ts': 1.0},
+    {'customerID': '5575-GNVDE', 'changes': {'TechSupport': 'Yes'}, 'ts': 2.0},
+]
+
+
+def test_jsonl_corrupt_line_mid_batch(tmp_path):
+    path = tmp_path / 'events.jsonl'
+    path.write_text(json.dumps(EVENTS[0]) + '\n' + '{"customerID": "7590-VH\n' + json.dumps(EVENTS[1]) + '\n')
+    source = open_source(str(path))
+
+    assert source.read() == EVENTS
+    assert source.rejected == 1
+    assert source.offset == path.stat().st_size
+    assert source.read() == []
+
+
+def test_jsonl_partial_last_line_is_left_for_next_read(tmp_path):
+    path = tmp_path / 'events.jsonl'
+    path.write_text(json.dumps(EVENTS[0]) + '\n' + json.dumps(EVENTS[1])[:10])
+    source = open_source(str(path))
+
+    assert source.read() == EVENTS[:1]
+    with open(path, 'a') as f:
+        f.write(json.dumps(EVENTS[1])[10:] + '\n')
+    assert source.read() == EVENTS[1:]
+    assert source.rejected == 0
+
+
+@pytest.mark.parametrize('max_events', [1, 10])
+def test_jsonl_offset_stops_at_last_consumed_event(tmp_path, max_events):
+    path = tmp_path / 'events.jsonl'
+    append_events(str(path), EVENTS)
+    source = open_source(str(path))
+
+    events = []
+    while batch := source.read(max_events):
+        assert len(batch) <= max_events
+        events.extend(batch)
+    assert [event['customerID'] for event in events] == [event['customerID'] for event in EVENTS]
+
+
+def test_sqlite_corrupt_row_mid_batch(tmp_path):
+    path = str(tmp_path / 'events.db')
+    append_events(path, EVENTS[:1])
+    with sqlite3.connect(path) as connection:
+        _create_table(connection)
+        connection.execute(f"INSERT INTO {SQLITE_TABLE} (customer_id, changes, ts) VALUES ('x', '{{oops', 0)")
+    append_events(path, EVENTS[1:])
+    source = open_source(path)
+
+    assert source.read() == EVENTS
+    assert source.rejected == 1
+    assert source.last_id == 3
+    assert source.read() == []
+
+
+class FlakyTable:
+    """Stands in for LiveCustomerTable: fails the first `failures` batches, then records them."""
+
+    def __init__(self, failures=1):
+        self.failures = failures
+        self.applied = []
+
+    def apply(self, events):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("explainer unavailable")
+        self.applied.extend(events)
+        return {'events': len(events), 'customers': len(events), 'unknown_customers': 0, 'rejected': 0}
+
+
+@pytest.mark.parametrize('extension', ['.jsonl', '.db'])
+def test_failed_batch_is_applied_on_next_poll(tmp_path, extension):
+    path = str(tmp_path / f'events{extension}')
+    append_events(path, EVENTS)
+    table = FlakyTable()
+    ingestor = EventIngestor(open_source(path), table)
+
+    with pytest.raises(RuntimeError):
+        ingestor.run_once()
+    assert ingestor.totals['events'] == 0
+
+    assert ingestor.run_once() == len(EVENTS)
+    assert [event['customerID'] for event in table.applied] == [event['customerID'] for event in EVENTS]
+    assert ingestor.totals['events'] == len(EVENTS)
+    assert ingestor.run_once() == 0
+
+
+def test_background_ingestor_retries_failed_batch(tmp_path):
+    path = str(tmp_path / 'events.jsonl')
+    append_events(path, EVENTS)
+    table = FlakyTable()
+    ingestor = EventIngestor(open_source(path), table, poll_interval=0.01).start()
+    try:
+        deadline = time.monotonic() + 5
+        while len(table.applied) < len(EVENTS) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        ingestor.stop()
+    assert len(table.applied) == len(EVENTS)
+    assert ingestor.stats()['error'] is None
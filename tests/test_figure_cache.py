@@ -0,0 +1,80 @@
+import os
+import threading
+
+import plotly.graph_objects as go
+
+from figure_cache import FigureCache
+
+
+def figure(n):
+    return go.Figure(go.Bar(x=list(range(n)), y=list(range(n))))
+
+
+def spilled_files(spill_dir):
+    return sorted(name for name in os.listdir(spill_dir))
+
+
+def test_spill_directory_is_bounded_lru(tmp_path):
+    one_spill = len(figure(50).to_json().encode('utf-8'))
+    cache = FigureCache(max_entries=1, spill_dir=str(tmp_path), max_spill_bytes=3 * one_spill)
+    keys = [cache.make_key('chart', {'i': i}, 'v1') for i in range(4)]
+    for i in range(4):
+        cache.get_or_build('chart', {'i': i}, 'v1', lambda: figure(50))
+    # 0, 1 and 2 are spilled (3 is in memory), oldest first
+
+    # A disk hit refreshes 0 and spills 3: the least recently used, 1, is evicted
+    builds = []
+    cache.get_or_build('chart', {'i': 0}, 'v1', lambda: builds.append(0) or figure(50))
+    assert builds == []
+    assert spilled_files(tmp_path) == sorted(f"{key}.json" for key in [keys[0], keys[2], keys[3]])
+    assert cache.stats()['spill_evictions'] == 1
+
+    for i in range(4, 20):
+        cache.get_or_build('chart', {'i': i}, 'v1', lambda: figure(50))
+    files = spilled_files(tmp_path)
+    assert len(files) == 3
+    assert sum(os.path.getsize(tmp_path / name) for name in files) == cache.stats()['spill_bytes'] <= 3 * one_spill
+
+
+def test_spills_of_an_earlier_process_are_counted_oldest_first(tmp_path):
+    one_spill = len(figure(50).to_json().encode('utf-8'))
+    earlier = FigureCache(max_entries=1, spill_dir=str(tmp_path))
+    keys = [earlier.make_key('chart', {'i': i}, 'v1') for i in range(4)]
+    for i in range(4):
+        earlier.get_or_build('chart', {'i': i}, 'v1', lambda: figure(50))
+    # Spilled in the order 0, 1, 2; make 1 the oldest on disk
+    for age, key in zip([2, 1, 3], keys[:3]):
+        os.utime(tmp_path / f"{key}.json", (1_000 + age, 1_000 + age))
+
+    cache = FigureCache(max_entries=1, spill_dir=str(tmp_path), max_spill_bytes=3 * one_spill)
+    assert cache.stats()['spill_bytes'] == 3 * one_spill
+    cache.get_or_build('chart', {'i': 4}, 'v1', lambda: figure(50))
+    cache.get_or_build('chart', {'i': 5}, 'v1', lambda: figure(50))
+    # Spilling 4 evicts the oldest earlier spill
+    assert f"{keys[1]}.json" not in spilled_files(tmp_path)
+    assert f"{keys[0]}.json" in spilled_files(tmp_path)
+
+
+def test_keys_change_with_the_figure_code(tmp_path):
+    builder = tmp_path / 'charts.py'
+    builder.write_text('SPEC = 1\n')
+    before = FigureCache(sources=[str(builder)])
+    builder.write_text('SPEC = 2\n')
+    after = FigureCache(sources=[str(builder)])
+    assert before.make_key('chart', {}, 'v1') != after.make_key('chart', {}, 'v1')
+    # Stable across processes for unchanged code
+    assert after.make_key('chart', {}, 'v1') == FigureCache(sources=[str(builder)]).make_key('chart', {}, 'v1')
+
+
+def test_concurrent_spills_of_the_same_key(tmp_path):
+    cache = FigureCache(max_entries=1, spill_dir=str(tmp_path))
+    figure_json = figure(200).to_json()
+    threads = [threading.Thread(target=lambda: [cache._spill('same', figure_json) for _ in range(20)])
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert spilled_files(tmp_path) == ['same.json']
+    assert (tmp_path / 'same.json').read_text(encoding='utf-8') == figure_json
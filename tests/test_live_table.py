@@ -0,0 +1,94 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import shap
+from catboost import CatBoostClassifier
+
+from event_stream import LiveCustomerTable, synthetic_events
+from feature_pipeline import FeaturePipeline
+from quantized_store import QuantizedExplanationStore
+from segment_explanation import ExplanationStore
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'data', 'WA_Fn-UseC_-Telco-Customer-Churn.csv')
+
+
+@pytest.fixture(scope='module')
+def served():
+    raw = pd.read_csv(DATA_PATH, nrows=600)
+    pipeline = FeaturePipeline().fit(raw)
+    features = pipeline.transform_frame(raw)
+    model = CatBoostClassifier(iterations=20, depth=3, verbose=False, random_state=0,
+                               cat_features=pipeline.cat_feature_indices)
+    model.fit(features, (raw['Churn'] == 'Yes').astype(int))
+    df = raw.copy()
+    df['TotalCharges'] = pd.to_numeric(df['TotalCharges'], errors='coerce').fillna(0)
+    return df, features, pipeline, model, shap.TreeExplainer(model)
+
+
+def make_table(served, store_encoding=None, max_overlay=None):
+    df, features, pipeline, model, explainer = served
+    if store_encoding is None:
+        store = ExplanationStore.build(model, explainer, features)
+    else:
+        store = QuantizedExplanationStore.build(model, explainer, features, encoding=store_encoding)
+    return LiveCustomerTable(df, features, store, pd.Index(df['customerID']), pipeline, model, explainer,
+                             max_overlay=max_overlay)
+
+
+def apply_batches(table, customer_ids, n_batches=8, batch_size=25, seed=0):
+    rng = np.random.default_rng(seed)
+    for _ in range(n_batches):
+        table.apply(synthetic_events(customer_ids, batch_size, rng))
+
+
+def test_overlay_and_compaction_serve_the_same_state(served):
+    df, _, _, model, explainer = served
+    overlay_only = make_table(served, max_overlay=len(df))
+    compacting = make_table(served, max_overlay=30)
+    first = compacting.snapshot()
+    apply_batches(overlay_only, df['customerID'].to_numpy())
+    apply_batches(compacting, df['customerID'].to_numpy())
+    a, b = overlay_only.snapshot(), compacting.snapshot()
+
+    assert a.version == b.version == 8
+    assert len(b.overlay) <= 30 and len(a.overlay) > 30
+    pd.testing.assert_frame_equal(a.df, b.df)
+    pd.testing.assert_frame_equal(a.features, b.features)
+    np.testing.assert_array_equal(a.probabilities, b.probabilities)
+    np.testing.assert_array_equal(a.risk_ranking.scores, b.risk_ranking.scores)
+    for contract in ['Month-to-month', 'One year', 'Two year']:
+        selection = {'Contract': contract}
+        assert a.filter_index.mask(selection).tolist() == (a.df['Contract'] == contract).tolist()
+        assert b.filter_index.mask(selection).tolist() == (b.df['Contract'] == contract).tolist()
+    positions = np.arange(len(df))
+    np.testing.assert_array_equal(a.explanations.shap_rows(positions), b.explanations.shap_rows(positions))
+    assert [a.explanations.row_version(p) for p in positions] == [b.explanations.row_version(p) for p in positions]
+
+    # Every score and SHAP row matches the model on the current inputs
+    np.testing.assert_allclose(b.probabilities, model.predict_proba(b.features)[:, 1], atol=1e-6)
+    np.testing.assert_allclose(b.explanations.shap_rows(positions), explainer.shap_values(b.features), atol=1e-5)
+    # Compacted changes reach the segment explanations too
+    pd.testing.assert_frame_equal(b.explanations.explain_segment(np.ones(len(df), dtype=bool)),
+                                  ExplanationStore(explainer.shap_values(b.features).astype(np.float32),
+                                                   b.probabilities, b.features.columns, 0.0)
+                                  .explain_segment(np.ones(len(df), dtype=bool)), atol=1e-5)
+    # Earlier snapshots are never modified
+    pd.testing.assert_frame_equal(first.df, make_table(served).snapshot().df)
+
+
+def test_compaction_into_quantized_store(served):
+    df, _, _, _, explainer = served
+    table = make_table(served, store_encoding='int8', max_overlay=30)
+    store = table.snapshot().base.store
+    apply_batches(table, df['customerID'].to_numpy())
+    snapshot = table.snapshot()
+
+    assert snapshot.base.store is not store
+    assert snapshot.base.store.encoding == 'int8'
+    exact = explainer.shap_values(snapshot.features)
+    compacted = np.flatnonzero(snapshot.base.row_versions)
+    error = np.abs(snapshot.base.store.shap_rows(compacted) - exact[compacted]).max(axis=0)
+    assert (error <= snapshot.base.store.error_bounds + 1e-6).all()
@@ -0,0 +1,42 @@
+import time
+
+import pytest
+
+from model_registry import ModelRegistry, ModelWatcher
+
+
+def wait_for_version(watcher, version, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while watcher.active.version != version:
+        assert time.monotonic() < deadline, f"{version} never went live"
+        watcher.poll()
+        time.sleep(0.01)
+
+
+def test_new_version_is_warmed_before_it_goes_live(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    registry.register('model-1')
+    warmed = []
+    watcher = ModelWatcher(registry, lambda model: None, poll_interval=0,
+                           warm=lambda bundle: warmed.append((bundle.version, watcher.active.version)))
+    first_stamp = watcher.registry_stamp
+
+    registry.register('model-2')
+    wait_for_version(watcher, 'v0002')
+    # Built for v0002 while v0001 was still the one served
+    assert warmed == [('v0002', 'v0001')]
+    assert watcher.active.model == 'model-2'
+    assert watcher.registry_stamp != first_stamp
+
+
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+def test_failed_warm_up_still_swaps(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    registry.register('model-1')
+
+    def warm(bundle):
+        raise RuntimeError('cache build failed')
+
+    watcher = ModelWatcher(registry, lambda model: None, poll_interval=0, warm=warm)
+    registry.register('model-2')
+    wait_for_version(watcher, 'v0002')
@@ -0,0 +1,55 @@
+import importlib
+import textwrap
+
+import pipeline_runner
+from pipeline_runner import PipelineRunner, Stage
+
+
+def write_module(path, source):
+    path.write_text(textwrap.dedent(source))
+
+
+def run_status(runner):
+    outputs = runner.run(verbose=False)
+    return outputs, {entry['stage']: entry['status'] for entry in runner.log}
+
+
+def test_helper_module_edit_invalidates_stage(tmp_path, monkeypatch):
+    project = tmp_path / 'project'
+    project.mkdir()
+    write_module(project / 'scaling_helper.py', """
+        SCALE = 2
+
+        def scale(value):
+            return value * SCALE
+    """)
+    write_module(project / 'scaling_stages.py', """
+        from scaling_helper import scale
+
+        def base():
+            return 21
+
+        def scaled(base):
+            return scale(base)
+    """)
+    monkeypatch.setattr(pipeline_runner, 'PROJECT_DIR', str(project))
+    monkeypatch.syspath_prepend(str(project))
+    stages = importlib.import_module('scaling_stages')
+
+    def make_runner():
+        return PipelineRunner([Stage('base', stages.base), Stage('scaled', stages.scaled, inputs=['base'])],
+                              cache_dir=str(tmp_path / 'cache'))
+
+    assert run_status(make_runner()) == ({'base': 21, 'scaled': 42}, {'base': 'ran', 'scaled': 'ran'})
+    assert run_status(make_runner())[1] == {'base': 'cached', 'scaled': 'cached'}
+
+    # Only the helper changes: the stage that uses it re-runs, the other stays cached
+    write_module(project / 'scaling_helper.py', """
+        SCALE = 3
+
+        def scale(value):
+            return value * SCALE
+    """)
+    importlib.reload(importlib.import_module('scaling_helper'))
+    stages = importlib.reload(stages)
+    assert run_status(make_runner()) == ({'base': 21, 'scaled': 63}, {'base': 'cached', 'scaled': 'ran'})
@@ -0,0 +1,113 @@
+import joblib
+import numpy as np
+import pytest
+
+from quantized_store import (ENCODINGS, FLOAT16_ABSOLUTE_ERROR, FLOAT16_RELATIVE_ERROR, INT8_LEVELS,
+                             PROBABILITY_SCALE, QuantizationError, QuantizedExplanationStore)
+
+
+def exact_values(n_rows=2_000, n_features=12, seed=0):
+    rng = np.random.default_rng(seed)
+    # A few large contributions per customer, many small ones
+    shap_matrix = rng.normal(0, 0.02, (n_rows, n_features))
+    shap_matrix[:, :3] += rng.normal(0, 0.8, (n_rows, 3))
+    return shap_matrix, rng.uniform(0, 1, n_rows), [f"f{i}" for i in range(n_features)]
+
+
+def test_topk_fails_when_dropped_values_exceed_tolerance():
+    shap_matrix, probabilities, names = exact_values()
+    QuantizedExplanationStore.from_exact(shap_matrix, probabilities, names, 0.0, 'topk', top_k=4,
+                                         topk_tolerance=0.2)
+    with pytest.raises(QuantizationError):
+        QuantizedExplanationStore.from_exact(shap_matrix, probabilities, names, 0.0, 'topk', top_k=2,
+                                             topk_tolerance=0.2)
+
+
+def test_topk_bound_is_the_declared_tolerance():
+    shap_matrix, probabilities, names = exact_values()
+    store = QuantizedExplanationStore.from_exact(shap_matrix, probabilities, names, 0.0, 'topk', top_k=4,
+                                                 topk_tolerance=0.2)
+    assert (store.error_bounds >= 0.2).all()
+    assert store.max_errors.max() < 0.2
+
+
+def test_topk_rejects_more_features_than_uint8_indexes():
+    shap_matrix, probabilities, names = exact_values(n_rows=10, n_features=300)
+    with pytest.raises(ValueError, match="uint8"):
+        QuantizedExplanationStore.from_exact(shap_matrix, probabilities, names, 0.0, 'topk', top_k=6)
+    with pytest.raises(ValueError, match="top_k must be between 1 and 11"):
+        QuantizedExplanationStore.from_exact(*exact_values(n_rows=10), 0.0, 'topk', top_k=12)
+
+
+def test_probabilities_are_decoded_once():
+    shap_matrix, probabilities, names = exact_values()
+    store = QuantizedExplanationStore.from_exact(shap_matrix, probabilities, names, 0.0, 'int8')
+    assert store.probabilities is store.probabilities
+    np.testing.assert_allclose(store.probabilities, probabilities, atol=store.probability_error_bound)
+
+
+def encode(encoding, shap_matrix, probabilities, names):
+    return QuantizedExplanationStore.from_exact(shap_matrix, probabilities, names, 0.0, encoding, top_k=4,
+                                                topk_tolerance=0.2)
+
+
+def encoding_bound(encoding, shap_matrix):
+    """Per-value round-trip bound of an encoding, derived from its format rather than from the store."""
+    max_abs = np.abs(shap_matrix).max(axis=0)
+    if encoding == 'int8':
+        return np.broadcast_to(max_abs / INT8_LEVELS / 2 * (1 + 1e-6), shap_matrix.shape)
+    if encoding == 'float16':
+        return np.abs(shap_matrix) * FLOAT16_RELATIVE_ERROR + FLOAT16_ABSOLUTE_ERROR
+    # topk: kept values are float16-rounded, dropped ones are under the declared tolerance
+    return np.maximum(np.abs(shap_matrix) * FLOAT16_RELATIVE_ERROR + FLOAT16_ABSOLUTE_ERROR, 0.2)
+
+
+@pytest.mark.parametrize('encoding', ENCODINGS)
+def test_round_trip_is_within_the_encoding_bound(encoding, tmp_path):
+    shap_matrix, probabilities, names = exact_values()
+    store = encode(encoding, shap_matrix, probabilities, names)
+
+    decoded = store.shap_rows(np.arange(len(shap_matrix))).astype(np.float64)
+    error = np.abs(decoded - shap_matrix)
+    assert (error <= encoding_bound(encoding, shap_matrix)).all()
+    assert (error.max(axis=0) <= store.error_bounds).all()
+    np.testing.assert_allclose(store.max_errors, error.max(axis=0), rtol=1e-6)
+    assert np.abs(store.probabilities - probabilities).max() <= 0.5 / PROBABILITY_SCALE + 1e-7
+
+    # Segment means stay within the per-feature bound too
+    mask = probabilities > 0.5
+    exact_mean = np.abs(shap_matrix[mask]).mean(axis=0)
+    segment = store.explain_segment(mask).set_index('feature').loc[names]
+    assert (np.abs(segment['mean_abs_shap'].to_numpy() - exact_mean) <= store.error_bounds + 1e-6).all()
+
+    # Memory-mapped, as served from the disk cache, decodes the same values
+    joblib.dump(store, tmp_path / 'store.joblib')
+    mapped = joblib.load(tmp_path / 'store.joblib', mmap_mode='r')
+    np.testing.assert_array_equal(mapped.shap_rows(np.arange(len(shap_matrix))), decoded.astype(np.float32))
+
+
+def test_topk_keeps_the_largest_contributions():
+    shap_matrix, probabilities, names = exact_values()
+    store = encode('topk', shap_matrix, probabilities, names)
+    decoded = store.shap_rows(np.arange(len(shap_matrix)))
+    kept = decoded != 0
+    assert (kept.sum(axis=1) <= 4).all()
+    smallest_kept = np.where(kept, np.abs(shap_matrix), np.inf).min(axis=1)
+    largest_dropped = np.where(kept, 0.0, np.abs(shap_matrix)).max(axis=1)
+    assert (largest_dropped <= smallest_kept).all()
+
+
+@pytest.mark.parametrize('encoding', ENCODINGS)
+def test_updated_store_stays_within_its_accumulated_bound(encoding):
+    shap_matrix, probabilities, names = exact_values()
+    store = encode(encoding, shap_matrix, probabilities, names)
+    positions = np.array([3, 10, 500])
+    new_rows = exact_values(n_rows=3, seed=1)[0]
+    new_probabilities = np.array([0.1, 0.5, 0.9])
+
+    updated = store.updated(positions, new_rows, new_probabilities)
+    expected = shap_matrix.copy()
+    expected[positions] = new_rows
+    error = np.abs(updated.shap_rows(np.arange(len(expected))).astype(np.float64) - expected)
+    assert (error.max(axis=0) <= updated.error_bounds).all()
+    np.testing.assert_allclose(updated.probabilities[positions], new_probabilities, atol=updated.probability_error_bound)
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from sketches import HyperLogLog, KLLSketch
+
+QUANTILES = np.linspace(0.01, 0.99, 99)
+# KLL with k=200: observed worst rank error is ~0.015 over 20 seeds at 100k items
+KLL_RANK_ERROR = 0.03
+
+
+def rank_error(sketch, data):
+    """Largest |true rank of the estimate - q| over QUANTILES."""
+    ranks = np.searchsorted(np.sort(data), sketch.quantile(QUANTILES), side='right') / len(data)
+    return np.abs(ranks - QUANTILES).max()
+
+
+def total_weight(sketch):
+    return sum(len(items) * 2 ** level for level, items in enumerate(sketch.levels))
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_kll_rank_error_and_size(seed):
+    data = np.random.default_rng(seed).lognormal(3, 1, 100_000)
+    sketch = KLLSketch(k=200, seed=seed).update(data)
+
+    assert rank_error(sketch, data) <= KLL_RANK_ERROR
+    assert total_weight(sketch) == sketch.n == len(data)
+    assert sum(len(items) for items in sketch.levels) < 3 * sketch.k
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_kll_merge_of_partitions_matches_the_union(seed):
+    data = np.random.default_rng(seed).normal(50, 10, 100_000)
+    merged = KLLSketch(k=200, seed=seed)
+    for i, part in enumerate(np.array_split(data, 40)):
+        merged.merge(KLLSketch(k=200, seed=seed * 100 + i).update(part))
+
+    assert merged.n == len(data) == total_weight(merged)
+    assert rank_error(merged, data) <= KLL_RANK_ERROR
+
+
+def test_kll_ignores_nan_and_empty_sketch_is_nan():
+    sketch = KLLSketch(k=50, seed=0).update([1.0, np.nan, 2.0, 3.0])
+    assert sketch.n == 3
+    assert sketch.quantile(0.5) == 2.0
+    assert np.isnan(KLLSketch().quantile(0.5))
+    assert np.isnan(KLLSketch().quantile([0.1, 0.9])).all()
+
+
+@pytest.mark.parametrize('n', [1_000, 100_000])
+def test_hyperloglog_relative_error(n):
+    hll = HyperLogLog(p=12)
+    keys = [f"customer-{i}" for i in range(n)]
+    hll.update(HyperLogLog.hash_values(keys))
+    # Standard error is 1.04 / sqrt(2**p); allow three of them
+    assert abs(hll.estimate() / n - 1) <= 3 * 1.04 / np.sqrt(hll.m)
+
+    # Duplicates do not change the registers
+    registers = hll.registers.copy()
+    hll.update(HyperLogLog.hash_values(keys[: n // 2]))
+    assert (hll.registers == registers).all()
+
+
+def test_hyperloglog_merge_equals_sketch_of_the_union():
+    first = [f"customer-{i}" for i in range(0, 30_000)]
+    second = [f"customer-{i}" for i in range(20_000, 50_000)]
+    union = HyperLogLog().update(HyperLogLog.hash_values(first + second))
+
+    merged = HyperLogLog().update(HyperLogLog.hash_values(first))
+    merged.merge(HyperLogLog().update(HyperLogLog.hash_values(second)))
+    assert (merged.registers == union.registers).all()
+    assert merged.estimate() == union.estimate()
+    # Merging is idempotent
+    assert merged.merge(HyperLogLog().update(HyperLogLog.hash_values(second))).estimate() == union.estimate()
@@ -0,0 +1,38 @@
+import numpy as np
+from sklearn.metrics import f1_score, precision_score, recall_score
+
+from threshold_eval import bootstrap_ci, metrics_at, threshold_sweep
+
+
+def test_metrics_at_fixed_threshold_match_flagging_at_threshold():
+    rng = np.random.default_rng(0)
+    y_true = rng.integers(0, 2, 500)
+    y_prob = np.clip(0.3 * y_true + rng.uniform(0, 0.7, 500), 0, 1).round(2)
+    sweep = threshold_sweep(y_true, y_prob, model_names=['model'])
+
+    for threshold in [0.2, 0.333, 0.5, 0.71]:
+        row = metrics_at(sweep, {'model': threshold}).iloc[0]
+        flagged = y_prob >= threshold
+        assert row['threshold'] == threshold
+        assert row['flagged'] == flagged.sum()
+        assert np.isclose(row['precision'], precision_score(y_true, flagged))
+        assert np.isclose(row['recall'], recall_score(y_true, flagged))
+        assert np.isclose(row['f1'], f1_score(y_true, flagged))
+
+    assert metrics_at(sweep, {'model': 1.5}).iloc[0]['flagged'] == 0
+
+
+def test_bootstrap_ci_threshold_above_every_probability_flags_nobody():
+    rng = np.random.default_rng(1)
+    y_true = rng.integers(0, 2, 300)
+    y_prob = rng.uniform(0, 0.9, 300)
+
+    ci = bootstrap_ci(y_true, y_prob, [0.5, 0.95], n_boot=50)
+    above = ci.iloc[1]
+    assert np.isnan(above['precision_low']) and np.isnan(above['precision_high'])
+    assert above['recall_low'] == above['recall_high'] == 0.0
+    assert above['f1_low'] == above['f1_high'] == 0.0
+    # The threshold below the maximum is unaffected
+    at_half = ci.iloc[0]
+    assert 0 < at_half['precision_low'] <= at_half['precision_high'] < 1
+    assert 0 < at_half['recall_low'] <= at_half['recall_high'] < 1